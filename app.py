@@ -1,56 +1,642 @@
 import os
-from flask import Flask, render_template, request, jsonify, g
+import codecs
+import math
+import threading
+from contextlib import nullcontext
+from functools import partial, wraps
+from itertools import islice
+from flask import Flask, Response, render_template, request, jsonify, g, has_request_context, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, date
 
-from src.db_manager import DatabaseManager
+from src.db_manager import SORT_ORDERS, DatabaseManager
+from src.connection_pool import ConnectionPool
+from src.storage import create_layout
+from src.user_cache import UserCache
+from src.response_cache import MemoryCacheBackend, ResponseCache
+from src.write_queue import WriteQueue
+from src.replica import ReplicaRefresher
+from src.sharding import ShardedDatabaseManager, ShardedPool, ShardedWriteQueue, ShardMap, shard_paths
 from src.transactions import Transaction
 from src.transaction_type import TransactionType
+from src import importer
+from src.json_stream import iter_json_array
+from src.query import CACHED_STATEMENTS
+from src.pagination import decode_cursor, decode_search_cursor, decode_sort_cursor, encode_search_cursor, encode_sort_cursor, paginate
+from src.metrics import MetricsRegistry
+from src.slow_query_log import SlowQueryLog
+from src.json_provider import FastJSONProvider
+from src.tracing import RequestTimer, TracedDatabase, TracingCursor, statement_operation
 
 DB_FILE_PATH = 'finance.db'
+DB_POOL_SIZE = 5
+DB_POOL_TIMEOUT = 5.0
+# GET requests borrow from a separate pool of read-only connections (mode=ro, query_only),
+# each reading one WAL snapshot, so they never wait for the writers' lock.
+DB_READ_POOL_SIZE = 5
+READ_METHODS = ('GET', 'HEAD')
+# Set FINANCE_READ_REPLICA to a file path to stream exports from a local copy of the database,
+# refreshed every DB_REPLICA_REFRESH_SECONDS with the SQLite backup API. With several shards,
+# each shard gets its own copy ('replica.db' becomes 'replica.0.db'...).
+DB_READ_REPLICA_PATH = os.environ.get('FINANCE_READ_REPLICA')
+DB_REPLICA_REFRESH_SECONDS = float(os.environ.get('FINANCE_REPLICA_REFRESH', 30))
+DB_STORAGE = 'per_user'
+# Users are spread over this many SQLite files by consistent hashing: 'finance.db' becomes
+# 'finance.0.db', 'finance.1.db'... Changing it: `python -m src.sharding rebalance --from <old> --to <new>`.
+DB_SHARDS = 1
+# 'real' stores amounts as floats; 'cents' as integer cents; 'compact' uses STRICT tables with
+# day-number dates, category ids and cents. Existing databases: `python -m src.migrations <encoding>`.
+DB_ENCODING = 'real'
+USER_CACHE_SIZE = 10000
+# The response cache lives in each process and only the process that handled a write
+# invalidates it, so it is off when several worker processes serve the same database:
+# serve.py sets FINANCE_RESPONSE_CACHE=0 when started with more than one worker.
+RESPONSE_CACHE_ENABLED = os.environ.get('FINANCE_RESPONSE_CACHE', '1') != '0'
+RESPONSE_CACHE_TTL = 60.0
+RESPONSE_CACHE_MAX_ENTRIES = 2048
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+BATCH_CHUNK_SIZE = 1000
+# Largest request bodies the batch and import routes read; larger ones get a 413. Both are
+# parsed and committed a chunk at a time, so the caps bound request time rather than memory:
+# a batch row takes about 130 bytes of JSON, so MAX_BATCH_BYTES holds about a million rows.
+MAX_BATCH_BYTES = 128 * 1024 * 1024
+MAX_IMPORT_BYTES = 50 * 1024 * 1024
+WRITE_BATCH_SIZE = 64
+WRITE_MAX_LATENCY = 0.002
+WRITE_TIMEOUT = 30.0
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_FETCH_SIZE = 500
+TRANSACTION_FIELDS = ['date', 'description', 'category', 'amount', 'type']
+TRANSACTION_COLUMNS = ['date', 'description', 'category', 'amount', 'type', 'id']
+# Low-cardinality columns that columnar listings can dictionary-encode.
+DICTIONARY_COLUMNS = ('category', 'type')
+COLUMNAR_MIMETYPE = 'application/vnd.finance.columnar+json'
+# 'orjson' or 'stdlib'; None picks orjson when it is installed.
+JSON_BACKEND = None
+INSTRUMENTATION_ENABLED = True
+# Set FINANCE_SLOW_QUERY_LOG to a file path to log statements slower than the threshold.
+SLOW_QUERY_LOG_PATH = os.environ.get('FINANCE_SLOW_QUERY_LOG')
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('FINANCE_SLOW_QUERY_MS', 100))
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app, backend=JSON_BACKEND)
 CORS(app)
 
 # --- Database Connection Management ---
 
+_pool = None
+_read_pool = None
+_replicas = None
+_replica_pool = None
+_pool_lock = threading.Lock()
+_shard_map = None
+_layout = None
+_write_queue = None
+_slow_query_log = None
+_user_cache = UserCache(maxsize=USER_CACHE_SIZE)
+response_cache = ResponseCache(
+    MemoryCacheBackend(max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES),
+    ttl=RESPONSE_CACHE_TTL
+)
+metrics = MetricsRegistry(prefix='finance_')
+
+def get_shard_map():
+    """Returns the map routing users to the DB_SHARDS database files."""
+    global _shard_map
+    if _shard_map is None:
+        _shard_map = ShardMap(DB_FILE_PATH, DB_SHARDS)
+    return _shard_map
+
+def get_pool(size=None):
+    """
+    Returns the process-wide connection pool, creating it on first use with
+    `size` connections (default DB_POOL_SIZE). With several shards, it holds
+    one pool of that size per shard.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                app.logger.info(f"Creating connection pool for database at: {os.path.abspath(DB_FILE_PATH)}")
+                initialize_database()
+                size = size or DB_POOL_SIZE
+                if DB_SHARDS > 1:
+                    _pool = ShardedPool(get_shard_map(), size=size, timeout=DB_POOL_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+                else:
+                    _pool = ConnectionPool(DB_FILE_PATH, size=size, timeout=DB_POOL_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+    return _pool
+
+def initialize_database():
+    """
+    Creates the database files and their schema, in WAL mode, before the
+    pools open them: pooled connections only borrow, they never set the
+    schema up.
+    """
+    paths = get_shard_map().paths if DB_SHARDS > 1 else [DB_FILE_PATH]
+    for path in paths:
+        open_writer_db(path).close()
+
+def get_read_pool(size=None):
+    """
+    Returns the process-wide pool of read-only connections, creating the
+    database and a pool of `size` connections (default DB_READ_POOL_SIZE) on
+    first use. With several shards, it holds one pool per shard.
+    """
+    global _read_pool
+    if _read_pool is None:
+        with _pool_lock:
+            if _read_pool is None:
+                initialize_database()
+                size = size or DB_READ_POOL_SIZE
+                if DB_SHARDS > 1:
+                    _read_pool = ShardedPool(get_shard_map(), size=size, timeout=DB_POOL_TIMEOUT, read_only=True,
+                                             cached_statements=CACHED_STATEMENTS)
+                else:
+                    _read_pool = ConnectionPool(DB_FILE_PATH, size=size, timeout=DB_POOL_TIMEOUT, read_only=True,
+                                                cached_statements=CACHED_STATEMENTS)
+    return _read_pool
+
+def get_replica_pool(size=None):
+    """
+    Returns the pool of read-only connections to the local replica, starting
+    its refreshers and a pool of `size` connections (default
+    DB_READ_POOL_SIZE) on first use, or None unless DB_READ_REPLICA_PATH is set.
+    """
+    global _replicas, _replica_pool
+    if DB_READ_REPLICA_PATH is None:
+        return None
+    if _replica_pool is None:
+        get_read_pool()
+        with _pool_lock:
+            if _replica_pool is None:
+                sources = get_shard_map().paths if DB_SHARDS > 1 else [DB_FILE_PATH]
+                replicas = [ReplicaRefresher(source, replica, interval=DB_REPLICA_REFRESH_SECONDS)
+                            for source, replica in zip(sources, shard_paths(DB_READ_REPLICA_PATH, DB_SHARDS))]
+                for replica in replicas:
+                    replica.start()
+                _replicas = replicas
+                size = size or DB_READ_POOL_SIZE
+                if DB_SHARDS > 1:
+                    _replica_pool = ShardedPool(ShardMap(DB_READ_REPLICA_PATH, DB_SHARDS), size=size,
+                                                timeout=DB_POOL_TIMEOUT, read_only=True,
+                                                cached_statements=CACHED_STATEMENTS)
+                else:
+                    _replica_pool = ConnectionPool(DB_READ_REPLICA_PATH, size=size, timeout=DB_POOL_TIMEOUT,
+                                                   read_only=True, cached_statements=CACHED_STATEMENTS)
+    return _replica_pool
+
+def get_write_queue():
+    """
+    Returns the process-wide group-commit write queue, starting its writer
+    thread on first use. With several shards, each shard gets its own.
+    """
+    global _write_queue
+    if _write_queue is None:
+        with _pool_lock:
+            if _write_queue is None:
+                if DB_SHARDS > 1:
+                    shard_map = get_shard_map()
+                    _write_queue = ShardedWriteQueue(shard_map, [
+                        WriteQueue(partial(open_writer_db, path), max_batch_size=WRITE_BATCH_SIZE, max_latency=WRITE_MAX_LATENCY)
+                        for path in shard_map.paths
+                    ])
+                else:
+                    _write_queue = WriteQueue(open_writer_db, max_batch_size=WRITE_BATCH_SIZE, max_latency=WRITE_MAX_LATENCY)
+    return _write_queue
+
+def close_pool():
+    """
+    Flushes the write queue, stops the replica refreshers, closes every
+    pooled connection and forgets the users cached for them. The next call
+    to get_pool() starts a new pool.
+    """
+    global _pool, _read_pool, _replicas, _replica_pool, _write_queue, _shard_map
+    with _pool_lock:
+        write_queue, _write_queue = _write_queue, None
+        replicas, _replicas = _replicas, None
+    if write_queue is not None:
+        write_queue.close()
+    for replica in replicas or []:
+        replica.close()
+    with _pool_lock:
+        for pool in (_pool, _read_pool, _replica_pool):
+            if pool is not None:
+                pool.close()
+        _pool = _read_pool = _replica_pool = None
+        _shard_map = None
+        _user_cache.clear()
+
+def get_layout():
+    """
+    Returns the storage layout selected by DB_STORAGE ('per_user' or 'shared'),
+    storing values in the DB_ENCODING encoding.
+    """
+    global _layout
+    if _layout is None:
+        _layout = create_layout(DB_STORAGE, DB_ENCODING)
+    return _layout
+
+def get_slow_query_log():
+    """Returns the slow-query log, or None unless SLOW_QUERY_LOG_PATH is set."""
+    global _slow_query_log
+    if _slow_query_log is None and SLOW_QUERY_LOG_PATH:
+        _slow_query_log = SlowQueryLog(
+            SLOW_QUERY_LOG_PATH, threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+            max_bytes=SLOW_QUERY_LOG_MAX_BYTES, backup_count=SLOW_QUERY_LOG_BACKUPS
+        )
+    return _slow_query_log
+
+def open_db():
+    """Borrows a pooled connection (one per shard used) that the caller must close."""
+    if DB_SHARDS > 1:
+        return ShardedDatabaseManager(get_shard_map(), pool=get_pool(), layout=get_layout(), user_cache=_user_cache,
+                                      slow_query_log=get_slow_query_log())
+    return DatabaseManager(db_path=DB_FILE_PATH, pool=get_pool(), layout=get_layout(), user_cache=_user_cache,
+                           slow_query_log=get_slow_query_log())
+
+def open_read_db():
+    """
+    Borrows a read-only pooled connection that the caller must close. Its
+    reads share one snapshot, taken by the first of them.
+    """
+    if DB_SHARDS > 1:
+        return ShardedDatabaseManager(get_shard_map(), pool=get_read_pool(), layout=get_layout(), user_cache=_user_cache,
+                                      slow_query_log=get_slow_query_log(), read_only=True)
+    return DatabaseManager(db_path=DB_FILE_PATH, pool=get_read_pool(), layout=get_layout(), user_cache=_user_cache,
+                           slow_query_log=get_slow_query_log(), read_only=True)
+
+def open_report_db(user):
+    """
+    Opens a read-only connection for a long report over one user's data: on
+    the replica when it is enabled and already holds the user, otherwise on
+    the database itself. The caller must close it. The replica may be up to
+    DB_REPLICA_REFRESH_SECONDS behind, and its users are not cached, since a
+    user created since the last refresh is not there yet.
+    """
+    replica_pool = get_replica_pool()
+    if replica_pool is not None:
+        if DB_SHARDS > 1:
+            db = ShardedDatabaseManager(ShardMap(DB_READ_REPLICA_PATH, DB_SHARDS), pool=replica_pool, layout=get_layout(),
+                                        slow_query_log=get_slow_query_log(), read_only=True)
+        else:
+            db = DatabaseManager(db_path=DB_READ_REPLICA_PATH, pool=replica_pool, layout=get_layout(),
+                                 slow_query_log=get_slow_query_log(), read_only=True)
+        if not db.check_username_availability(user):
+            return db
+        db.close()
+    return open_read_db()
+
+def open_writer_db(db_path=None):
+    """
+    Opens a write queue's connection to `db_path` (default DB_FILE_PATH). It
+    is kept outside the pool, so queued writes never wait for a request
+    (which may itself be waiting on the queue) to return a pooled connection.
+    """
+    db = DatabaseManager(db_path=db_path or DB_FILE_PATH, layout=get_layout(), user_cache=_user_cache,
+                         slow_query_log=get_slow_query_log(), cached_statements=CACHED_STATEMENTS)
+    db.connection.execute("PRAGMA journal_mode = WAL")
+    return db
+
 def get_db():
     """
-    Opens a new database connection if there is none yet for the
-    current application context. This is the recommended way to handle
-    resources in Flask.
+    Borrows a pooled database connection if there is none yet for the
+    current application context: a read-only one for GET requests. This is
+    the recommended way to handle resources in Flask.
     """
     if 'db_manager' not in g:
+        timer = g.get('request_timer')
         try:
-            app.logger.info(f"Connecting to database at: {os.path.abspath(DB_FILE_PATH)}")
-            g.db_manager = DatabaseManager(db_path=DB_FILE_PATH)
+            with span('get_db'):
+                db = open_read_db() if has_request_context() and request.method in READ_METHODS else open_db()
         except Exception as e:
             app.logger.error(f"CRITICAL: Failed to initialize DatabaseManager: {str(e)}")
             raise RuntimeError("Could not connect to the database.") from e
+        if timer is not None:
+            db = trace_db(db, timer)
+        g.db_manager = db
     return g.db_manager
 
+def trace_db(db, timer):
+    """Reports the database's statements and method calls to a request timer."""
+    db.wrap_cursor(lambda cursor: TracingCursor(cursor, timer.record_statement))
+    return TracedDatabase(db, timer)
+
 @app.teardown_appcontext
 def close_db(exception=None):
     """
-    Closes the database connection at the end of the request.
+    Returns the database connection to the pool at the end of the request.
     This is automatically called by Flask.
     """
     db_manager = g.pop('db_manager', None)
     if db_manager is not None:
         db_manager.close()
-        app.logger.info("Database connection closed for this context.")
+
+# --- Instrumentation ---
+
+def span(name, description=None):
+    """Times a block as a span of the current request, when instrumentation is on."""
+    timer = g.get('request_timer') if INSTRUMENTATION_ENABLED else None
+    return timer.span(name, description) if timer is not None else nullcontext()
+
+@app.before_request
+def start_request_timer():
+    if INSTRUMENTATION_ENABLED:
+        g.request_timer = RequestTimer()
+
+@app.after_request
+def record_request_timings(response):
+    """
+    Adds a Server-Timing header with the request's spans and records the
+    request, phase and per-statement latencies in the metrics registry.
+    """
+    timer = g.get('request_timer')
+    if timer is None:
+        return response
+    response.headers['Server-Timing'] = timer.server_timing()
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    record_request_metrics(timer, request.method, route, response.status_code)
+    return response
+
+def record_request_metrics(timer, method, route, status):
+    """Records a finished request's latency, phases and statements under its route rule."""
+    metrics.observe('http_request_duration_seconds', timer.elapsed(),
+                    {'method': method, 'route': route, 'status': str(status)},
+                    "Time spent handling a request until the response headers are ready.")
+    for (phase, _), seconds in timer.spans.items():
+        metrics.observe('request_phase_duration_seconds', seconds, {'phase': phase, 'route': route},
+                        "Time spent in each request phase.")
+    for statement, seconds, rows in timer.statements:
+        operation = statement_operation(statement)
+        metrics.observe('db_statement_duration_seconds', seconds, {'operation': operation},
+                        "SQLite statement latency, including fetching its rows.")
+        metrics.inc('db_rows_returned_total', rows, {'operation': operation}, "Rows fetched from SQLite statements.")
+
+def metric_gauges():
+    """Collects the pool and cache counters as Prometheus gauges."""
+    sources = [('user_cache', "User cache", _user_cache.stats()), ('response_cache', "Response cache", response_cache.stats())]
+    if _pool is not None:
+        sources.append(('pool', "Connection pool", _pool.stats()))
+    if _read_pool is not None:
+        sources.append(('read_pool', "Read-only connection pool", _read_pool.stats()))
+    for index, replica in enumerate(_replicas or []):
+        sources.append((f'replica_{index}', f"Replica {index}", replica.stats()))
+    if _write_queue is not None:
+        sources.append(('write_queue', "Write queue", _write_queue.stats()))
+    gauges = {}
+    for prefix, label, stats in sources:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[f'{prefix}_{key}'] = (f"{label} {key.replace('_', ' ')}.", value)
+    return gauges
+
+def cached_response(view):
+    """
+    Serves a read route from the response cache, keyed by user, path, query
+    string and Accept header. Matching If-None-Match requests get a 304, and
+    cache hits never touch the database. Only 200 responses are stored.
+    Does nothing unless RESPONSE_CACHE_ENABLED.
+    """
+    @wraps(view)
+    def wrapper(username, *args, **kwargs):
+        if not RESPONSE_CACHE_ENABLED:
+            return view(username, *args, **kwargs)
+        request_key = f"{request.full_path}|{request.headers.get('Accept', '')}"
+        with span('response_cache'):
+            version = response_cache.version(username)
+            entry = response_cache.get(username, version, request_key)
+        if entry is not None:
+            body, etag, mimetype = entry
+            response = app.response_class(body, mimetype=mimetype)
+        else:
+            response = app.make_response(view(username, *args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            etag = response_cache.set(username, version, request_key, response.get_data(), response.mimetype)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
+
+def write(method, *args):
+    """Runs a DatabaseManager write through the write queue and waits until it is committed."""
+    return get_write_queue().submit(method, *args).result(timeout=WRITE_TIMEOUT)
+
+def limit_request_body(max_bytes):
+    """
+    Caps the request body at `max_bytes`. Returns a 413 response when the
+    declared length is larger, else None; bodies without a length are cut
+    off by Werkzeug once they pass the cap.
+    """
+    request.max_content_length = max_bytes
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({"error": f"Request body is larger than {max_bytes} bytes."}), 413
+    return None
 
 def format_transaction_rows(rows):
-    """Converts a list of transaction tuples from DB into a list of dictionaries."""
-    columns = ['date', 'description', 'category', 'amount', 'type', 'id']
-    formatted_transactions = []
-    if rows:
-        for row in rows:
-            transaction_dict = dict(zip(columns, row))
-            if isinstance(transaction_dict.get('date'), date):
-                transaction_dict['date'] = transaction_dict['date'].isoformat()
-            formatted_transactions.append(transaction_dict)
-    return formatted_transactions
+    """
+    Converts a list of transaction tuples from DB into a list of dictionaries.
+    Dates need no conversion: the JSON provider writes them as ISO strings.
+    """
+    return [dict(zip(TRANSACTION_COLUMNS, row)) for row in rows] if rows else []
+
+def format_transaction_columns(rows, dictionary=False):
+    """
+    Transposes transaction tuples into one array per column, so column names
+    appear once and no per-row dicts are built. With `dictionary`, category
+    and type values become indexes into lists of their distinct values.
+    """
+    data = [list(column) for column in zip(*rows)] if rows else [[] for _ in TRANSACTION_COLUMNS]
+    payload = {"format": "columnar", "columns": TRANSACTION_COLUMNS, "length": len(rows), "data": data}
+    if dictionary:
+        dictionaries = {}
+        for name in DICTIONARY_COLUMNS:
+            index = TRANSACTION_COLUMNS.index(name)
+            codes = {}
+            data[index] = [codes.setdefault(value, len(codes)) for value in data[index]]
+            dictionaries[name] = list(codes)
+        payload["dictionaries"] = dictionaries
+    return payload
+
+def build_listing(rows, next_cursor=None, paginated=False, columnar=False, dictionary=False):
+    """
+    Builds a listing payload: a list of transaction objects, or the columnar
+    form. Paginated listings also carry the cursor of the next page.
+    """
+    if columnar:
+        payload = format_transaction_columns(rows, dictionary)
+        if paginated:
+            payload["nextCursor"] = next_cursor
+        return payload
+    if paginated:
+        return {"transactions": format_transaction_rows(rows), "nextCursor": next_cursor}
+    return format_transaction_rows(rows)
+
+def stream_transaction_rows(batches, ndjson=False):
+    """
+    Serializes batches of transaction rows incrementally, either as one JSON
+    array or as newline-delimited JSON, yielding one chunk per batch.
+    """
+    if not ndjson:
+        yield '['
+    first = True
+    for rows in batches:
+        items = [app.json.dumps(item) for item in format_transaction_rows(rows)]
+        if ndjson:
+            yield '\n'.join(items) + '\n'
+        else:
+            yield ('' if first else ',') + ','.join(items)
+        first = False
+    if not ndjson:
+        yield ']'
+
+def get_page_args(args=None):
+    """
+    Reads the 'limit' and 'cursor' query parameters (from `args`, or the
+    current request). Returns (None, None) for unpaginated requests. Raises
+    ValueError on invalid values.
+    """
+    args = request.args if args is None else args
+    limit = args.get('limit')
+    token = args.get('cursor')
+    if limit is None and token is None:
+        return None, None
+    limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit, decode_cursor(token) if token else None
+
+def get_search_args(args=None):
+    """
+    Reads the 'q', 'limit' and 'cursor' query parameters of a search. Search
+    results are always paginated. Raises ValueError on invalid values.
+    """
+    args = request.args if args is None else args
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    token = args.get('cursor')
+    return args.get('q', ''), limit, decode_search_cursor(token) if token else None
+
+def parse_amount(value, name='amount'):
+    """Converts an amount to a float. Raises ValueError on invalid or non-finite amounts."""
+    amount = float(value)
+    if not math.isfinite(amount):
+        raise ValueError(f"Invalid {name} '{value}': must be a finite number.")
+    return amount
+
+def parse_amount_arg(name, args=None):
+    """Reads an optional amount query parameter. Raises ValueError on invalid or non-finite amounts."""
+    value = (request.args if args is None else args).get(name)
+    if not value:
+        return None
+    return parse_amount(value, name)
+
+def get_query_args(args=None):
+    """
+    Reads the filters of a transaction query: repeatable 'type' and
+    'category', 'from' and 'to' dates, 'min_amount' and 'max_amount', plus
+    'sort', 'limit' and 'cursor'. Queries are always paginated. Returns
+    (filters, sort, limit, cursor). Raises ValueError on invalid values.
+    """
+    args = request.args if args is None else args
+    filters = {
+        'types': args.getlist('type'),
+        'categories': args.getlist('category'),
+        'start': parse_date_arg('from', args),
+        'end': parse_date_arg('to', args),
+        'min_amount': parse_amount_arg('min_amount', args),
+        'max_amount': parse_amount_arg('max_amount', args),
+    }
+    sort = args.get('sort', 'date_desc')
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_ORDERS)}.")
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    token = args.get('cursor')
+    cursor = decode_sort_cursor(token, numeric=SORT_ORDERS[sort][0] == 'amount') if token else None
+    return filters, sort, limit, cursor
+
+def get_changes_args(args=None):
+    """
+    Reads the 'since' and 'limit' query parameters of a sync. 'since' is
+    optional; 'limit' defaults to MAX_PAGE_SIZE. Raises ValueError on
+    invalid values.
+    """
+    args = request.args if args is None else args
+    since = args.get('since')
+    since = int(since) if since is not None else None
+    if since is not None and since < 0:
+        raise ValueError("since must not be negative.")
+    limit = int(args.get('limit', MAX_PAGE_SIZE))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+    return since, limit
+
+def format_changes(changes):
+    """Formats the changed rows of DatabaseManager.get_changes() as transaction objects."""
+    return dict(changes, changed=format_transaction_rows(changes['changed']))
+
+def build_query_listing(rows, sort, limit, columnar=False, dictionary=False):
+    """Builds a page of a transaction query's results from up to limit + 1 rows."""
+    column = TRANSACTION_COLUMNS.index(SORT_ORDERS[sort][0])
+    rows, next_cursor = paginate(rows, limit, partial(encode_sort_cursor, column=column))
+    return build_listing(rows, next_cursor, True, columnar, dictionary)
+
+def wants_totals(args=None):
+    return (request.args if args is None else args).get('totals', '').lower() in ('1', 'true')
+
+def build_search_listing(rows, next_cursor, columnar=False, dictionary=False):
+    """Builds a page of search results, dropping the score each row ends with."""
+    return build_listing([row[:6] for row in rows], next_cursor, True, columnar, dictionary)
+
+def parse_date_arg(name, args=None):
+    """Reads an optional YYYY-MM-DD query parameter. Raises ValueError on invalid dates."""
+    value = (request.args if args is None else args).get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def get_listing_format(args=None, accept=None):
+    """
+    Reads the requested listing format, 'rows' (the default) or 'columnar',
+    from ?format= or an Accept header naming COLUMNAR_MIMETYPE. ?dictionary=1
+    dictionary-encodes columnar listings. Returns (columnar, dictionary).
+    Raises ValueError on unknown formats.
+    """
+    args = request.args if args is None else args
+    accept = request.headers.get('Accept', '') if accept is None else accept
+    listing_format = args.get('format') or ('columnar' if COLUMNAR_MIMETYPE in accept else 'rows')
+    if listing_format not in ('rows', 'columnar'):
+        raise ValueError("format must be 'rows' or 'columnar'.")
+    return listing_format == 'columnar', args.get('dictionary', '').lower() in ('1', 'true')
+
+def list_transactions(fetch, limit, cursor):
+    """
+    Runs a listing query and builds its response in the requested format:
+    a plain list when unpaginated, otherwise a page of transactions with the
+    cursor of the next page.
+    """
+    columnar, dictionary = get_listing_format()
+    if limit is None:
+        rows, next_cursor = fetch(), None
+    else:
+        rows, next_cursor = paginate(fetch(limit=limit + 1, cursor=cursor), limit)
+    with span('format_transaction_rows'):
+        payload = build_listing(rows, next_cursor, limit is not None, columnar, dictionary)
+    with span('jsonify'):
+        return jsonify(payload), 200
+
+def parse_transaction(data):
+    """Builds a Transaction from a JSON payload. Raises ValueError on invalid data."""
+    return Transaction(
+        date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
+        description=str(data['description']),
+        category=str(data['category']),
+        amount=parse_amount(data['amount']),
+        type=TransactionType(data['type'])
+    )
 
 # --- Routes ---
 
@@ -58,6 +644,52 @@ def format_transaction_rows(rows):
 def home():
     return render_template("home.html")
 
+@app.route('/stats/pool', methods=['GET'])
+def get_pool_stats():
+    """Exposes connection pool counters for monitoring."""
+    return jsonify(get_pool().stats()), 200
+
+@app.route('/stats/read-pool', methods=['GET'])
+def get_read_pool_stats():
+    """Exposes read-only connection pool counters, and the replica's when it is enabled."""
+    stats = get_read_pool().stats()
+    get_replica_pool()
+    stats['replicas'] = [replica.stats() for replica in _replicas or []]
+    return jsonify(stats), 200
+
+@app.route('/stats/user-cache', methods=['GET'])
+def get_user_cache_stats():
+    """Exposes user-existence cache counters for monitoring."""
+    return jsonify(_user_cache.stats()), 200
+
+@app.route('/stats/response-cache', methods=['GET'])
+def get_response_cache_stats():
+    """Exposes response cache counters for monitoring."""
+    return jsonify(response_cache.stats()), 200
+
+@app.route('/stats/write-queue', methods=['GET'])
+def get_write_queue_stats():
+    """Exposes group-commit write queue counters for monitoring."""
+    return jsonify(get_write_queue().stats()), 200
+
+@app.route('/stats/slow-queries', methods=['GET'])
+def get_slow_query_stats():
+    """Ranks the logged slow statements by total time, when the slow-query log is enabled."""
+    slow_query_log = get_slow_query_log()
+    if slow_query_log is None:
+        return jsonify({"enabled": False, "statements": []}), 200
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({
+        "enabled": True,
+        "thresholdMs": slow_query_log.threshold * 1000,
+        "statements": slow_query_log.top(limit)
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Exposes request, phase and statement histograms plus pool and cache gauges in Prometheus text format."""
+    return Response(metrics.render(metric_gauges()), mimetype='text/plain; version=0.0.4')
+
 @app.route('/users/<username>', methods=['POST'])
 def create_user(username):
     """
@@ -75,16 +707,106 @@ def create_user(username):
         return jsonify({"error": "An internal server error occurred"}), 500
 
 @app.route('/users/<username>/transactions', methods=['GET'])
+@cached_response
 def get_user_transactions(username):
-    """Gets all transactions for a user."""
+    """Gets all transactions for a user, optionally restricted to ?from=&to= (inclusive, YYYY-MM-DD)."""
     try:
+        limit, cursor = get_page_args()
+        start = parse_date_arg('from')
+        end = parse_date_arg('to')
         db = get_db()
-        transactions_data = db.get_all_transactions(username)
-        return jsonify(format_transaction_rows(transactions_data)), 200
+        if start is not None or end is not None:
+            return list_transactions(lambda **page: db.get_transactions_between(username, start, end, **page), limit, cursor)
+        return list_transactions(lambda **page: db.get_all_transactions(username, **page), limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Unexpected error getting all transactions for {username}: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@app.route('/users/<username>/transactions/query', methods=['GET'])
+@cached_response
+def query_user_transactions(username):
+    """
+    Lists a user's transactions matching any combination of filters in one
+    query: ?type= and ?category= (repeatable, matching any of the values),
+    ?from=&to= (inclusive, YYYY-MM-DD), ?min_amount=&max_amount= (inclusive)
+    and ?sort= (date_desc, date_asc, amount_desc or amount_asc). Results are
+    always paginated; ?totals=1 adds the totals of every matching transaction.
+    """
+    try:
+        filters, sort, limit, cursor = get_query_args()
+        columnar, dictionary = get_listing_format()
+        db = get_db()
+        if db.check_username_availability(username):
+            return jsonify({"error": f"User '{username}' does not exist."}), 404
+        with span('query_transactions'):
+            rows = db.query_transactions(username, **filters, sort=sort, limit=limit + 1, cursor=cursor)
+            payload = build_query_listing(rows, sort, limit, columnar, dictionary)
+            if wants_totals():
+                payload["totals"] = db.query_totals(username, **filters)
+        with span('jsonify'):
+            return jsonify(payload), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
+    except Exception as e:
+        app.logger.error(f"Unexpected error querying transactions for {username}: {str(e)}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@app.route('/users/<username>/transactions/search', methods=['GET'])
+@cached_response
+def search_user_transactions(username):
+    """
+    Full-text searches a user's descriptions and categories with ?q=, every
+    word matching as a prefix, best match first. Results are always
+    paginated: ?limit= defaults to DEFAULT_PAGE_SIZE.
+    """
+    try:
+        query, limit, cursor = get_search_args()
+        columnar, dictionary = get_listing_format()
+        db = get_db()
+        if db.check_username_availability(username):
+            return jsonify({"error": f"User '{username}' does not exist."}), 404
+        rows, next_cursor = paginate(db.search_transactions(username, query, limit=limit + 1, cursor=cursor),
+                                     limit, encode_search_cursor)
+        with span('format_transaction_rows'):
+            payload = build_search_listing(rows, next_cursor, columnar, dictionary)
+        with span('jsonify'):
+            return jsonify(payload), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
+    except Exception as e:
+        app.logger.error(f"Unexpected error searching transactions for {username}: {str(e)}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@app.route('/users/<username>/transactions/export', methods=['GET'])
+def export_user_transactions(username):
+    """
+    Streams a user's full transaction history as a chunked JSON array, or as
+    NDJSON with ?format=ndjson (or Accept: application/x-ndjson).
+    """
+    db = get_db()
+    if db.check_username_availability(username):
+        return jsonify({"error": f"User '{username}' does not exist."}), 404
+
+    export_format = request.args.get('format')
+    if export_format is None:
+        ndjson_types = ['application/x-ndjson', 'application/jsonl']
+        export_format = 'ndjson' if request.accept_mimetypes.best_match(['application/json'] + ndjson_types) in ndjson_types else 'json'
+    if export_format not in ('json', 'ndjson'):
+        return jsonify({"error": "Invalid export format. Use 'json' or 'ndjson'."}), 400
+
+    ndjson = export_format == 'ndjson'
+    def generate():
+        # The request's connection is returned to the pool when the view
+        # returns, before the body is consumed, so the stream borrows its own.
+        export_db = open_report_db(username)
+        try:
+            yield from stream_transaction_rows(export_db.iter_transactions(username, batch_size=EXPORT_FETCH_SIZE), ndjson=ndjson)
+        finally:
+            export_db.close()
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson' if ndjson else 'application/json')
+
 @app.route('/users/<username>/transactions', methods=['POST'])
 def add_user_transaction(username):
     """Adds a new transaction for a user."""
@@ -97,20 +819,14 @@ def add_user_transaction(username):
     if not data:
         return jsonify({"error": "Invalid JSON payload. Request body is empty or not JSON."}), 400
 
-    required_fields = ['date', 'description', 'category', 'amount', 'type']
-    if not all(field in data for field in required_fields):
-        missing = [field for field in required_fields if field not in data]
+    missing = [field for field in TRANSACTION_FIELDS if field not in data]
+    if missing:
         return jsonify({"error": f"Missing fields: {', '.join(missing)}"}), 400
 
     try:
-        new_transaction = Transaction(
-            date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
-            description=str(data['description']),
-            category=str(data['category']),
-            amount=float(data['amount']),
-            type=TransactionType(data['type'])
-        )
-        transaction_id = db.add_transaction(username, new_transaction)
+        new_transaction = parse_transaction(data)
+        transaction_id = write('add_transaction', username, new_transaction)
+        response_cache.invalidate(username)
         app.logger.info(f"Transaction {transaction_id} added for user: {username}")
         return jsonify({"message": "Transaction added successfully.", "transactionId": transaction_id}), 200
     except ValueError as e:
@@ -120,6 +836,126 @@ def add_user_transaction(username):
         app.logger.error(f"Unexpected error adding transaction for {username}: {str(e)}. Data: {data}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@app.route('/users/<username>/transactions/batch', methods=['POST'])
+def add_user_transactions_batch(username):
+    """
+    Adds many transactions for a user. The body is parsed as it is read
+    and every BATCH_CHUNK_SIZE valid rows are committed by the write queue
+    in one database transaction, so memory stays bounded however many rows
+    it holds. Invalid rows are skipped and reported by their index in the
+    payload. Bodies over MAX_BATCH_BYTES are refused with a 413.
+    """
+    too_large = limit_request_body(MAX_BATCH_BYTES)
+    if too_large is not None:
+        return too_large
+    db = get_db()
+    if db.check_username_availability(username):
+        app.logger.warning(f"Batch add attempt for non-existent user: {username}")
+        return jsonify({"error": f"User '{username}' does not exist. Create the user first."}), 404
+
+    try:
+        if not request.is_json:
+            raise ValueError("Content type is not JSON.")
+        items = iter_json_array(request.stream, key='transactions')
+    except ValueError:
+        return jsonify({"error": "Invalid JSON payload. Expected a list of transactions."}), 400
+
+    errors = []
+    def parse_items():
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "error": "Transaction must be a JSON object."})
+                continue
+            missing = [field for field in TRANSACTION_FIELDS if field not in item]
+            if missing:
+                errors.append({"index": index, "error": f"Missing fields: {', '.join(missing)}"})
+                continue
+            try:
+                yield parse_transaction(item)
+            except (ValueError, TypeError) as e:
+                errors.append({"index": index, "error": f"Invalid data provided: {str(e)}"})
+
+    transactions = parse_items()
+    transaction_ids = []
+    malformed = None
+    try:
+        while True:
+            try:
+                chunk = list(islice(transactions, BATCH_CHUNK_SIZE))
+            except ValueError as e:
+                malformed = e
+                break
+            if not chunk:
+                break
+            transaction_ids.extend(write('add_transactions', username, chunk, BATCH_CHUNK_SIZE))
+    except Exception as e:
+        app.logger.error(f"Unexpected error adding transaction batch for {username}: {str(e)}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+    finally:
+        # Chunks committed before a failure are visible too.
+        response_cache.invalidate(username)
+
+    app.logger.info(f"{len(transaction_ids)} transactions added for user: {username} ({len(errors)} rejected)")
+    body = {
+        "message": f"{len(transaction_ids)} transactions added successfully.",
+        "transactionIds": transaction_ids,
+        "errors": errors
+    }
+    if malformed is not None:
+        return jsonify(dict(body, error=f"Invalid JSON payload: {str(malformed)}")), 400
+    status = 400 if errors and not transaction_ids else 200
+    return jsonify(body), status
+
+@app.route('/users/<username>/transactions/import', methods=['POST'])
+def import_user_transactions(username):
+    """
+    Streams an uploaded CSV or OFX statement into a user's transactions,
+    committing in chunks through the write queue. Columns can be remapped
+    with '<field>_column' form fields. Uploads over MAX_IMPORT_BYTES are
+    refused with a 413.
+    """
+    too_large = limit_request_body(MAX_IMPORT_BYTES)
+    if too_large is not None:
+        return too_large
+    db = get_db()
+    if db.check_username_availability(username):
+        return jsonify({"error": f"User '{username}' does not exist. Create the user first."}), 404
+
+    statement = request.files.get('file')
+    if statement is None:
+        return jsonify({"error": "Missing statement upload in the 'file' field."}), 400
+
+    form = request.form
+    filename = (statement.filename or '').lower()
+    file_format = form.get('format') or ('ofx' if filename.endswith(('.ofx', '.qfx')) else 'csv')
+    try:
+        chunk_size = int(form.get('chunk_size', importer.DEFAULT_CHUNK_SIZE))
+        lines = codecs.iterdecode(statement.stream, form.get('encoding', 'utf-8'))
+        report = importer.import_statement(
+            db, username, lines,
+            file_format=file_format,
+            add_transactions=partial(write, 'add_transactions'),
+            chunk_size=chunk_size,
+            delimiter=form.get('delimiter', ','),
+            progress=lambda report: app.logger.info(f"Import for {username}: {report.imported} rows ({report.rows_per_second:.0f} rows/s)"),
+            columns={field: form.get(f'{field}_column', field) for field in importer.FIELDS},
+            date_format=form.get('date_format', '%Y-%m-%d'),
+            decimal_separator=form.get('decimal_separator', '.'),
+            default_category=form.get('default_category', importer.DEFAULT_CATEGORY),
+        )
+    except (ValueError, LookupError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Invalid import request: {str(e)}"}), 400
+    except Exception as e:
+        app.logger.error(f"Unexpected error importing statement for {username}: {str(e)}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+    finally:
+        # Chunks committed before a failure are visible too.
+        response_cache.invalidate(username)
+
+    app.logger.info(f"Imported {report.imported} of {report.rows} rows for user: {username}")
+    status = 400 if report.failed and not report.imported else 200
+    return jsonify(report.to_dict()), status
+
 @app.route('/users/<username>/transactions/<int:transaction_id>', methods=['PUT'])
 def update_user_transaction(username, transaction_id):
     """Updates an existing transaction for a user."""
@@ -131,20 +967,14 @@ def update_user_transaction(username, transaction_id):
     if not data:
         return jsonify({"error": "Invalid JSON payload."}), 400
 
-    required_fields = ['date', 'description', 'category', 'amount', 'type']
-    if not all(field in data for field in required_fields):
-        missing = [field for field in required_fields if field not in data]
+    missing = [field for field in TRANSACTION_FIELDS if field not in data]
+    if missing:
         return jsonify({"error": f"Missing fields for update: {', '.join(missing)}"}), 400
 
     try:
-        updated_transaction = Transaction(
-            date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
-            description=str(data['description']),
-            category=str(data['category']),
-            amount=float(data['amount']),
-            type=TransactionType(data['type'])
-        )
-        db.update_transaction_by_id(username, transaction_id, updated_transaction)
+        updated_transaction = parse_transaction(data)
+        write('update_transaction_by_id', username, transaction_id, updated_transaction)
+        response_cache.invalidate(username)
         app.logger.info(f"Transaction {transaction_id} updated for user: {username}")
         return jsonify({"message": f"Transaction ID {transaction_id} updated successfully."}), 200
     except ValueError as e:
@@ -160,55 +990,106 @@ def delete_user_transaction(username, transaction_id):
     if db.check_username_availability(username):
         return jsonify({"error": f"User '{username}' does not exist."}), 404
     try:
-        db.delete_transaction_by_id(username, transaction_id)
+        write('delete_transaction_by_id', username, transaction_id)
+        response_cache.invalidate(username)
         app.logger.info(f"Transaction {transaction_id} deleted for user: {username}")
         return jsonify({"message": f"Transaction ID {transaction_id} deleted successfully."}), 200
     except Exception as e:
         app.logger.error(f"Unexpected error deleting transaction {transaction_id} for {username}: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@app.route('/users/<username>/summary', methods=['GET'])
+@cached_response
+def get_user_summary(username):
+    """Gets income, expense and balance totals with per-category and per-month breakdowns."""
+    try:
+        db = get_db()
+        if db.check_username_availability(username):
+            return jsonify({"error": f"User '{username}' does not exist."}), 404
+        summary = db.get_summary(username)
+        with span('jsonify'):
+            return jsonify(summary), 200
+    except Exception as e:
+        app.logger.error(f"Unexpected error getting summary for {username}: {str(e)}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@app.route('/users/<username>/changes', methods=['GET'])
+@cached_response
+def get_user_changes(username):
+    """
+    Gets the user's transactions changed since version ?since=: the current
+    state of changed ones, the ids of deleted ones and the version to pass
+    next time. Without ?since=, only returns the current version. A 'reset'
+    response means the client must reload its listing.
+    """
+    try:
+        since, limit = get_changes_args()
+        db = get_db()
+        if db.check_username_availability(username):
+            return jsonify({"error": f"User '{username}' does not exist."}), 404
+        changes = format_changes(db.get_changes(username, since, limit))
+        with span('jsonify'):
+            return jsonify(changes), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
+    except Exception as e:
+        app.logger.error(f"Unexpected error getting changes for {username}: {str(e)}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
 @app.route('/users/<username>/transactions/category/<category_name>', methods=['GET'])
+@cached_response
 def get_user_transactions_by_category(username, category_name):
     """Gets transactions for a user filtered by category."""
     try:
+        limit, cursor = get_page_args()
         db = get_db()
-        transactions_data = db.get_category_transactions(username, category_name)
-        return jsonify(format_transaction_rows(transactions_data)), 200
+        return list_transactions(lambda **page: db.get_category_transactions(username, category_name, **page), limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Unexpected error getting category '{category_name}' transactions for {username}: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 @app.route('/users/<username>/transactions/debits', methods=['GET'])
+@cached_response
 def get_user_debit_transactions(username):
     """Gets all debit transactions (Despesa) for a user."""
     try:
+        limit, cursor = get_page_args()
         db = get_db()
-        transactions_data = db.get_all_debits(username)
-        return jsonify(format_transaction_rows(transactions_data)), 200
+        return list_transactions(lambda **page: db.get_all_debits(username, **page), limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Unexpected error getting debit transactions for {username}: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 @app.route('/users/<username>/transactions/credits', methods=['GET'])
+@cached_response
 def get_user_credit_transactions(username):
     """Gets all credit transactions (Receita) for a user."""
     try:
+        limit, cursor = get_page_args()
         db = get_db()
-        transactions_data = db.get_all_credits(username)
-        return jsonify(format_transaction_rows(transactions_data)), 200
+        return list_transactions(lambda **page: db.get_all_credits(username, **page), limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Unexpected error getting credit transactions for {username}: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
 @app.route('/users/<username>/transactions/month/<int:year>/<int:month>', methods=['GET'])
+@cached_response
 def get_user_transactions_by_month(username, year, month):
     """Gets transactions for a user filtered by month and year."""
     if not (1 <= month <= 12):
         return jsonify({"error": "Invalid month. Must be between 1 and 12."}), 400
     try:
+        limit, cursor = get_page_args()
         db = get_db()
-        transactions_data = db.get_month_transactions(username, month, year)
-        return jsonify(format_transaction_rows(transactions_data)), 200
+        return list_transactions(lambda **page: db.get_month_transactions(username, month, year, **page), limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Unexpected error getting month {year}-{month} transactions for {username}: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
@@ -0,0 +1,540 @@
+"""
+ASGI entry point with async handlers for the JSON API.
+
+    uvicorn asgi:application --workers 4
+    python serve.py --mode async
+
+The transaction, search, summary, change and user routes are served natively: handlers await
+DatabaseManager calls running on bounded read/write executors, so the event
+loop never blocks on SQLite. Every other path (the HTML page, static files,
+batch insert, statement import/export and stats) is delegated to the Flask
+app on a worker thread, so both serving paths expose the same API.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+
+import app as wsgi
+from src.async_db import AsyncDatabaseManager
+from src.pagination import encode_search_cursor, paginate
+from src.tracing import RequestTimer
+
+READ_THREADS = int(os.environ.get('ASGI_DB_READ_THREADS', 8))
+WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 8))
+MAX_JSON_BODY = 10 * 1024 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+
+logger = logging.getLogger('asgi')
+
+# The request timer of the native handler running in the current context.
+request_timer = contextvars.ContextVar('request_timer', default=None)
+
+_db = None
+_wsgi_executor = None
+
+
+def trace_db(db):
+    """Reports a database's statements to the current request's timer, if any."""
+    timer = request_timer.get()
+    return wsgi.trace_db(db, timer) if timer is not None else db
+
+
+def get_async_db() -> AsyncDatabaseManager:
+    """
+    Returns the process-wide AsyncDatabaseManager, creating it and the
+    Flask app's pools on first use. The pools are sized so every executor
+    thread can hold a pooled connection at once.
+    """
+    global _db
+    if _db is None:
+        pool = wsgi.get_pool(size=max(wsgi.DB_POOL_SIZE, READ_THREADS + 1 + WSGI_THREADS))
+        read_size = max(wsgi.DB_READ_POOL_SIZE, READ_THREADS + WSGI_THREADS)
+        wsgi.get_read_pool(size=read_size)
+        wsgi.get_replica_pool(size=read_size)
+        _db = AsyncDatabaseManager(
+            wsgi.DB_FILE_PATH, pool=pool, layout=wsgi.get_layout(),
+            user_cache=wsgi._user_cache, read_threads=READ_THREADS, write_queue=wsgi.get_write_queue(),
+            db_factory=wsgi.open_db if wsgi.DB_SHARDS > 1 else None, read_factory=wsgi.open_read_db,
+            db_wrapper=trace_db
+        )
+    return _db
+
+
+def get_wsgi_executor() -> ThreadPoolExecutor:
+    global _wsgi_executor
+    if _wsgi_executor is None:
+        _wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='wsgi')
+    return _wsgi_executor
+
+
+def shutdown():
+    """Stops the executors and closes the connection pool. They are recreated on next use."""
+    global _db, _wsgi_executor
+    if _db is not None:
+        _db.close()
+        _db = None
+    if _wsgi_executor is not None:
+        _wsgi_executor.shutdown(wait=True)
+        _wsgi_executor = None
+    wsgi.close_pool()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientDisconnected(Exception):
+    """Raised in a WSGI worker thread once the client of its response has gone."""
+
+
+class Request:
+    def __init__(self, scope, body: bytes, params: dict):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'').decode('latin-1')
+        self.args = MultiDict(parse_qsl(self.query_string))
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+        self.body = body
+        self.params = params
+
+    def get_json(self):
+        if not self.body:
+            return None
+        try:
+            return wsgi.app.json.loads(self.body)
+        except ValueError:
+            return None
+
+
+# --- Handlers ---
+
+async def require_user(db, username, hint=''):
+    if await db.read('check_username_availability', username):
+        raise HttpError(404, f"User '{username}' does not exist.{hint}")
+
+
+async def list_transactions(request, method, *args):
+    limit, cursor = wsgi.get_page_args(request.args)
+    columnar, dictionary = wsgi.get_listing_format(request.args, request.headers.get('accept', ''))
+    db = get_async_db()
+    if limit is None:
+        rows, next_cursor = await db.read(method, *args), None
+    else:
+        rows, next_cursor = paginate(await db.read(method, *args, limit=limit + 1, cursor=cursor), limit)
+    return 200, wsgi.build_listing(rows, next_cursor, limit is not None, columnar, dictionary)
+
+
+async def get_user_transactions(request, username):
+    start = wsgi.parse_date_arg('from', request.args)
+    end = wsgi.parse_date_arg('to', request.args)
+    if start is not None or end is not None:
+        return await list_transactions(request, 'get_transactions_between', username, start, end)
+    return await list_transactions(request, 'get_all_transactions', username)
+
+
+async def get_user_credit_transactions(request, username):
+    return await list_transactions(request, 'get_all_credits', username)
+
+
+async def get_user_debit_transactions(request, username):
+    return await list_transactions(request, 'get_all_debits', username)
+
+
+async def get_user_transactions_by_category(request, username, category_name):
+    return await list_transactions(request, 'get_category_transactions', username, category_name)
+
+
+async def get_user_transactions_by_month(request, username, year, month):
+    year, month = int(year), int(month)
+    if not (1 <= month <= 12):
+        raise HttpError(400, "Invalid month. Must be between 1 and 12.")
+    return await list_transactions(request, 'get_month_transactions', username, month, year)
+
+
+async def search_user_transactions(request, username):
+    query, limit, cursor = wsgi.get_search_args(request.args)
+    columnar, dictionary = wsgi.get_listing_format(request.args, request.headers.get('accept', ''))
+    db = get_async_db()
+    await require_user(db, username)
+    rows = await db.read('search_transactions', username, query, limit=limit + 1, cursor=cursor)
+    rows, next_cursor = paginate(rows, limit, encode_search_cursor)
+    return 200, wsgi.build_search_listing(rows, next_cursor, columnar, dictionary)
+
+
+async def query_user_transactions(request, username):
+    filters, sort, limit, cursor = wsgi.get_query_args(request.args)
+    columnar, dictionary = wsgi.get_listing_format(request.args, request.headers.get('accept', ''))
+    db = get_async_db()
+    await require_user(db, username)
+    rows = await db.read('query_transactions', username, **filters, sort=sort, limit=limit + 1, cursor=cursor)
+    payload = wsgi.build_query_listing(rows, sort, limit, columnar, dictionary)
+    if wsgi.wants_totals(request.args):
+        payload["totals"] = await db.read('query_totals', username, **filters)
+    return 200, payload
+
+
+async def get_user_summary(request, username):
+    db = get_async_db()
+    await require_user(db, username)
+    return 200, await db.read('get_summary', username)
+
+
+async def get_user_changes(request, username):
+    since, limit = wsgi.get_changes_args(request.args)
+    db = get_async_db()
+    await require_user(db, username)
+    return 200, wsgi.format_changes(await db.read('get_changes', username, since, limit))
+
+
+def parse_transaction_payload(request):
+    data = request.get_json()
+    if not data or not isinstance(data, dict):
+        raise HttpError(400, "Invalid JSON payload. Request body is empty or not JSON.")
+    missing = [field for field in wsgi.TRANSACTION_FIELDS if field not in data]
+    if missing:
+        raise HttpError(400, f"Missing fields: {', '.join(missing)}")
+    try:
+        return wsgi.parse_transaction(data)
+    except ValueError as e:
+        raise HttpError(400, f"Invalid data provided: {str(e)}")
+
+
+async def create_user(request, username):
+    db = get_async_db()
+    try:
+        await db.write('create_user_table', username)
+    except ValueError as e:
+        return 200, {"message": str(e)}
+    return 201, {"message": f"User '{username}' created successfully."}
+
+
+async def add_user_transaction(request, username):
+    db = get_async_db()
+    await require_user(db, username, " Create the user first.")
+    transaction = parse_transaction_payload(request)
+    transaction_id = await db.write('add_transaction', username, transaction)
+    wsgi.response_cache.invalidate(username)
+    return 200, {"message": "Transaction added successfully.", "transactionId": transaction_id}
+
+
+async def update_user_transaction(request, username, transaction_id):
+    db = get_async_db()
+    await require_user(db, username)
+    transaction = parse_transaction_payload(request)
+    await db.write('update_transaction_by_id', username, int(transaction_id), transaction)
+    wsgi.response_cache.invalidate(username)
+    return 200, {"message": f"Transaction ID {transaction_id} updated successfully."}
+
+
+async def delete_user_transaction(request, username, transaction_id):
+    db = get_async_db()
+    await require_user(db, username)
+    await db.write('delete_transaction_by_id', username, int(transaction_id))
+    wsgi.response_cache.invalidate(username)
+    return 200, {"message": f"Transaction ID {transaction_id} deleted successfully."}
+
+
+# Routes use the Flask app's rules, which also label their metrics.
+ROUTES = [
+    ('POST', '/users/<username>', create_user, False),
+    ('GET', '/users/<username>/transactions', get_user_transactions, True),
+    ('POST', '/users/<username>/transactions', add_user_transaction, False),
+    ('GET', '/users/<username>/transactions/credits', get_user_credit_transactions, True),
+    ('GET', '/users/<username>/transactions/debits', get_user_debit_transactions, True),
+    ('GET', '/users/<username>/transactions/search', search_user_transactions, True),
+    ('GET', '/users/<username>/transactions/query', query_user_transactions, True),
+    ('GET', '/users/<username>/transactions/category/<category_name>', get_user_transactions_by_category, True),
+    ('GET', '/users/<username>/transactions/month/<int:year>/<int:month>', get_user_transactions_by_month, True),
+    ('PUT', '/users/<username>/transactions/<int:transaction_id>', update_user_transaction, False),
+    ('DELETE', '/users/<username>/transactions/<int:transaction_id>', delete_user_transaction, False),
+    ('GET', '/users/<username>/summary', get_user_summary, True),
+    ('GET', '/users/<username>/changes', get_user_changes, True),
+]
+
+
+def compile_rule(rule: str):
+    """Compiles a Flask rule with <name> and <int:name> parts into a regular expression."""
+    def part(match):
+        pattern = r'\d+' if match.group(1) == 'int' else '[^/]+'
+        return f"(?P<{match.group(2)}>{pattern})"
+    return re.compile(re.sub(r'<(?:(\w+):)?(\w+)>', part, rule) + '$')
+
+
+ROUTES = [(method, rule, compile_rule(rule), handler, cacheable) for method, rule, handler, cacheable in ROUTES]
+
+
+def match_route(method: str, path: str):
+    for route_method, rule, pattern, handler, cacheable in ROUTES:
+        if route_method == method:
+            match = pattern.match(path)
+            if match:
+                return handler, match.groupdict(), rule, cacheable
+    return None
+
+
+# --- ASGI plumbing ---
+
+async def send_response(send, status: int, body: bytes, content_type: str = 'application/json', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            (b'access-control-allow-origin', b'*'),
+            *headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def read_body(receive, limit: int = None) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError("Client disconnected.")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise HttpError(413, "Request body too large.")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+def span(name, description=None):
+    """Times a block as a span of the current request, when it is timed."""
+    timer = request_timer.get()
+    return timer.span(name, description) if timer is not None else nullcontext()
+
+
+async def respond(request, handler, params, cacheable):
+    """Runs a native handler through the response cache. Returns (status, body, headers)."""
+    username = params['username']
+    cache = wsgi.response_cache
+    cacheable = cacheable and wsgi.RESPONSE_CACHE_ENABLED
+    request_key = f"{request.path}{'?' + request.query_string if request.query_string else ''}|{request.headers.get('accept', '')}"
+    with span('response_cache'):
+        version = cache.version(username) if cacheable else None
+        entry = cache.get(username, version, request_key) if cacheable else None
+
+    if entry is None:
+        try:
+            status, payload = await handler(request, **params)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, payload = 400, {"error": f"Invalid request: {str(e)}"}
+        except Exception as e:
+            logger.error(f"Unexpected error on {request.method} {request.path}: {str(e)}")
+            status, payload = 500, {"error": f"An unexpected error occurred: {str(e)}"}
+        with span('jsonify'):
+            body = wsgi.app.json.dumps(payload).encode('utf-8')
+        if not cacheable or status != 200:
+            return status, body, []
+        etag = cache.set(username, version, request_key, body)
+    else:
+        body, etag, _ = entry
+
+    headers = [(b'etag', f'"{etag}"'.encode('latin-1')), (b'cache-control', b'no-cache')]
+    if f'"{etag}"' in request.headers.get('if-none-match', ''):
+        return 304, None, headers
+    return 200, body, headers
+
+
+async def handle_api(scope, receive, send, handler, params, rule, cacheable):
+    """
+    Serves a native route. Like the Flask app, it adds a Server-Timing
+    header and records the request in the metrics registry under its rule.
+    """
+    request = Request(scope, await read_body(receive, MAX_JSON_BODY), params)
+    timer = RequestTimer() if wsgi.INSTRUMENTATION_ENABLED else None
+    token = request_timer.set(timer)
+    try:
+        status, body, headers = await respond(request, handler, params, cacheable)
+    finally:
+        request_timer.reset(token)
+    if timer is not None:
+        headers.append((b'server-timing', timer.server_timing().encode('latin-1')))
+        wsgi.record_request_metrics(timer, request.method, rule, status)
+
+    if body is None:
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    await send_response(send, status, body, headers=headers)
+
+
+def build_environ(scope, body_file, content_length: int) -> dict:
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body_file,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def unless_set(coroutine, event: asyncio.Event):
+    """Awaits `coroutine` unless `event` is set first, in which case it raises ClientDisconnected."""
+    task = asyncio.ensure_future(coroutine)
+    waiter = asyncio.ensure_future(event.wait())
+    try:
+        await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        waiter.cancel()
+    if task.done():
+        return task.result()
+    task.cancel()
+    raise ClientDisconnected()
+
+
+async def watch_disconnect(receive, disconnected: asyncio.Event):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            disconnected.set()
+            return
+
+
+async def handle_wsgi(scope, receive, send):
+    """
+    Runs the Flask app for a request on the WSGI executor. The whole WSGI
+    call, including iterating a streamed body, stays on one thread, and
+    chunks are handed to the event loop through a bounded queue. When the
+    client disconnects or a send fails, the thread stops waiting on the
+    queue and closes the WSGI iterable, returning its pooled connection.
+    """
+    body_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    content_length = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body_file.close()
+            return
+        chunk = message.get('body', b'')
+        body_file.write(chunk)
+        content_length += len(chunk)
+        if not message.get('more_body', False):
+            break
+    body_file.seek(0)
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=8)
+    disconnected = asyncio.Event()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(unless_set(queue.put(item), disconnected), loop).result()
+
+    def run():
+        def start_response(status, headers, exc_info=None):
+            put(('start', int(status.split(' ', 1)[0]), headers))
+        try:
+            iterable = wsgi.app(build_environ(scope, body_file, content_length), start_response)
+            try:
+                for chunk in iterable:
+                    if chunk:
+                        put(('body', chunk))
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+            put(('end',))
+        except ClientDisconnected:
+            pass
+        finally:
+            body_file.close()
+
+    watcher = asyncio.ensure_future(watch_disconnect(receive, disconnected))
+    future = loop.run_in_executor(get_wsgi_executor(), run)
+    try:
+        while True:
+            item = await unless_set(queue.get(), disconnected)
+            if item[0] == 'start':
+                await send({
+                    'type': 'http.response.start',
+                    'status': item[1],
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in item[2]],
+                })
+            elif item[0] == 'body':
+                await send({'type': 'http.response.body', 'body': item[1], 'more_body': True})
+            else:
+                await send({'type': 'http.response.body', 'body': b''})
+                break
+    except (ClientDisconnected, OSError):
+        pass
+    finally:
+        # Also reached when the task is cancelled: the thread must not wait on the queue any longer.
+        disconnected.set()
+        watcher.cancel()
+    await future
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            get_async_db()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.get_running_loop().run_in_executor(None, shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    get_async_db()
+    route = match_route(scope['method'], scope['path'])
+    if route is None:
+        await handle_wsgi(scope, receive, send)
+        return
+    handler, params, rule, cacheable = route
+    try:
+        await handle_api(scope, receive, send, handler, params, rule, cacheable)
+    except HttpError as e:
+        await send_response(send, e.status, wsgi.app.json.dumps({"error": str(e)}).encode('utf-8'))
+    except ConnectionError:
+        pass
@@ -0,0 +1,95 @@
+"""
+Benchmarks the Flask routes in-process through the test client, isolating
+routing, serialization and database time from the network.
+
+Read routes are measured both uncached (the user's response cache is
+invalidated before every call) and from the response cache.
+
+Usage:
+    python -m benchmarks.api_benchmark --rows 100000 --output results/api.json
+"""
+import argparse
+import os
+import random
+import tempfile
+from urllib.parse import quote
+
+import app as flask_app
+from benchmarks.datagen import CATEGORIES, generate_payload, seed_database
+from benchmarks.results import measure, print_table, write_results
+from src.db_manager import DatabaseManager
+
+
+def expect(response, status: int = 200):
+    if response.status_code != status:
+        raise RuntimeError(f"Unexpected status {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def route_benchmarks(client, user: str, repeat: int, rng: random.Random):
+    base = f'/users/{user}'
+    routes = {
+        'GET /transactions?limit=50': lambda: f'{base}/transactions?limit=50',
+        'GET /transactions/category?limit=50': lambda: f'{base}/transactions/category/{quote(rng.choice(CATEGORIES))}?limit=50',
+        'GET /transactions/debits?limit=50': lambda: f'{base}/transactions/debits?limit=50',
+        'GET /transactions/credits?limit=50': lambda: f'{base}/transactions/credits?limit=50',
+        'GET /transactions/month': lambda: f'{base}/transactions/month/{rng.randint(2015, 2024)}/{rng.randint(1, 12)}',
+        'GET /summary': lambda: f'{base}/summary',
+    }
+    results = {}
+    for name, url in routes.items():
+        def uncached():
+            flask_app.response_cache.invalidate(user)
+            expect(client.get(url()))
+        results[name] = measure(uncached, repeat)
+    fixed_url = f'{base}/transactions?limit=50'
+    results['GET /transactions?limit=50 (cached)'] = measure(lambda: expect(client.get(fixed_url)), repeat)
+
+    added = []
+    def add():
+        added.append(expect(client.post(f'{base}/transactions', json=generate_payload(rng))).get_json()['transactionId'])
+    results['POST /transactions'] = measure(add, repeat)
+    batch = [generate_payload(rng) for _ in range(1000)]
+    results['POST /transactions/batch (1000 rows)'] = measure(
+        lambda: added.extend(expect(client.post(f'{base}/transactions/batch', json=batch)).get_json()['transactionIds']),
+        max(1, repeat // 20)
+    )
+    results['PUT /transactions/<id>'] = measure(
+        lambda: expect(client.put(f'{base}/transactions/{rng.choice(added)}', json=generate_payload(rng))), repeat
+    )
+    results['DELETE /transactions/<id>'] = measure(lambda: expect(client.delete(f'{base}/transactions/{added.pop()}')), repeat)
+    results['GET /transactions/export'] = measure(lambda: expect(client.get(f'{base}/transactions/export')).get_data(), max(1, repeat // 20))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        flask_app.DB_FILE_PATH = os.path.join(directory, 'bench.db')
+        db = DatabaseManager(flask_app.DB_FILE_PATH, layout=flask_app.get_layout())
+        try:
+            users = seed_database(db, args.users, args.rows, seed=args.seed)
+        finally:
+            db.close()
+        try:
+            client = flask_app.app.test_client()
+            results = route_benchmarks(client, users[0], args.repeat, random.Random(args.seed))
+        finally:
+            flask_app.close_pool()
+
+    print_table(results)
+    if args.output:
+        parameters = {'rows': args.rows, 'users': args.users, 'repeat': args.repeat, 'seed': args.seed}
+        write_results(args.output, 'api', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
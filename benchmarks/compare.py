@@ -0,0 +1,79 @@
+"""
+Compares two benchmark result files (or directories of them) written by the
+benchmarks and reports regressions in throughput and latency.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --threshold 0.10
+    python -m benchmarks.compare results/abc123 results/def456
+
+Exits with status 1 when any benchmark regressed by more than the threshold.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Metric name -> True when higher is better.
+METRICS = {
+    'ops_per_sec': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+}
+
+
+def load(path: str) -> dict:
+    """Returns {(benchmark, name): result} for a result file or a directory of them."""
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.json'))
+    results = {}
+    for result_path in paths:
+        with open(result_path, encoding='utf-8') as result_file:
+            document = json.load(result_file)
+        for name, result in document['results'].items():
+            results[(document['benchmark'], name)] = result
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10):
+    """
+    Returns one row per shared benchmark and metric as (benchmark, name,
+    metric, baseline, current, change, regressed). `change` is the relative
+    change, signed so that positive is always an improvement.
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        for metric, higher_is_better in METRICS.items():
+            before = baseline[key].get(metric)
+            after = current[key].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if not higher_is_better:
+                change = -change
+            rows.append((*key, metric, before, after, change, change < -threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative change counted as a regression.")
+    parser.add_argument('--all', action='store_true', help="Show every metric, not only changes beyond the threshold.")
+    args = parser.parse_args(argv)
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    regressions = [row for row in rows if row[-1]]
+    print(f"{'benchmark':<50}{'metric':>12}{'baseline':>12}{'current':>12}{'change':>9}")
+    for benchmark, name, metric, before, after, change, regressed in rows:
+        if args.all or abs(change) > args.threshold:
+            marker = '  REGRESSION' if regressed else ''
+            print(f"{benchmark + ': ' + name:<50}{metric:>12}{before:>12.3f}{after:>12.3f}{change:>+8.1%}{marker}")
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} across {len(rows)} comparisons.")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Deterministic synthetic users and transactions for the benchmarks.
+"""
+import random
+from datetime import date, timedelta
+
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+
+CATEGORIES = ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Lazer', 'Educação', 'Trabalho', 'Outros']
+FIRST_DAY = date(2015, 1, 1)
+DAYS = 3650
+
+
+def generate_transactions(rows: int, seed: int = 42):
+    """Yields `rows` transactions spread over ten years, reproducible for a given seed."""
+    rng = random.Random(seed)
+    types = [TransactionType('Receita'), TransactionType('Despesa')]
+    for index in range(rows):
+        yield Transaction(
+            date=FIRST_DAY + timedelta(days=rng.randrange(DAYS)),
+            description=f"Transaction {index}",
+            category=rng.choice(CATEGORIES),
+            amount=round(rng.uniform(1, 5000), 2),
+            type=rng.choice(types),
+        )
+
+
+def generate_payload(rng: random.Random) -> dict:
+    """Returns one random transaction as the JSON payload accepted by the API."""
+    day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+    return {
+        'date': day.isoformat(),
+        'description': 'Benchmark',
+        'category': rng.choice(CATEGORIES),
+        'amount': round(rng.uniform(1, 5000), 2),
+        'type': rng.choice(['Receita', 'Despesa']),
+    }
+
+
+def user_names(users: int, prefix: str = 'bench_user'):
+    return [f'{prefix}_{index}' for index in range(users)]
+
+
+def seed_database(db, users: int, rows: int, seed: int = 42, chunk_size: int = 10_000):
+    """
+    Creates `users` users and spreads `rows` transactions evenly across them
+    through DatabaseManager.add_transactions. Returns the user names.
+    """
+    names = user_names(users)
+    per_user, remainder = divmod(rows, users)
+    for index, name in enumerate(names):
+        if db.check_username_availability(name):
+            db.create_user_table(name)
+        count = per_user + (1 if index < remainder else 0)
+        db.add_transactions(name, generate_transactions(count, seed + index), chunk_size=chunk_size)
+    return names
@@ -0,0 +1,132 @@
+"""
+Micro-benchmarks every DatabaseManager read and write method against a
+synthetic database.
+
+Usage:
+    python -m benchmarks.db_benchmark --scale medium --output results/db.json
+    python -m benchmarks.db_benchmark --rows 10000000 --database /tmp/bench.db
+
+--database keeps the seeded file, so large scales are only generated once.
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import timedelta
+
+from benchmarks.datagen import CATEGORIES, DAYS, FIRST_DAY, generate_transactions, seed_database, user_names
+from benchmarks.results import measure, print_table, write_results
+from src.db_manager import DatabaseManager
+from src.storage import create_layout
+
+SCALES = {
+    'small': 10_000,
+    'medium': 100_000,
+    'large': 1_000_000,
+    'huge': 10_000_000,
+}
+WRITER = 'bench_writer'
+
+
+def id_range(db: DatabaseManager, user: str):
+    conditions, parameters = db._scope(user, [], [])
+    query = f"SELECT MIN(id), MAX(id) FROM {db.layout.table(user)}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    db.cursor.execute(query, parameters)
+    return db.cursor.fetchone()
+
+
+def week(rng: random.Random):
+    start = FIRST_DAY + timedelta(days=rng.randrange(DAYS - 7))
+    return start, start + timedelta(days=6)
+
+
+def read_benchmarks(db: DatabaseManager, users, repeat: int, rng: random.Random):
+    user = users[0]
+    low, high = id_range(db, user)
+    rows_per_user = high - low + 1 if low is not None else 0
+
+    def random_month():
+        return rng.randint(1, 12), rng.randint(2015, 2024)
+
+    benchmarks = {
+        'check_username_availability': lambda: db.check_username_availability(rng.choice(users)),
+        'get_transaction_by_id': lambda: db.get_transaction_by_id(user, rng.randint(low, high)),
+        'get_all_transactions (page of 50)': lambda: db.get_all_transactions(user, limit=51),
+        'get_category_transactions (page of 50)': lambda: db.get_category_transactions(user, rng.choice(CATEGORIES), limit=51),
+        'get_all_debits (page of 50)': lambda: db.get_all_debits(user, limit=51),
+        'get_all_credits (page of 50)': lambda: db.get_all_credits(user, limit=51),
+        'get_month_transactions': lambda: db.get_month_transactions(user, *random_month()),
+        'get_month_transactions (page of 50)': lambda: db.get_month_transactions(user, *random_month(), limit=51),
+        'get_transactions_between (one week)': lambda: db.get_transactions_between(user, *week(rng)),
+        'get_summary': lambda: db.get_summary(user),
+        'search_transactions (one description, page of 50)':
+            lambda: db.search_transactions(user, f"transaction {rng.randrange(rows_per_user * len(users))}", limit=51),
+        'search_transactions (one category, page of 50)': lambda: db.search_transactions(user, rng.choice(CATEGORIES), limit=51),
+    }
+    results = {name: measure(operation, repeat) for name, operation in benchmarks.items()}
+
+    # Full scans are proportional to the user's size, so they get fewer runs.
+    full_repeat = max(1, min(repeat, 2_000_000 // max(rows_per_user, 1)))
+    results['get_all_transactions (all rows)'] = measure(lambda: db.get_all_transactions(user), full_repeat)
+    results['get_category_transactions (all rows)'] = measure(lambda: db.get_category_transactions(user, rng.choice(CATEGORIES)), full_repeat)
+    results['iter_transactions (all rows)'] = measure(lambda: sum(len(rows) for rows in db.iter_transactions(user)), full_repeat)
+    results['rebuild_summary (all rows)'] = measure(lambda: db.rebuild_summary(user), full_repeat)
+    return results
+
+
+def write_benchmarks(db: DatabaseManager, repeat: int, rng: random.Random):
+    if db.check_username_availability(WRITER):
+        db.create_user_table(WRITER)
+    transactions = iter(generate_transactions(repeat * 4 + 10, seed=rng.randrange(1 << 30)))
+    added = []
+
+    def add():
+        added.append(db.add_transaction(WRITER, next(transactions)))
+
+    results = {'add_transaction': measure(add, repeat)}
+    batch = list(generate_transactions(1000, seed=7))
+    results['add_transactions (batch of 1000)'] = measure(lambda: added.extend(db.add_transactions(WRITER, batch)), max(1, repeat // 20))
+    results['update_transaction_by_id'] = measure(lambda: db.update_transaction_by_id(WRITER, rng.choice(added), next(transactions)), repeat)
+    results['delete_transaction_by_id'] = measure(lambda: db.delete_transaction_by_id(WRITER, added.pop()), repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--rows', type=int, help="Total seeded rows; overrides --scale.")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--storage', choices=['per_user', 'shared'], default='per_user')
+    parser.add_argument('--encoding', choices=['real', 'cents', 'compact'], default='real')
+    parser.add_argument('--database', help="Database file to seed once and reuse (default: a temporary file).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+    rows = args.rows if args.rows is not None else SCALES[args.scale]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.database or os.path.join(directory, 'bench.db')
+        db = DatabaseManager(path, layout=create_layout(args.storage, args.encoding))
+        try:
+            users = user_names(args.users)
+            if db.check_username_availability(users[-1]):
+                print(f"Seeding {rows} rows across {args.users} users...")
+                seed_database(db, args.users, rows, seed=args.seed)
+            rng = random.Random(args.seed)
+            results = read_benchmarks(db, users, args.repeat, rng)
+            results.update(write_benchmarks(db, args.repeat, rng))
+        finally:
+            db.close()
+
+    print_table(results)
+    parameters = {'rows': rows, 'users': args.users, 'repeat': args.repeat, 'storage': args.storage, 'encoding': args.encoding, 'seed': args.seed}
+    if args.output:
+        write_results(args.output, 'db', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Measures how long each JSON backend takes to serialize transaction listings,
+reported per 100k rows, in the row-dictionary and columnar formats.
+
+'flask-default' is the previous path: dates converted to ISO strings in
+Python, then Flask's DefaultJSONProvider (sorted keys, ASCII escaping).
+
+Usage:
+    python -m benchmarks.json_benchmark --rows 100000 --output results/json.json
+"""
+import argparse
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app import format_transaction_columns, format_transaction_rows
+from benchmarks.datagen import generate_transactions
+from benchmarks.results import measure, write_results
+from src.json_provider import FastJSONProvider, available_backends
+
+
+def transaction_rows(rows: int, seed: int = 42):
+    """Returns rows shaped like DatabaseManager results, with date objects."""
+    return [
+        (transaction.date, transaction.description, transaction.category, transaction.amount, transaction.type.get_type(), index)
+        for index, transaction in enumerate(generate_transactions(rows, seed=seed), start=1)
+    ]
+
+
+def flask_default(rows, columnar: bool) -> bytes:
+    provider = DefaultJSONProvider(Flask(__name__))
+    rows = [(row[0].isoformat(),) + row[1:] for row in rows]
+    document = format_transaction_columns(rows, True) if columnar else format_transaction_rows(rows)
+    return provider.dumps(document).encode('utf-8')
+
+
+def serializers():
+    app = Flask(__name__)
+    backends = {'flask-default': flask_default}
+    for backend in available_backends():
+        provider = FastJSONProvider(app, backend=backend)
+
+        def serialize(rows, columnar, provider=provider):
+            document = format_transaction_columns(rows, True) if columnar else format_transaction_rows(rows)
+            return provider.dumps_bytes(document)
+        backends[backend] = serialize
+    return backends
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    rows = transaction_rows(args.rows, args.seed)
+    scale = 100_000 / max(args.rows, 1)
+    results = {}
+    print(f"{'backend':<32}{'ms / 100k rows':>16}{'MB / 100k rows':>16}")
+    for name, serialize in serializers().items():
+        for columnar in (False, True):
+            label = f"{name} ({'columnar' if columnar else 'rows'})"
+            size = len(serialize(rows, columnar))
+            result = measure(lambda: serialize(rows, columnar), args.repeat, warmup=0)
+            result['ms_per_100k_rows'] = round(result['p50_ms'] * scale, 3)
+            result['bytes_per_100k_rows'] = round(size * scale)
+            results[label] = result
+            print(f"{label:<32}{result['ms_per_100k_rows']:>16.1f}{result['bytes_per_100k_rows'] / 1e6:>16.2f}")
+
+    parameters = {'rows': args.rows, 'repeat': args.repeat, 'seed': args.seed}
+    if args.output:
+        write_results(args.output, 'json', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Minimal threaded HTTP load generator shared by the serving benchmarks.
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.results import summarize
+
+
+class LoadResult:
+    def __init__(self, latencies, errors: int, elapsed: float):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    def to_dict(self) -> dict:
+        return dict(summarize(self.latencies, self.elapsed), errors=self.errors)
+
+
+def request(base_url: str, method: str, path: str, payload=None, timeout: float = 30.0):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        req.add_header('Content-Type', 'application/json')
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def run_load(base_url: str, next_request, concurrency: int = 16, duration: float = 10.0) -> LoadResult:
+    """
+    Runs `concurrency` client threads for `duration` seconds. Each iteration
+    calls `next_request(worker, iteration)` for a (method, path, payload)
+    tuple and times the full request. Non-2xx responses count as errors.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        local_latencies = []
+        local_errors = 0
+        iteration = 0
+        while time.perf_counter() < deadline:
+            method, path, payload = next_request(worker_id, iteration)
+            iteration += 1
+            start = time.perf_counter()
+            try:
+                request(base_url, method, path, payload)
+                local_latencies.append(time.perf_counter() - start)
+            except (urllib.error.URLError, OSError):
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return LoadResult(latencies, errors[0], time.perf_counter() - started)
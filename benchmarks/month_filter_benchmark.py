@@ -0,0 +1,70 @@
+"""
+Compares the legacy strftime() month filter against the index-friendly range
+predicate, before and after the filter indexes are created.
+
+Usage:
+    python -m benchmarks.month_filter_benchmark --rows 1000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.datagen import generate_transactions
+from src.db_manager import DatabaseManager
+
+USER = 'bench_user'
+
+
+def time_query(db: DatabaseManager, query: str, parameters, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.cursor.execute(query, parameters)
+        count = len(db.cursor.fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, 'bench.db'))
+        db.cursor.execute(f"CREATE TABLE {USER} (date, description, category, amount, type, id INTEGER PRIMARY KEY)")
+        start = time.perf_counter()
+        db.add_transactions(USER, generate_transactions(args.rows), chunk_size=10_000)
+        print(f"Loaded {args.rows} rows in {time.perf_counter() - start:.1f}s\n")
+
+        queries = [
+            ("month, strftime()", f"SELECT * FROM {USER} WHERE strftime('%m', date) = ? AND strftime('%Y', date) = ?", ('06', '2020')),
+            ("month, date range", f"SELECT * FROM {USER} WHERE date >= ? AND date < ?", ('2020-06-01', '2020-07-01')),
+            ("category, all rows", f"SELECT * FROM {USER} WHERE category = ?", ('Saúde',)),
+            ("category, newest 50", f"SELECT * FROM {USER} WHERE category = ? ORDER BY date DESC, id DESC LIMIT 50", ('Saúde',)),
+            ("type, newest 50", f"SELECT * FROM {USER} WHERE type = ? ORDER BY date DESC, id DESC LIMIT 50", ('Despesa',)),
+        ]
+
+        results = {}
+        for label in ('scan', 'indexed'):
+            if label == 'indexed':
+                start = time.perf_counter()
+                db.create_indexes(USER)
+                db.cursor.execute("ANALYZE")
+                print(f"Created indexes in {time.perf_counter() - start:.1f}s\n")
+            for name, query, parameters in queries:
+                results[(name, label)] = time_query(db, query, parameters, args.repeat)
+        db.close()
+
+    print(f"{'query':<22}{'rows':>10}{'scan ms':>12}{'indexed ms':>12}{'speedup':>10}")
+    for name, _, _ in queries:
+        scan_ms, count = results[(name, 'scan')]
+        indexed_ms, _ = results[(name, 'indexed')]
+        print(f"{name:<22}{count:>10}{scan_ms:>12.1f}{indexed_ms:>12.1f}{scan_ms / indexed_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Latency summaries and JSON result files shared by the benchmarks, so runs
+on different commits can be compared with benchmarks.compare.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(timings, elapsed: float = None) -> dict:
+    """
+    Summarizes per-operation timings in seconds as milliseconds. Throughput
+    uses the wall-clock `elapsed` when given (concurrent runs), otherwise the
+    sum of the timings.
+    """
+    timings = sorted(timings)
+    total = elapsed if elapsed is not None else sum(timings)
+    return {
+        'ops': len(timings),
+        'ops_per_sec': round(len(timings) / total, 1) if total else 0.0,
+        'mean_ms': round(statistics.mean(timings) * 1000, 3) if timings else 0.0,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        'max_ms': round(timings[-1] * 1000, 3) if timings else 0.0,
+    }
+
+
+def measure(operation, repeat: int, warmup: int = 1) -> dict:
+    """Calls `operation` `warmup` times untimed, then `repeat` times timed."""
+    for _ in range(warmup):
+        operation()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def environment() -> dict:
+    return {
+        'commit': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def write_results(path: str, benchmark: str, parameters: dict, results: dict):
+    """Writes one benchmark run as JSON: environment, parameters and named results."""
+    document = {
+        'benchmark': benchmark,
+        'environment': environment(),
+        'parameters': parameters,
+        'results': results,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(document, output, indent=2, ensure_ascii=False)
+    return document
+
+
+def print_table(results: dict):
+    print(f"{'benchmark':<40}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<40}{result['ops_per_sec']:>12.1f}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}")
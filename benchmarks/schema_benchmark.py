@@ -0,0 +1,87 @@
+"""
+Compares the value encodings on the same data: a database is seeded once in
+the original 'real' encoding, copied and migrated to each other encoding,
+vacuumed, and then measured for on-disk size and query latency.
+
+Usage:
+    python -m benchmarks.schema_benchmark --rows 1000000 --output results/schema.json
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.datagen import seed_database, user_names
+from benchmarks.db_benchmark import read_benchmarks
+from benchmarks.results import write_results
+from src.db_manager import DatabaseManager
+from src.migrations import convert_encoding
+from src.storage import ENCODINGS, create_encoding, create_layout
+
+
+def database_size(path: str) -> int:
+    return sum(os.path.getsize(name) for name in (path, f"{path}-wal") if os.path.exists(name))
+
+
+def prepare(seeded: str, path: str, storage: str, encoding: str):
+    """Copies the seeded database to `path`, migrates it to `encoding` and vacuums it."""
+    shutil.copyfile(seeded, path)
+    db = DatabaseManager(path, layout=create_layout(storage))
+    try:
+        if encoding != 'real':
+            convert_encoding(db, create_encoding(encoding))
+        db.cursor.execute("VACUUM")
+        db.cursor.execute("ANALYZE")
+        db.commit()
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--storage', choices=['per_user', 'shared'], default='per_user')
+    parser.add_argument('--encodings', nargs='+', choices=sorted(ENCODINGS), default=['real', 'cents', 'compact'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        seeded = os.path.join(directory, 'seeded.db')
+        print(f"Seeding {args.rows} rows across {args.users} users...")
+        db = DatabaseManager(seeded, layout=create_layout(args.storage))
+        try:
+            seed_database(db, args.users, args.rows, seed=args.seed)
+        finally:
+            db.close()
+
+        for encoding in args.encodings:
+            path = os.path.join(directory, f'{encoding}.db')
+            prepare(seeded, path, args.storage, encoding)
+            size = database_size(path)
+            db = DatabaseManager(path, layout=create_layout(args.storage, encoding))
+            try:
+                queries = read_benchmarks(db, user_names(args.users), args.repeat, random.Random(args.seed))
+            finally:
+                db.close()
+            results[encoding] = {'bytes': size, 'bytes_per_row': round(size / max(args.rows, 1), 1), 'queries': queries}
+
+    print(f"\n{'on-disk size':<40}" + ''.join(f"{encoding:>14}" for encoding in results))
+    print(f"{'MB':<40}" + ''.join(f"{result['bytes'] / 1e6:>14.1f}" for result in results.values()))
+    print(f"{'bytes per row':<40}" + ''.join(f"{result['bytes_per_row']:>14.1f}" for result in results.values()))
+    print(f"\n{'p50 ms':<40}" + ''.join(f"{encoding:>14}" for encoding in results))
+    for name in next(iter(results.values()))['queries']:
+        print(f"{name:<40}" + ''.join(f"{result['queries'][name]['p50_ms']:>14.3f}" for result in results.values()))
+
+    parameters = {'rows': args.rows, 'users': args.users, 'repeat': args.repeat, 'storage': args.storage, 'seed': args.seed}
+    if args.output:
+        write_results(args.output, 'schema', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
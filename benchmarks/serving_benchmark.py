@@ -0,0 +1,122 @@
+"""
+Compares requests/s and tail latency of the sync (WSGI) and async (ASGI)
+serving paths under the same mixed read/write load.
+
+Each mode is started with serve.py in a fresh temporary directory, seeded
+with users and transactions, then driven by concurrent clients issuing
+paginated listings, summaries and inserts.
+
+Usage:
+    python -m benchmarks.serving_benchmark --concurrency 32 --duration 15 --output results/serving.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+from urllib.parse import quote
+
+from benchmarks.datagen import CATEGORIES, generate_payload
+from benchmarks.load import request, run_load
+from benchmarks.results import REPO_ROOT, print_table, write_results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url: str, process, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}.")
+        try:
+            request(base_url, 'GET', '/stats/pool', timeout=1.0)
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start in time.")
+
+
+def seed(base_url: str, users, rows_per_user: int):
+    rng = random.Random(7)
+    for user in users:
+        request(base_url, 'POST', f'/users/{user}')
+        batch = [generate_payload(rng) for _ in range(rows_per_user)]
+        request(base_url, 'POST', f'/users/{user}/transactions/batch', batch)
+
+
+def mixed_requests(users, write_ratio: float):
+    def next_request(worker: int, iteration: int):
+        rng = random.Random(worker * 1_000_003 + iteration)
+        user = users[rng.randrange(len(users))]
+        if rng.random() < write_ratio:
+            return 'POST', f'/users/{user}/transactions', generate_payload(rng)
+        return rng.choice([
+            ('GET', f'/users/{user}/transactions?limit=50', None),
+            ('GET', f'/users/{user}/transactions/category/{quote(rng.choice(CATEGORIES))}?limit=50', None),
+            ('GET', f'/users/{user}/transactions/month/{rng.randint(2015, 2024)}/{rng.randint(1, 12)}?limit=50', None),
+            ('GET', f'/users/{user}/summary', None),
+        ])
+    return next_request
+
+
+def run_mode(mode: str, args) -> dict:
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, 'serve.py'), '--mode', mode, '--host', '127.0.0.1',
+             '--port', str(port), '--workers', str(args.workers), '--threads', str(args.threads)],
+            cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(base_url, process)
+            users = [f'load_user_{index}' for index in range(args.users)]
+            seed(base_url, users, args.rows)
+            result = run_load(base_url, mixed_requests(users, args.write_ratio), args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return result.to_dict()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=2000, help="Transactions seeded per user.")
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = run_mode(mode, args)
+        print(f"{mode:>5}: {json.dumps(results[mode])}")
+
+    print_table(results)
+    if len(results) == 2 and results['sync']['ops_per_sec']:
+        sync, async_ = results['sync'], results['async']
+        print(f"\nasync/sync req/s: {async_['ops_per_sec'] / sync['ops_per_sec']:.2f}x, "
+              f"p99: {sync['p99_ms']:.1f} ms -> {async_['p99_ms']:.1f} ms")
+    if args.output:
+        parameters = {key: value for key, value in vars(args).items() if key != 'output'}
+        write_results(args.output, 'serving', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
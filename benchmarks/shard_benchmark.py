@@ -0,0 +1,92 @@
+"""
+Measures concurrent write throughput through the group-commit write queues
+at several shard counts. Client threads add transactions for random users
+for a fixed duration; each shard commits on its own writer thread.
+
+Usage:
+    python -m benchmarks.shard_benchmark --shards 1 2 4 8 --duration 5 --output results/shards.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from functools import partial
+
+from benchmarks.datagen import generate_transactions, user_names
+from benchmarks.results import summarize, write_results
+from src.db_manager import DatabaseManager
+from src.sharding import ShardedDatabaseManager, ShardedWriteQueue, ShardMap
+from src.write_queue import WriteQueue
+
+
+def open_writer(path: str) -> DatabaseManager:
+    db = DatabaseManager(path)
+    db.connection.execute("PRAGMA journal_mode = WAL")
+    return db
+
+
+def run(directory: str, shards: int, users, concurrency: int, duration: float, seed: int) -> dict:
+    shard_map = ShardMap(os.path.join(directory, f'shards-{shards}.db'), shards)
+    db = ShardedDatabaseManager(shard_map)
+    try:
+        for user in users:
+            db.create_user_table(user)
+    finally:
+        db.close()
+
+    write_queue = ShardedWriteQueue(shard_map, [WriteQueue(partial(open_writer, path)) for path in shard_map.paths])
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(worker: int):
+        rng = random.Random(seed + worker)
+        transactions = generate_transactions(10 ** 9, seed=seed + worker)
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            write_queue.submit('add_transaction', rng.choice(users), next(transactions)).result()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    write_queue.close()
+    return dict(summarize(latencies, elapsed), avg_batch=write_queue.stats()['avg_batch'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--users', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    users = user_names(args.users)
+    results = {}
+    print(f"{'shards':<10}{'writes/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for shards in args.shards:
+            result = run(directory, shards, users, args.concurrency, args.duration, args.seed)
+            results[f'{shards} shards'] = result
+            print(f"{shards:<10}{result['ops_per_sec']:>12.1f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['avg_batch']:>12.1f}")
+
+    parameters = {'users': args.users, 'concurrency': args.concurrency, 'duration': args.duration, 'seed': args.seed}
+    if args.output:
+        write_results(args.output, 'shards', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
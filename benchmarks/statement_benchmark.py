@@ -0,0 +1,94 @@
+"""
+Measures what the prepared-statement cache saves. The same mix of listing,
+filter and summary reads runs for random users on connections keeping 0
+(every statement prepared on each call), sqlite3's default 128 and larger
+numbers of cached statements. Per-user tables give every user their own
+statements, so the cache must hold about users x statement shapes to hit.
+
+Usage:
+    python -m benchmarks.statement_benchmark --users 40 --cached 0 128 1024 --output results/statements.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.datagen import CATEGORIES, seed_database, user_names
+from benchmarks.results import summarize, write_results
+from src.db_manager import DatabaseManager
+from src.storage import create_layout
+from src.user_cache import UserCache
+
+PAGE_SIZE = 20
+
+
+def operations(db: DatabaseManager, rng: random.Random):
+    """The read mix, as callables taking a username."""
+    return [
+        lambda user: db.get_all_transactions(user, limit=PAGE_SIZE),
+        lambda user: db.get_all_transactions(user, limit=PAGE_SIZE, cursor=('2024-06-01', 10 ** 9)),
+        lambda user: db.get_all_debits(user, limit=PAGE_SIZE),
+        lambda user: db.get_all_credits(user, limit=PAGE_SIZE),
+        lambda user: db.get_category_transactions(user, rng.choice(CATEGORIES), limit=PAGE_SIZE),
+        lambda user: db.get_month_transactions(user, rng.randint(1, 12), 2024, limit=PAGE_SIZE),
+        lambda user: db.get_summary(user),
+    ]
+
+
+def run(path: str, storage: str, users, cached_statements: int, repeat: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    db = DatabaseManager(path, layout=create_layout(storage), user_cache=UserCache(), cached_statements=cached_statements)
+    try:
+        mix = operations(db, rng)
+        for user in users:
+            for operation in mix:
+                operation(user)
+        timings = []
+        for _ in range(repeat):
+            user = rng.choice(users)
+            operation = rng.choice(mix)
+            start = time.perf_counter()
+            operation(user)
+            timings.append(time.perf_counter() - start)
+    finally:
+        db.close()
+    return summarize(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--rows', type=int, default=20_000, help="Transactions across all users.")
+    parser.add_argument('--storage', choices=['per_user', 'shared'], nargs='+', default=['per_user', 'shared'])
+    parser.add_argument('--cached', type=int, nargs='+', default=[0, 128, 1024], help="cached_statements sizes to compare.")
+    parser.add_argument('--repeat', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    users = user_names(args.users)
+    results = {}
+    print(f"{'storage':<10}{'cached':>8}{'ops/s':>12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for storage in args.storage:
+            path = os.path.join(directory, f'{storage}.db')
+            db = DatabaseManager(path, layout=create_layout(storage))
+            try:
+                seed_database(db, args.users, args.rows, seed=args.seed)
+            finally:
+                db.close()
+            for cached_statements in args.cached:
+                result = run(path, storage, users, cached_statements, args.repeat, args.seed)
+                results[f'{storage} cached={cached_statements}'] = result
+                print(f"{storage:<10}{cached_statements:>8}{result['ops_per_sec']:>12.1f}{result['mean_ms']:>10.4f}"
+                      f"{result['p50_ms']:>10.4f}{result['p99_ms']:>10.4f}")
+
+    parameters = {'users': args.users, 'rows': args.rows, 'repeat': args.repeat, 'seed': args.seed}
+    if args.output:
+        write_results(args.output, 'statements', parameters, results)
+    return results
+
+
+if __name__ == '__main__':
+    main()
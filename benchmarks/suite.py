@@ -0,0 +1,53 @@
+"""
+Runs the DatabaseManager, in-process API, JSON serialization and HTTP
+serving benchmarks at one scale and writes their JSON results to a
+directory named after the commit.
+
+Usage:
+    python -m benchmarks.suite --scale medium
+    python -m benchmarks.compare benchmark-results/<old> benchmark-results/<new>
+
+Scales: small (10k rows), medium (100k), large (1M), huge (10M).
+"""
+import argparse
+import os
+
+from benchmarks import api_benchmark, db_benchmark, json_benchmark, serving_benchmark
+from benchmarks.results import git_revision
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=db_benchmark.SCALES, default='small')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of HTTP load per serving mode.")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--skip-http', action='store_true', help="Skip the HTTP serving benchmark.")
+    parser.add_argument('--output-dir', default=None, help="Defaults to benchmark-results/<commit>.")
+    args = parser.parse_args(argv)
+
+    rows = db_benchmark.SCALES[args.scale]
+    output_dir = args.output_dir or os.path.join('benchmark-results', git_revision())
+    common = ['--users', str(args.users), '--repeat', str(args.repeat)]
+
+    print(f"== DatabaseManager ({rows} rows) ==")
+    db_benchmark.main(['--rows', str(rows), *common, '--output', os.path.join(output_dir, 'db.json')])
+    print(f"\n== Flask routes, test client ({rows} rows) ==")
+    api_benchmark.main(['--rows', str(rows), *common, '--output', os.path.join(output_dir, 'api.json')])
+    print("\n== JSON serialization ==")
+    json_benchmark.main(['--rows', str(min(rows, 100_000)), '--output', os.path.join(output_dir, 'json.json')])
+    if not args.skip_http:
+        # HTTP seeding goes through the API, so it is capped to keep runs short.
+        rows_per_user = min(rows // args.users, 5000)
+        print(f"\n== HTTP load, {args.concurrency} clients ==")
+        serving_benchmark.main([
+            '--users', str(args.users), '--rows', str(rows_per_user),
+            '--duration', str(args.duration), '--concurrency', str(args.concurrency),
+            '--output', os.path.join(output_dir, 'serving.json'),
+        ])
+    print(f"\nResults written to {output_dir}")
+
+
+if __name__ == '__main__':
+    main()
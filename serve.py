@@ -0,0 +1,89 @@
+"""
+Production launcher.
+
+    python serve.py --mode sync --workers 4 --threads 8     # Flask app (WSGI)
+    python serve.py --mode async --workers 4 --threads 8    # asgi.application
+
+The sync mode uses gunicorn when installed, then waitress, then Werkzeug's
+threaded server. The async mode requires uvicorn.
+
+The response cache is kept in each worker's memory, where writes handled by
+other workers cannot invalidate it, so it is turned off with more than one
+worker.
+"""
+import argparse
+import os
+import sys
+
+
+def serve_sync(host: str, port: int, workers: int, threads: int):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is not None:
+        from app import app
+
+        class Application(BaseApplication):
+            def load_config(self):
+                self.cfg.set('bind', f'{host}:{port}')
+                self.cfg.set('workers', workers)
+                self.cfg.set('threads', threads)
+                self.cfg.set('worker_class', 'gthread')
+
+            def load(self):
+                return app
+
+        Application().run()
+        return
+
+    from app import app
+    try:
+        import waitress
+    except ImportError:
+        waitress = None
+    if waitress is not None:
+        waitress.serve(app, host=host, port=port, threads=threads)
+        return
+
+    from werkzeug.serving import run_simple
+    run_simple(host, port, app, threaded=True)
+
+
+def serve_async(host: str, port: int, workers: int, threads: int):
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The async mode requires uvicorn: pip install uvicorn")
+    os.environ.setdefault('ASGI_DB_READ_THREADS', str(threads))
+    os.environ.setdefault('ASGI_WSGI_THREADS', str(threads))
+    uvicorn.run('asgi:application', host=host, port=port, workers=workers, log_level='warning', lifespan='on')
+
+
+def configure_response_cache(workers: int):
+    """Turns the per-process response cache off when several workers would serve stale entries."""
+    if workers > 1:
+        os.environ['FINANCE_RESPONSE_CACHE'] = '0'
+        print(f"Response cache disabled: it cannot be invalidated across {workers} worker processes.", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the finance API.")
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes.")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per worker (request threads in sync mode, database readers in async mode).")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    configure_response_cache(args.workers)
+    if args.mode == 'async':
+        serve_async(args.host, args.port, args.workers, args.threads)
+    else:
+        serve_sync(args.host, args.port, args.workers, args.threads)
+
+
+if __name__ == '__main__':
+    main()
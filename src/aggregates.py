@@ -0,0 +1,101 @@
+import math
+
+INCOME_TYPE = 'Receita'
+EXPENSE_TYPE = 'Despesa'
+
+
+def month_of(value) -> str:
+    """Returns the 'YYYY-MM' month of a date object or ISO date string."""
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return str(value)[:7]
+
+
+def check_amount(amount):
+    """Raises ValueError for NaN and infinite amounts, which would corrupt the running totals for good."""
+    if not math.isfinite(amount):
+        raise ValueError(f"Invalid amount '{amount}': must be a finite number.")
+
+
+class MonthlyTotals:
+    """
+    Incrementally maintained per-user totals grouped by month, category and
+    type, so summaries cost O(months x categories) instead of O(rows).
+    Rows are (date, description, category, amount, type, ...) tuples of API
+    values; totals are kept in the storage encoding's amount unit, so with
+    integer cents they are summed exactly.
+    """
+
+    table = 'monthly_totals'
+
+    def __init__(self, encoding=None):
+        self.encoding = encoding
+
+    def _encode(self, amount):
+        return self.encoding.encode_amount(amount) if self.encoding is not None else amount
+
+    def _decode(self, total):
+        return self.encoding.decode_amount(total) if self.encoding is not None else float(total)
+
+    def initialize(self, cursor):
+        amount_type = self.encoding.amount_type if self.encoding is not None else 'REAL'
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (user TEXT NOT NULL, month TEXT NOT NULL, category TEXT NOT NULL, "
+            f"type TEXT NOT NULL, total {amount_type} NOT NULL, count INTEGER NOT NULL, "
+            "PRIMARY KEY (user, month, category, type)) WITHOUT ROWID"
+        )
+
+    def apply(self, cursor, user: str, rows, sign: int = 1):
+        """Adds (sign=1) or removes (sign=-1) the given rows from the user's totals."""
+        deltas = {}
+        for row in rows:
+            check_amount(row[3])
+            key = (month_of(row[0]), row[2], row[4])
+            total, count = deltas.get(key, (0, 0))
+            deltas[key] = (total + self._encode(row[3]), count + 1)
+        if not deltas:
+            return
+        cursor.executemany(
+            f"INSERT INTO {self.table} (user, month, category, type, total, count) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (user, month, category, type) DO UPDATE SET "
+            "total = total + excluded.total, count = count + excluded.count",
+            [(user, month, category, type_name, sign * total, sign * count)
+             for (month, category, type_name), (total, count) in deltas.items()]
+        )
+        if sign < 0:
+            cursor.execute(f"DELETE FROM {self.table} WHERE user = ? AND count <= 0", (user,))
+
+    def clear(self, cursor, user: str):
+        cursor.execute(f"DELETE FROM {self.table} WHERE user = ?", (user,))
+
+    def rebuild(self, cursor, user: str, select_query: str, parameters):
+        """
+        Recomputes the user's totals from scratch. `select_query` must return
+        (month, category, type, total, count) groups.
+        """
+        self.clear(cursor, user)
+        cursor.execute(
+            f"INSERT INTO {self.table} (user, month, category, type, total, count) SELECT ?, * FROM ({select_query})",
+            [user] + list(parameters)
+        )
+
+    def summary(self, cursor, user: str) -> dict:
+        cursor.execute(f"SELECT month, category, type, total, count FROM {self.table} WHERE user = ? ORDER BY month, category", (user,))
+        totals = {'income': 0, 'expenses': 0, 'count': 0}
+        by_category = {}
+        by_month = {}
+        for month, category, type_name, total, count in cursor.fetchall():
+            field = 'income' if type_name == INCOME_TYPE else 'expenses'
+            for bucket in (totals,
+                           by_category.setdefault(category, {'category': category, 'income': 0, 'expenses': 0, 'count': 0}),
+                           by_month.setdefault(month, {'month': month, 'income': 0, 'expenses': 0, 'count': 0})):
+                bucket[field] += total
+                bucket['count'] += count
+        for bucket in [totals, *by_category.values(), *by_month.values()]:
+            income, expenses = bucket['income'], bucket['expenses']
+            bucket['income'] = round(self._decode(income), 2)
+            bucket['expenses'] = round(self._decode(expenses), 2)
+            bucket['balance'] = round(self._decode(income - expenses), 2)
+        totals['byCategory'] = list(by_category.values())
+        totals['byMonth'] = list(by_month.values())
+        return totals
@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from src.db_manager import DatabaseManager
+from src.write_queue import WRITE_OPERATIONS
+
+
+class AsyncDatabaseManager:
+    """
+    Runs DatabaseManager operations off the event loop. Reads and writes use
+    separate bounded executors: SQLite admits one writer at a time, so writes
+    get a single thread of their own and a slow commit never occupies the
+    threads serving reads. Every call borrows its own pooled connection.
+    When a WriteQueue is given, the operations it supports are group
+    committed there instead. `db_factory`, when given, opens the database
+    for each call in place of a DatabaseManager over `pool`, and
+    `read_factory` opens it for reads, e.g. over read-only connections.
+    `db_wrapper`, when given, wraps each opened database before the call,
+    running in the caller's context, e.g. to trace the current request.
+    """
+
+    def __init__(self, db_path: str, pool=None, layout=None, user_cache=None, read_threads: int = 8, write_threads: int = 1,
+                 write_queue=None, db_factory=None, read_factory=None, db_wrapper=None):
+        self.db_path = db_path
+        self.db_factory = db_factory
+        self.read_factory = read_factory
+        self.db_wrapper = db_wrapper
+        self.pool = pool
+        self.layout = layout
+        self.user_cache = user_cache
+        self.write_queue = write_queue
+        self.read_executor = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix='db-read')
+        self.write_executor = ThreadPoolExecutor(max_workers=write_threads, thread_name_prefix='db-write')
+
+    def _call(self, method: str, args, kwargs, factory=None):
+        factory = factory or self.db_factory
+        if factory is not None:
+            db = factory()
+        else:
+            db = DatabaseManager(self.db_path, pool=self.pool, layout=self.layout, user_cache=self.user_cache)
+        try:
+            target = self.db_wrapper(db) if self.db_wrapper is not None else db
+            return getattr(target, method)(*args, **kwargs)
+        finally:
+            db.close()
+
+    async def read(self, method: str, *args, **kwargs):
+        """Awaits a read-only DatabaseManager method on the read executor."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.read_executor, partial(context.run, self._call, method, args, kwargs, self.read_factory))
+
+    async def write(self, method: str, *args, **kwargs):
+        """Awaits a DatabaseManager method that modifies data on the write queue or executor."""
+        if self.write_queue is not None and method in WRITE_OPERATIONS:
+            return await asyncio.wrap_future(self.write_queue.submit(method, *args, **kwargs))
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.write_executor, partial(context.run, self._call, method, args, kwargs))
+
+    def close(self):
+        self.read_executor.shutdown(wait=True)
+        self.write_executor.shutdown(wait=True)
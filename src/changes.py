@@ -0,0 +1,80 @@
+class ChangeLog:
+    """
+    Per-user log of changed transactions, so clients can sync by asking for
+    what changed since the last version they saw instead of refetching.
+
+    Every insert, update and delete bumps the user's version and records it
+    against the transaction, with a tombstone for deletes. Only the latest
+    entry per transaction is kept, so the log holds one row per transaction
+    ever written and a sync returns each changed transaction once.
+
+    Versions never go back, not even when a user is dropped. Clearing the
+    log (dropping the user, or reassigning ids in a migration) moves the
+    user's floor up to the current version instead: clients that synced
+    before it must reload their whole listing.
+    """
+
+    table = 'changes'
+    versions_table = 'change_versions'
+
+    def initialize(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (user TEXT NOT NULL, version INTEGER NOT NULL, "
+            "transaction_id INTEGER NOT NULL, deleted INTEGER NOT NULL, PRIMARY KEY (user, version), "
+            "UNIQUE (user, transaction_id)) WITHOUT ROWID"
+        )
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.versions_table} (user TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+            "floor INTEGER NOT NULL) WITHOUT ROWID"
+        )
+
+    def record(self, cursor, user: str, transaction_ids, deleted: bool = False):
+        """Logs the given transactions as changed (or deleted) at the user's next versions."""
+        transaction_ids = list(transaction_ids)
+        if not transaction_ids:
+            return
+        cursor.execute(
+            f"INSERT INTO {self.versions_table} (user, version, floor) VALUES (?, ?, 0) "
+            "ON CONFLICT (user) DO UPDATE SET version = version + excluded.version",
+            (user, len(transaction_ids))
+        )
+        cursor.execute(f"SELECT version FROM {self.versions_table} WHERE user = ?", (user,))
+        first = cursor.fetchone()[0] - len(transaction_ids) + 1
+        # REPLACE drops the transaction's previous entry through the UNIQUE constraint.
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (user, version, transaction_id, deleted) VALUES (?, ?, ?, ?)",
+            [(user, first + offset, transaction_id, int(deleted)) for offset, transaction_id in enumerate(transaction_ids)]
+        )
+
+    def clear(self, cursor, user: str):
+        """Forgets the user's entries; syncs from earlier versions must start over."""
+        cursor.execute(f"DELETE FROM {self.table} WHERE user = ?", (user,))
+        cursor.execute(f"UPDATE {self.versions_table} SET floor = version WHERE user = ?", (user,))
+
+    def carry_over(self, cursor, user: str, version: int):
+        """
+        Clears the user's log and moves their version and floor past
+        `version`, the version of a copy their rows were moved from, so
+        clients synced against that copy start over.
+        """
+        cursor.execute(f"DELETE FROM {self.table} WHERE user = ?", (user,))
+        cursor.execute(
+            f"INSERT INTO {self.versions_table} (user, version, floor) VALUES (?, ?, ?) "
+            "ON CONFLICT (user) DO UPDATE SET version = version + excluded.version, floor = version + excluded.version",
+            (user, version + 1, version + 1)
+        )
+
+    def version(self, cursor, user: str) -> tuple:
+        """Returns the user's (version, floor); (0, 0) before their first change."""
+        cursor.execute(f"SELECT version, floor FROM {self.versions_table} WHERE user = ?", (user,))
+        row = cursor.fetchone()
+        return tuple(row) if row is not None else (0, 0)
+
+    def since(self, cursor, user: str, version: int, limit: int):
+        """Returns up to `limit` (version, transaction_id, deleted) entries after `version`, oldest first."""
+        cursor.execute(
+            f"SELECT version, transaction_id, deleted FROM {self.table} WHERE user = ? AND version > ? "
+            "ORDER BY version LIMIT ?",
+            (user, version, limit)
+        )
+        return [(entry_version, transaction_id, bool(deleted)) for entry_version, transaction_id, deleted in cursor.fetchall()]
@@ -0,0 +1,198 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from src.query import CACHED_STATEMENTS
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+}
+# The journal mode is a property of the file, set by the writers; read-only
+# connections cannot change it.
+READ_ONLY_PRAGMAS = {
+    'query_only': 'ON',
+}
+
+
+def read_only_uri(db_path: str) -> str:
+    """Returns a URI opening `db_path` read-only. The file must already exist."""
+    return f"{Path(db_path).resolve().as_uri()}?mode=ro"
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of SQLite connections.
+
+    Connections are created lazily up to `size`, initialized once with the
+    configured PRAGMAs and handed out most-recently-used first so callers get
+    a connection with a warm page cache.
+
+    With `read_only`, connections open the file with a mode=ro URI and
+    query_only set, so they can never take the write lock.
+
+    Each connection keeps up to `cached_statements` prepared statements.
+    """
+
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 5.0, pragmas: dict = None, health_check: bool = True,
+                 read_only: bool = False, cached_statements: int = CACHED_STATEMENTS):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.cached_statements = cached_statements
+        if pragmas is None:
+            pragmas = READ_ONLY_PRAGMAS if read_only else DEFAULT_PRAGMAS
+        self.pragmas = pragmas
+        self.health_check = health_check
+
+        self._idle = deque()
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._checkouts = 0
+        self._checkout_time = 0.0
+        self._max_checkout_time = 0.0
+
+    def _create_connection(self):
+        if self.read_only:
+            connection = sqlite3.connect(read_only_uri(self.db_path), timeout=self.timeout, check_same_thread=False, uri=True,
+                                         cached_statements=self.cached_statements)
+        else:
+            connection = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                                         cached_statements=self.cached_statements)
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def _is_healthy(self, connection) -> bool:
+        try:
+            connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    def acquire(self):
+        """
+        Borrows a connection, waiting up to `timeout` seconds for one to be
+        released when the pool is exhausted.
+        """
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        connection = None
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed.")
+            waited = False
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    self._hits += 1
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    self._misses += 1
+                    break
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(f"Timed out after {self.timeout}s waiting for a database connection.")
+                self._condition.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+
+        if connection is not None and self.health_check and not self._is_healthy(connection):
+            # Keep the slot reserved and open a replacement in its place.
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+            with self._condition:
+                self._replaced += 1
+            connection = None
+
+        if connection is None:
+            try:
+                connection = self._create_connection()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+
+        elapsed = time.perf_counter() - start
+        with self._condition:
+            self._checkouts += 1
+            self._checkout_time += elapsed
+            self._max_checkout_time = max(self._max_checkout_time, elapsed)
+        return connection
+
+    def release(self, connection):
+        """Returns a borrowed connection, rolling back any open transaction."""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            self._discard(connection)
+            return
+        with self._condition:
+            if self._closed:
+                connection.close()
+                self._created -= 1
+                return
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def close(self):
+        """Closes idle connections; borrowed ones are closed when released."""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            checkouts = self._checkouts
+            return {
+                'size': self.size,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+                'hits': self._hits,
+                'misses': self._misses,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'replaced': self._replaced,
+                'checkouts': checkouts,
+                'avg_checkout_ms': (self._checkout_time / checkouts * 1000) if checkouts else 0.0,
+                'max_checkout_ms': self._max_checkout_time * 1000,
+            }
@@ -1,24 +1,113 @@
 import sqlite3
+import logging
 import os
+from contextlib import contextmanager
+from itertools import islice
 from src.transactions import Transaction
+from src.connection_pool import READ_ONLY_PRAGMAS, ConnectionPool, read_only_uri
+from src.storage import PerUserTableLayout
+from src.user_cache import UserCache
+from src.aggregates import INCOME_TYPE, MonthlyTotals, check_amount
+from src.search import SearchIndex
+from src.changes import ChangeLog
+from src.query import CACHED_STATEMENTS, Query
+from src.transaction_type import TransactionType
 from datetime import date
 
+# Sort orders of query_transactions() as (column, direction). Pages are
+# keyed on (column, id) in the same direction.
+SORT_ORDERS = {
+    'date_desc': ('date', 'DESC'),
+    'date_asc': ('date', 'ASC'),
+    'amount_desc': ('amount', 'DESC'),
+    'amount_asc': ('amount', 'ASC'),
+}
+MAX_FILTER_CATEGORIES = 50
+MAX_CHANGES = 500
+
+logger = logging.getLogger(__name__)
+
 
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    """
+    Stores and queries users' transactions. A `read_only` manager opens the
+    database with read-only connections (or borrows from a read-only `pool`)
+    and reads it from a single WAL snapshot until close(), so its queries
+    agree with each other and never wait for writers. It does not create the
+    schema: the database must already exist. Neither does a manager over a
+    writable `pool`, which only borrows a connection: the pool's database is
+    initialized once, with initialize_schema() on a manager of its own.
+
+    Connections it opens itself keep up to `cached_statements` prepared
+    statements; pooled ones use the pool's setting.
+    """
+
+    def __init__(self, db_path: str, pool: ConnectionPool = None, layout=None, user_cache: UserCache = None, slow_query_log=None,
+                 read_only: bool = False, cached_statements: int = CACHED_STATEMENTS):
         self.db_path = db_path
+        self.pool = pool
+        self.read_only = read_only
+        self.cached_statements = cached_statements
+        self.layout = layout if layout is not None else PerUserTableLayout()
+        self.user_cache = user_cache
+        self.slow_query_log = slow_query_log
+        self.totals = MonthlyTotals(self.layout.encoding)
+        self.search = SearchIndex(self.layout)
+        self.changes = ChangeLog()
+        self._defer_commit = False
         self.connection = None
         self.cursor = None
         self.connect()
 
     def connect(self):
-        
-        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.cursor = self.connection.cursor()   
+        if self.pool is not None:
+            self.connection = self.pool.acquire()
+        elif self.read_only:
+            self.connection = sqlite3.connect(read_only_uri(self.db_path), check_same_thread=False, uri=True,
+                                              cached_statements=self.cached_statements)
+            for name, value in READ_ONLY_PRAGMAS.items():
+                self.connection.execute(f"PRAGMA {name} = {value}")
+        else:
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=self.cached_statements)
+        self.cursor = self._new_cursor()
+        if self.read_only:
+            self._begin_snapshot()
+        elif self.pool is None:
+            self.initialize_schema()
+
+    def initialize_schema(self):
+        """Creates the layout's tables and the totals, search and change log tables if they are missing."""
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        self.layout.initialize(self.cursor)
+        self.totals.initialize(self.cursor)
+        self.search.initialize(self.cursor)
+        self.changes.initialize(self.cursor)
+        # Indexing the rows of a shared table that predates its search index is a write.
+        self.connection.commit()
+
+    def _begin_snapshot(self):
+        # The snapshot is taken by the first read and held until the transaction ends.
+        self.connection.execute("BEGIN")
+
+    def _new_cursor(self):
+        cursor = self.connection.cursor()
+        if self.slow_query_log is not None:
+            cursor = self.slow_query_log.wrap(cursor, self.connection)
+        return cursor
+
+    def wrap_cursor(self, wrapper):
+        """Replaces the cursor with `wrapper(cursor)`, e.g. to trace its statements."""
+        self.cursor = wrapper(self.cursor)
 
     def close(self):
         if self.connection:
-            self.connection.close()
+            if self.slow_query_log is not None:
+                self.cursor.flush()
+            if self.pool is not None:
+                self.pool.release(self.connection)
+            else:
+                self.connection.close()
             self.connection = None
             self.cursor = None        
 
@@ -29,106 +118,503 @@ class DatabaseManager:
         if not self.cursor:
             raise RuntimeError("Database connection is not established for ensure_user_table_exists.")
         if self.check_username_availability(user):
+            if self.read_only:
+                self._write_for_reads('ensure_user_table_exists', user)
+                return
             self.create_user_table(user)
-            print(f"INFO: Table for user '{user}' created as it did not exist.")
-
-    def add_transaction(self, user:str , transaction: Transaction):
-        if not self.cursor:
-            raise RuntimeError("Database connection is not established.")
-        
-        self.ensure_user_table_exists(user)
+            logger.debug("Table for user '%s' created as it did not exist.", user)
 
-        query_parameters = (
+    def _transaction_parameters(self, transaction: Transaction):
+        """
+        Returns the transaction's (date, description, category, amount, type)
+        API values. Non-finite amounts raise ValueError here, before any
+        statement of the write runs.
+        """
+        check_amount(transaction.get_amount())
+        return (
             transaction.get_date(),
             transaction.get_description(),
             transaction.get_category(),
             transaction.get_amount(),
             transaction.get_type(),
         )
-        insert_query = f"INSERT INTO {user} (date, description, category, amount, type) VALUES (?, ?, ?, ?, ?)"
+
+    def _insert_query(self, user: str):
+        columns = ["date", "description", "category", "amount", "type", *self.layout.owner_columns]
+        placeholders = ", ".join([*self.layout.encoding.placeholders, *("?" for _ in self.layout.owner_columns)])
+        return f"INSERT INTO {self.layout.table(user)} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def _user_key(self, user: str):
+        """
+        Resolves the layout's key for a user, consulting the user cache first so
+        known users cost no catalog query. Returns None for unknown users.
+        """
+        if self.user_cache is not None:
+            user_key = self.user_cache.get(user)
+            if user_key is not None:
+                return user_key
+        user_key = self.layout.find_user(self.cursor, user)
+        if user_key is not None and self.user_cache is not None:
+            self.user_cache.put(user, user_key)
+        return user_key
+
+    def _owner_key(self, user: str):
+        """Returns the user key for layouts that scope rows by owner, None otherwise."""
+        if not self.layout.owner_columns:
+            return None
+        user_key = self._user_key(user)
+        if user_key is None:
+            raise ValueError(f"Username '{user}' does not exist.")
+        return user_key
+
+    def _scope(self, user: str, conditions, parameters):
+        """Prepends the layout's per-user restriction to a list of conditions."""
+        user_key = self._user_key(user) if self.layout.owner_columns else None
+        scope_conditions, scope_parameters = self.layout.scope(user_key)
+        return scope_conditions + list(conditions), scope_parameters + list(parameters)
+
+    def add_transaction(self, user:str , transaction: Transaction):
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        
+        self.ensure_user_table_exists(user)
+
+        values = self._transaction_parameters(transaction)
+        owner_key = self._owner_key(user)
+        query_parameters = self.layout.encoding.encode(values) + self.layout.owner_values(owner_key)
+        insert_query = self._insert_query(user)
+        self.layout.encoding.prepare(self.cursor, [values])
         self.cursor.execute(insert_query, query_parameters)
+        transaction_id = self.cursor.lastrowid
+        self.totals.apply(self.cursor, user, [values])
+        self.search.add(self.cursor, user, owner_key, [(transaction_id, values)])
+        self.changes.record(self.cursor, user, [transaction_id])
         self.commit()
 
-        transaction_id = self.cursor.lastrowid
         return transaction_id
 
+    def add_transactions(self, user: str, transactions, chunk_size: int = 1000):
+        """
+        Inserts many transactions inside a single SQLite transaction. The
+        iterable is consumed `chunk_size` rows at a time, so memory stays
+        bounded regardless of its length. Returns the assigned ids in order.
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1.")
+
+        self.ensure_user_table_exists(user)
+
+        insert_query = self._insert_query(user)
+        owner_key = self._owner_key(user)
+        owner_values = self.layout.owner_values(owner_key)
+        encode = self.layout.encoding.encode
+        transaction_ids = []
+        iterator = iter(transactions)
+        try:
+            while True:
+                chunk = [self._transaction_parameters(transaction) for transaction in islice(iterator, chunk_size)]
+                if not chunk:
+                    break
+                self.layout.encoding.prepare(self.cursor, chunk)
+                self.cursor.executemany(insert_query, [encode(values) + owner_values for values in chunk])
+                # executemany reports no ids. last_insert_rowid() is this
+                # connection's own, and while this transaction holds the write
+                # lock SQLite assigns consecutive ids, so the chunk's ids are the
+                # range ending at it. Read it before other tables are written.
+                self.cursor.execute("SELECT last_insert_rowid()")
+                last_id = self.cursor.fetchone()[0]
+                chunk_ids = range(last_id - len(chunk) + 1, last_id + 1)
+                self.totals.apply(self.cursor, user, chunk)
+                self.search.add(self.cursor, user, owner_key, zip(chunk_ids, chunk))
+                self.changes.record(self.cursor, user, chunk_ids)
+                transaction_ids.extend(chunk_ids)
+        except Exception:
+            # Under deferred_commit() the caller owns the transaction, e.g. the write queue's savepoint.
+            if not self._defer_commit:
+                self.connection.rollback()
+            raise
+        self.commit()
+        return transaction_ids
+
     def update_transaction_by_id(self, user: str, transaction_id: int, updated_transaction: Transaction):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        query_parameters = (
-            updated_transaction.get_date(),
-            updated_transaction.get_description(),
-            updated_transaction.get_category(),
-            updated_transaction.get_amount(),
-            updated_transaction.get_type(),
-            transaction_id            
-        )
-        update_query = f"UPDATE {user} SET date = ?, description = ?, category = ?, amount = ?, type = ? WHERE id = ?"
+        previous = self.get_transaction_by_id(user, transaction_id)
+        conditions, parameters = self._scope(user, ["id = ?"], [transaction_id])
+        values = self._transaction_parameters(updated_transaction)
+        query_parameters = self.layout.encoding.encode(values) + tuple(parameters)
+        assignments = ", ".join(f"{column} = {placeholder}" for column, placeholder in
+                                zip(("date", "description", "category", "amount", "type"), self.layout.encoding.placeholders))
+        update_query = f"UPDATE {self.layout.table(user)} SET {assignments} WHERE {' AND '.join(conditions)}"
+        self.layout.encoding.prepare(self.cursor, [values])
         self.cursor.execute(update_query, query_parameters)
+        if previous is not None:
+            self.totals.apply(self.cursor, user, [previous], sign=-1)
+            self.totals.apply(self.cursor, user, [values])
+            self.search.update(self.cursor, user, self._owner_key(user), transaction_id, values)
+            self.changes.record(self.cursor, user, [transaction_id])
         self.commit()
     
     def delete_transaction_by_id(self, user: str, transaction_id: int):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        delete_query = f"DELETE FROM {user} WHERE id = ?"
-        self.cursor.execute(delete_query, (transaction_id,))
+        previous = self.get_transaction_by_id(user, transaction_id)
+        conditions, parameters = self._scope(user, ["id = ?"], [transaction_id])
+        delete_query = f"DELETE FROM {self.layout.table(user)} WHERE {' AND '.join(conditions)}"
+        self.cursor.execute(delete_query, parameters)
+        if previous is not None:
+            self.totals.apply(self.cursor, user, [previous], sign=-1)
+            self.search.delete(self.cursor, user, self._owner_key(user), transaction_id)
+            self.changes.record(self.cursor, user, [transaction_id], deleted=True)
+        self.commit()
+
+    def get_transaction_by_id(self, user: str, transaction_id: int):
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        self.cursor.execute(*self._build_select(user, "id = ?", (transaction_id,)))
+        return self.cursor.fetchone()
+
+    def get_summary(self, user: str) -> dict:
+        """
+        Returns income, expense and balance totals with per-category and
+        per-month breakdowns, read from the maintained monthly totals.
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        return self.totals.summary(self.cursor, user)
+
+    def rebuild_summary(self, user: str):
+        """
+        Recomputes the user's monthly totals from their transactions. The sums
+        run in SQLite over the stored amounts (integers with cents encoding).
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        encoding = self.layout.encoding
+        groups_query, parameters = self._query(user, f"{encoding.month_sql} AS month, category, type, SUM(amount) AS total, COUNT(*) AS count").build()
+        groups_query += " GROUP BY 1, 2, 3"
+        # Categories and types are decoded per group rather than per row.
+        select_query = f"SELECT month, {encoding.category_name_sql}, {encoding.type_name_sql}, total, count FROM ({groups_query})"
+        self.totals.rebuild(self.cursor, user, select_query, parameters)
         self.commit()
 
-    def get_category_transactions(self, user: str, category: str):
+    def rebuild_search_index(self, user: str):
+        """Re-indexes the user's transactions for full-text search."""
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        select_query = f"SELECT * FROM {user} WHERE category = '{category}'"
-        self.cursor.execute(select_query)
+        self.search.rebuild(self.cursor, user, self._owner_key(user))
+        self.commit()
+
+    def _write_for_reads(self, method: str, *args):
+        """
+        Runs a write a read-only manager cannot, such as building a missing
+        search index, over a short-lived writable connection, then reads from
+        a snapshot that includes it.
+        """
+        # Without WAL, the snapshot's shared lock would keep the writer out.
+        self.connection.rollback()
+        writer = DatabaseManager(self.db_path, layout=self.layout, user_cache=self.user_cache)
+        try:
+            return getattr(writer, method)(*args)
+        finally:
+            writer.close()
+            self._begin_snapshot()
+
+    def search_transactions(self, user: str, query: str, limit: int = None, cursor: tuple = None):
+        """
+        Full-text searches the user's descriptions and categories, matching
+        every word of `query` as a prefix. Rows are transaction rows with
+        their bm25 score appended, best match first. `cursor` is the
+        (score, id) of the last row already seen.
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        user_key = self._owner_key(user)
+        matches_query, parameters = self.search.matches(user, user_key, query, limit=limit, after=cursor)
+        conditions, scope_parameters = self.layout.scope(user_key)
+        parameters.extend(scope_parameters)
+        table = self.layout.table(user)
+        select_query = (f"SELECT {self.layout.encoding.select_columns}, matches.score FROM ({matches_query}) AS matches "
+                        f"JOIN {table} ON {table}.id = matches.match_id")
+        if conditions:
+            select_query += " WHERE " + " AND ".join(conditions)
+        select_query += " ORDER BY matches.score, matches.match_id"
+        try:
+            self.cursor.execute(select_query, parameters)
+        except sqlite3.OperationalError as e:
+            if 'no such table' not in str(e):
+                raise
+            if self.read_only:
+                self._write_for_reads('rebuild_search_index', user)
+            else:
+                self.rebuild_search_index(user)
+            self.cursor.execute(select_query, parameters)
+        return self.cursor.fetchall()
+
+    def _query(self, user: str, columns: str = None) -> Query:
+        """Starts a SELECT over the user's transactions, restricted to their rows."""
+        query = Query(self.layout.table(user), columns or self.layout.encoding.select_columns)
+        return query.where_all(*self._scope(user, [], []))
+
+    def _build_select(self, user: str, where: str = None, parameters=(), limit: int = None, cursor: tuple = None):
+        query = self._query(user)
+        if where:
+            query.where(where, *parameters)
+        if cursor is not None:
+            query.where("(date, id) < (?, ?)", self.layout.encoding.encode_date(cursor[0]), cursor[1])
+        if limit is not None or cursor is not None:
+            query.order_by("date DESC, id DESC")
+        if limit is not None:
+            query.limit(limit)
+        return query.build()
+
+    def _select(self, user: str, where: str = None, parameters=(), limit: int = None, cursor: tuple = None):
+        """
+        Runs a SELECT over the user's transactions. When `limit` or `cursor` is
+        given, rows are returned newest first and paginated by keyset on
+        (date, id): `cursor` is the (date, id) of the last row already seen.
+        """
+        self.cursor.execute(*self._build_select(user, where, parameters, limit, cursor))
         return self.cursor.fetchall()
+
+    def iter_transactions(self, user: str, batch_size: int = 500):
+        """
+        Yields lists of at most `batch_size` rows covering all of the user's
+        transactions, newest first. Uses its own cursor and fetchmany, so only
+        one batch is held in memory at a time.
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        select_query, parameters = self._query(user).order_by("date DESC, id DESC").build()
+        cursor = self._new_cursor()
+        try:
+            cursor.execute(select_query, parameters)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def get_category_transactions(self, user: str, category: str, limit: int = None, cursor: tuple = None):
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        return self._select(user, f"category = {self.layout.encoding.placeholders[2]}", (category,), limit=limit, cursor=cursor)
     
-    def get_all_transactions(self, user: str):
+    def get_all_transactions(self, user: str, limit: int = None, cursor: tuple = None):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
         
         self.ensure_user_table_exists(user)
 
-        select_query = f"SELECT * FROM {user}"
-        self.cursor.execute(select_query)
-        return self.cursor.fetchall()
+        return self._select(user, limit=limit, cursor=cursor)
     
-    def get_all_debits(self, user: str):
+    def get_all_debits(self, user: str, limit: int = None, cursor: tuple = None):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        select_query = f"SELECT * FROM {user} WHERE type = 'Despesa'"
-        self.cursor.execute(select_query)
-        return self.cursor.fetchall()
+        return self._select(user, "type = ?", (self.layout.encoding.encode_type("Despesa"),), limit=limit, cursor=cursor)
     
-    def get_all_credits(self, user: str):
+    def get_all_credits(self, user: str, limit: int = None, cursor: tuple = None):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        select_query = f"SELECT * FROM {user} WHERE type = 'Receita'"
-        self.cursor.execute(select_query)
-        return self.cursor.fetchall()
+        return self._select(user, "type = ?", (self.layout.encoding.encode_type("Receita"),), limit=limit, cursor=cursor)
     
-    def get_month_transactions(self, user: str, month: int, year: int):
+    def get_month_transactions(self, user: str, month: int, year: int, limit: int = None, cursor: tuple = None):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        select_query = f"SELECT * FROM {user} WHERE strftime('%m', date) = '{month:02d}' AND strftime('%Y', date) = '{year}'"
-        self.cursor.execute(select_query)
+        first_day = date(year, month, 1)
+        next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        encode_date = self.layout.encoding.encode_date
+        return self._select(user, "date >= ? AND date < ?",
+                            (encode_date(first_day), encode_date(next_month)), limit=limit, cursor=cursor)
+
+    def get_transactions_between(self, user: str, start: date = None, end: date = None, limit: int = None, cursor: tuple = None):
+        """Returns the user's transactions dated within [start, end]; either bound may be omitted."""
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        conditions = []
+        parameters = []
+        if start is not None:
+            conditions.append("date >= ?")
+            parameters.append(self.layout.encoding.encode_date(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            parameters.append(self.layout.encoding.encode_date(end))
+        return self._select(user, " AND ".join(conditions), parameters, limit=limit, cursor=cursor)
+
+    def _filter_query(self, user: str, columns: str = None, types=None, categories=None, start: date = None, end: date = None,
+                      min_amount: float = None, max_amount: float = None) -> Query:
+        """
+        Starts a SELECT over the user's transactions matching every given
+        filter. Raises ValueError on unknown types or too many categories.
+        """
+        encoding = self.layout.encoding
+        query = self._query(user, columns)
+        types = sorted({TransactionType(type_name).get_type() for type_name in types or ()})
+        if len(types) == 1:
+            query.where("type = ?", encoding.encode_type(types[0]))
+        categories = list(dict.fromkeys(categories or ()))
+        if len(categories) > MAX_FILTER_CATEGORIES:
+            raise ValueError(f"At most {MAX_FILTER_CATEGORIES} categories can be filtered at once.")
+        if categories:
+            query.where(f"category IN ({', '.join([encoding.placeholders[2]] * len(categories))})", *categories)
+        if start is not None:
+            query.where("date >= ?", encoding.encode_date(start))
+        if end is not None:
+            query.where("date <= ?", encoding.encode_date(end))
+        if min_amount is not None:
+            query.where("amount >= ?", encoding.encode_amount(min_amount))
+        if max_amount is not None:
+            query.where("amount <= ?", encoding.encode_amount(max_amount))
+        return query
+
+    def query_transactions(self, user: str, types=None, categories=None, start: date = None, end: date = None,
+                           min_amount: float = None, max_amount: float = None, sort: str = 'date_desc',
+                           limit: int = None, cursor: tuple = None):
+        """
+        Returns the user's transactions matching every given filter, in one
+        query: any of `types`, any of `categories`, dated within [start, end]
+        and with amounts within [min_amount, max_amount]. Omitted filters
+        match everything. Rows come in a SORT_ORDERS order; `cursor` is the
+        (sort value, id) of the last row already seen.
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order '{sort}'. Use one of: {', '.join(SORT_ORDERS)}.")
+        column, direction = SORT_ORDERS[sort]
+        encoding = self.layout.encoding
+        query = self._filter_query(user, types=types, categories=categories, start=start, end=end,
+                                   min_amount=min_amount, max_amount=max_amount)
+        if cursor is not None:
+            encode = encoding.encode_date if column == 'date' else encoding.encode_amount
+            query.where(f"({column}, id) {'<' if direction == 'DESC' else '>'} (?, ?)", encode(cursor[0]), cursor[1])
+        query.order_by(f"{column} {direction}, id {direction}")
+        if limit is not None:
+            query.limit(limit)
+        self.cursor.execute(*query.build())
         return self.cursor.fetchall()
 
+    def query_totals(self, user: str, **filters) -> dict:
+        """Returns the income, expenses, balance and count of the transactions matching query_transactions() filters."""
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        encoding = self.layout.encoding
+        select_query, parameters = self._filter_query(user, f"{encoding.type_name_sql}, SUM(amount), COUNT(*)", **filters).build()
+        self.cursor.execute(select_query + " GROUP BY type", parameters)
+        income = expenses = count = 0
+        for type_name, total, type_count in self.cursor.fetchall():
+            if type_name == INCOME_TYPE:
+                income += total
+            else:
+                expenses += total
+            count += type_count
+        return {
+            'income': round(encoding.decode_amount(income), 2),
+            'expenses': round(encoding.decode_amount(expenses), 2),
+            'balance': round(encoding.decode_amount(income - expenses), 2),
+            'count': count,
+        }
+
+    def get_changes(self, user: str, since: int = None, limit: int = MAX_CHANGES) -> dict:
+        """
+        Returns the user's transactions changed after version `since`: the
+        current rows of those still present under 'changed' and the ids of
+        deleted ones under 'deleted', oldest changes first and at most `limit`
+        of them. 'version' is the `since` of the next call and 'hasMore' tells
+        whether changes were left out. 'reset' means `since` predates the log
+        and the client must reload everything. Without `since`, only returns
+        the current version.
+        """
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        if limit < 1:
+            raise ValueError("Limit must be at least 1.")
+        current, floor = self.changes.version(self.cursor, user)
+        payload = {'version': current, 'reset': False, 'hasMore': False, 'changed': [], 'deleted': []}
+        if since is None:
+            return payload
+        if since < floor or since > current:
+            payload['reset'] = True
+            return payload
+        entries = self.changes.since(self.cursor, user, since, limit + 1)
+        if len(entries) > limit:
+            entries = entries[:limit]
+            payload['hasMore'] = True
+        if entries:
+            payload['version'] = entries[-1][0] if payload['hasMore'] else max(current, entries[-1][0])
+        changed_ids = [transaction_id for _, transaction_id, deleted in entries if not deleted]
+        if changed_ids:
+            query = self._query(user).where(f"id IN ({', '.join('?' * len(changed_ids))})", *changed_ids)
+            self.cursor.execute(*query.order_by("id").build())
+            payload['changed'] = self.cursor.fetchall()
+        # A row changed after the version was read may already be gone; its tombstone is in a later version.
+        present = {row[5] for row in payload['changed']}
+        payload['deleted'] = [transaction_id for _, transaction_id, deleted in entries if deleted or transaction_id not in present]
+        return payload
+
     def commit(self):
         if not self.connection:
             raise RuntimeError("Database connection is not established.")
+        if self._defer_commit:
+            return
         self.connection.commit()
 
+    @contextmanager
+    def deferred_commit(self):
+        """
+        Makes commit() a no-op inside the block, so several writes share one
+        transaction. The caller commits or rolls back the connection afterwards.
+        """
+        self._defer_commit = True
+        try:
+            yield self
+        finally:
+            self._defer_commit = False
+
     def check_username_availability(self, user: str) -> bool:
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
-        check_username_availability_query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{user}'"
-        self.cursor.execute(check_username_availability_query)
-        return self.cursor.fetchone() is None
+        return self._user_key(user) is None
+
+    def list_users(self):
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        return self.layout.list_users(self.cursor)
 
     def create_user_table(self, user: str):
         if not self.cursor:
             raise RuntimeError("Database connection is not established.")
         if not self.check_username_availability(user):
             raise ValueError(f"Username '{user}' already exists.")
-        create_table_query = f"CREATE TABLE IF NOT EXISTS {user} (date, description, category, amount, type, id INTEGER PRIMARY KEY)"
-        self.cursor.execute(create_table_query)
+        self.layout.create_user(self.cursor, user)
+        self.search.create(self.cursor, user, self._owner_key(user))
+        self.commit()
+        if self.user_cache is not None:
+            self.user_cache.invalidate(user)
+
+    def drop_user(self, user: str):
+        """Deletes the user with all of their transactions, totals and search index entries."""
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        user_key = self._user_key(user)
+        if user_key is None:
+            raise ValueError(f"Username '{user}' does not exist.")
+        owner_key = user_key if self.layout.owner_columns else None
+        self.search.remove(self.cursor, user, owner_key)
+        self.layout.drop_user(self.cursor, user, owner_key)
+        self.totals.clear(self.cursor, user)
+        self.changes.clear(self.cursor, user)
+        self.commit()
+        if self.user_cache is not None:
+            self.user_cache.invalidate(user)
+
+    def create_indexes(self, user: str):
+        """Creates the indexes backing the date, category and type filters."""
+        if not self.cursor:
+            raise RuntimeError("Database connection is not established.")
+        self.layout.create_indexes(self.cursor, user)
         self.commit()
\ No newline at end of file
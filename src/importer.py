@@ -0,0 +1,218 @@
+"""
+Streaming importer for bank statement exports (CSV and OFX).
+
+Every stage is a generator: lines are parsed into rows, rows are mapped onto
+Transaction objects and those are committed through DatabaseManager in
+fixed-size chunks, so only one chunk is ever held in memory.
+
+Usage:
+    python -m src.importer statement.csv --user alice --db finance.db
+"""
+import argparse
+import csv
+import math
+import re
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+from src.db_manager import DatabaseManager
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+
+FIELDS = ['date', 'description', 'category', 'amount', 'type']
+DEFAULT_CATEGORY = 'Outros'
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+
+class ImportReport:
+    """Progress and throughput of a running or finished import."""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.chunks = 0
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def tick(self):
+        self.elapsed = time.perf_counter() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.imported / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "chunks": self.chunks,
+            "elapsedSeconds": round(self.elapsed, 3),
+            "rowsPerSecond": round(self.rows_per_second, 1),
+        }
+
+
+def read_csv_rows(lines, delimiter: str = ','):
+    """Yields (line_number, row_dict) pairs from an iterable of CSV lines."""
+    reader = csv.DictReader(lines, delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ofx_rows(lines):
+    """
+    Yields (line_number, row_dict) pairs for every <STMTTRN> block of an OFX
+    (SGML or XML) statement, with the same keys a CSV export would have.
+    """
+    transaction = None
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and transaction is not None:
+                    posted = transaction.get('DTPOSTED', '')[:8]
+                    yield line_number, {
+                        'date': f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}" if len(posted) == 8 else posted,
+                        'description': transaction.get('NAME') or transaction.get('MEMO', ''),
+                        'amount': transaction.get('TRNAMT', ''),
+                    }
+                    transaction = None
+                elif not closing:
+                    transaction = {}
+            elif transaction is not None and not closing:
+                transaction[tag] = value.strip()
+
+
+def _parse_amount(text: str, decimal_separator: str) -> float:
+    text = text.strip().replace(' ', '')
+    if decimal_separator != '.':
+        text = text.replace('.', '').replace(decimal_separator, '.')
+    amount = float(text)
+    if not math.isfinite(amount):
+        raise ValueError(f"Invalid amount '{text}': must be a finite number.")
+    return amount
+
+
+def to_transaction(row: dict, columns: dict = None, date_format: str = '%Y-%m-%d',
+                   decimal_separator: str = '.', default_category: str = DEFAULT_CATEGORY) -> Transaction:
+    """
+    Maps one parsed row onto a Transaction. `columns` maps transaction fields
+    to source column names. Without a type column, negative amounts are
+    imported as 'Despesa' and positive ones as 'Receita'.
+    """
+    columns = columns or {}
+    def value(field):
+        return (row.get(columns.get(field, field)) or '').strip()
+
+    amount = _parse_amount(value('amount'), decimal_separator)
+    type_name = value('type') or ('Despesa' if amount < 0 else 'Receita')
+    return Transaction(
+        date=datetime.strptime(value('date'), date_format).date(),
+        description=value('description'),
+        category=value('category') or default_category,
+        amount=abs(amount),
+        type=TransactionType(type_name)
+    )
+
+
+def parse_transactions(numbered_rows, report: ImportReport, **mapping):
+    """Yields Transactions, recording unparseable rows on the report."""
+    for line_number, row in numbered_rows:
+        report.rows += 1
+        try:
+            yield to_transaction(row, **mapping)
+        except (ValueError, TypeError) as e:
+            report.add_error(line_number, str(e))
+
+
+def import_statement(db: DatabaseManager, user: str, lines, file_format: str = 'csv',
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, delimiter: str = ',', progress=None, add_transactions=None,
+                     **mapping) -> ImportReport:
+    """
+    Streams a statement into the user's transactions, committing every
+    `chunk_size` rows. `progress` is called with the report after each chunk.
+    Chunks are written with `add_transactions(user, transactions, chunk_size)`,
+    `db.add_transactions` by default; the app passes its write queue.
+    """
+    if add_transactions is None:
+        add_transactions = db.add_transactions
+    if file_format == 'csv':
+        numbered_rows = read_csv_rows(lines, delimiter=delimiter)
+    elif file_format == 'ofx':
+        numbered_rows = read_ofx_rows(lines)
+    else:
+        raise ValueError(f"Unsupported statement format '{file_format}'. Use 'csv' or 'ofx'.")
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be at least 1.")
+
+    report = ImportReport()
+    transactions = parse_transactions(numbered_rows, report, **mapping)
+    while True:
+        chunk = list(islice(transactions, chunk_size))
+        if not chunk:
+            break
+        add_transactions(user, chunk, chunk_size)
+        report.imported += len(chunk)
+        report.chunks += 1
+        report.tick()
+        if progress is not None:
+            progress(report)
+    report.tick()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a bank statement into a user's transactions.")
+    parser.add_argument('file', help="CSV or OFX statement to import")
+    parser.add_argument('--user', required=True, help="username that owns the transactions")
+    parser.add_argument('--db', default='finance.db', help="SQLite database file (default: finance.db)")
+    parser.add_argument('--format', choices=['csv', 'ofx'], help="statement format (default: from file extension)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows committed per transaction")
+    parser.add_argument('--delimiter', default=',', help="CSV field delimiter")
+    parser.add_argument('--date-format', default='%Y-%m-%d', help="strptime format of the date column")
+    parser.add_argument('--decimal-separator', default='.', help="decimal separator used in amounts")
+    parser.add_argument('--default-category', default=DEFAULT_CATEGORY, help="category for rows without one")
+    parser.add_argument('--encoding', default='utf-8', help="statement file encoding")
+    for field in FIELDS:
+        parser.add_argument(f'--{field}-column', default=field, help=f"CSV column holding the {field}")
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ('ofx' if args.file.lower().endswith(('.ofx', '.qfx')) else 'csv')
+    columns = {field: getattr(args, f'{field}_column') for field in FIELDS}
+
+    def progress(report):
+        print(f"imported {report.imported} rows ({report.rows_per_second:.0f} rows/s)", file=sys.stderr)
+
+    db = DatabaseManager(args.db)
+    try:
+        with open(args.file, newline='', encoding=args.encoding) as statement:
+            report = import_statement(
+                db, args.user, statement, file_format=file_format, chunk_size=args.chunk_size,
+                delimiter=args.delimiter, progress=progress, columns=columns, date_format=args.date_format,
+                decimal_separator=args.decimal_separator, default_category=args.default_category,
+            )
+    finally:
+        db.close()
+
+    print(f"{report.imported} of {report.rows} rows imported in {report.elapsed:.2f}s "
+          f"({report.rows_per_second:.0f} rows/s), {report.failed} rejected.")
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ('orjson', 'stdlib')
+
+
+def _default(value):
+    """Serializes the types neither backend handles natively."""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def available_backends():
+    return [backend for backend in BACKENDS if backend != 'orjson' or orjson is not None]
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    JSON provider that serializes with orjson when it is installed and with
+    the standard library otherwise. Dates and datetimes are written as ISO
+    8601 strings by both backends, output is compact UTF-8 and keys keep
+    their insertion order.
+    """
+
+    mimetype = 'application/json'
+
+    def __init__(self, app, backend: str = None):
+        super().__init__(app)
+        if backend is None:
+            backend = 'orjson' if orjson is not None else 'stdlib'
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend '{backend}'. Use one of: {', '.join(BACKENDS)}.")
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("The orjson backend requires the orjson package.")
+        self.backend = backend
+
+    def dumps_bytes(self, obj, indent: bool = False) -> bytes:
+        if self.backend == 'orjson':
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+        return json.dumps(obj, default=_default, ensure_ascii=False, indent=2 if indent else None,
+                          separators=None if indent else (',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Explicit options (sort_keys, indent, ...) keep the stdlib semantics.
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj, indent=self._app.debug), mimetype=self.mimetype)
@@ -0,0 +1,120 @@
+"""
+Incremental parsing of large JSON arrays.
+
+iter_json_array decodes a body one element at a time while reading it from
+a binary stream, so a batch of any length is parsed in memory proportional
+to its largest element instead of to the whole body.
+"""
+import codecs
+import json
+
+READ_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Text decoded from a binary stream, buffered until it is consumed."""
+
+    def __init__(self, stream, read_size: int):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Appends the next read to the unconsumed text. Returns False once the stream is exhausted."""
+        if self.eof:
+            return False
+        data = self.stream.read(self.read_size)
+        self.eof = not data
+        self.buffer = self.buffer[self.position:] + self.decoder.decode(data, final=self.eof)
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or '' at the end of the stream."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        """Consumes the next character, which must be one of `characters`."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise self.error(f"Expecting {' or '.join(repr(expected) for expected in characters)}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """Decodes the next JSON value, reading until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number that ends the buffer may go on in the next read.
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.position = end
+            return value
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buffer, self.position)
+
+
+def iter_json_array(stream, key: str = None, read_size: int = READ_SIZE):
+    """
+    Returns an iterator over the elements of the JSON array read from
+    `stream`, a binary file holding UTF-8 JSON. With `key`, the body may
+    also be an object holding the array under that key; its other members
+    are skipped. The body is read up to the array before returning, raising
+    ValueError when it holds no such array. Syntax errors further on raise
+    json.JSONDecodeError, a ValueError, while iterating.
+    """
+    reader = _Reader(stream, read_size)
+    in_object = key is not None and reader.peek() == '{'
+    if in_object:
+        reader.expect('{')
+        if reader.peek() == '}':
+            raise ValueError(f"Missing '{key}' array.")
+        while True:
+            name = reader.value()
+            if not isinstance(name, str):
+                raise reader.error("Expecting property name enclosed in double quotes")
+            reader.expect(':')
+            if name == key:
+                break
+            reader.value()
+            if reader.expect(',}') == '}':
+                raise ValueError(f"Missing '{key}' array.")
+    reader.expect('[')
+    return _elements(reader, in_object)
+
+
+def _elements(reader: _Reader, in_object: bool):
+    if reader.peek() == ']':
+        reader.position += 1
+    else:
+        while True:
+            yield reader.value()
+            if reader.expect(',]') == ']':
+                break
+    if in_object:
+        while reader.expect(',}') == ',':
+            if not isinstance(reader.value(), str):
+                raise reader.error("Expecting property name enclosed in double quotes")
+            reader.expect(':')
+            reader.value()
+    if reader.peek():
+        raise reader.error("Extra data")
@@ -0,0 +1,128 @@
+import bisect
+import threading
+
+# Request latencies in seconds, from sub-millisecond cache hits to slow exports.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if value in (float('inf'), float('-inf')):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense. Not locked; the registry serializes access."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of labelled counters and histograms, rendered in the
+    Prometheus text exposition format. Label sets are given as dicts and
+    should stay low-cardinality (route templates, not raw paths).
+    """
+
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def _register(self, name: str, metric_type: str, help_text: str):
+        name = self.prefix + name
+        if name not in self._types:
+            self._types[name] = metric_type
+            self._help[name] = help_text
+        elif self._types[name] != metric_type:
+            raise ValueError(f"Metric '{name}' is already registered as a {self._types[name]}.")
+        return name
+
+    def inc(self, name: str, value: float = 1, labels: dict = None, help_text: str = ''):
+        key_labels = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            name = self._register(name, 'counter', help_text)
+            key = (name, key_labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: dict = None, help_text: str = '', buckets=DEFAULT_BUCKETS):
+        key_labels = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            name = self._register(name, 'histogram', help_text)
+            key = (name, key_labels)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._help.clear()
+            self._types.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges: dict = None) -> str:
+        """
+        Returns every metric in the text exposition format. `gauges` adds
+        point-in-time values as {name: (help, value)}, read by the caller.
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._types):
+                lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types[name]}")
+                if self._types[name] == 'counter':
+                    for (metric, labels), value in sorted(self._counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for (metric, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            name = self.prefix + name
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,170 @@
+"""
+Schema migrations for existing databases.
+
+Usage:
+    python -m src.migrations indexes --db finance.db
+    python -m src.migrations shared --db finance.db
+    python -m src.migrations totals --db finance.db
+    python -m src.migrations cents --db finance.db [--storage shared]
+    python -m src.migrations compact --db finance.db [--storage shared] [--encoding cents]
+    python -m src.migrations search --db finance.db [--storage shared]
+"""
+import argparse
+import sys
+
+from src.aggregates import MonthlyTotals
+from src.db_manager import DatabaseManager
+from src.query import quote_identifier
+from src.search import SearchIndex
+from src.storage import ENCODINGS, LAYOUTS, CentsEncoding, CompactEncoding, PerUserTableLayout, SharedTableLayout, create_layout
+
+
+def add_transaction_indexes(db: DatabaseManager):
+    """Creates the filter indexes on every existing user table. Returns the migrated users."""
+    users = db.list_users()
+    for user in users:
+        db.create_indexes(user)
+    return users
+
+
+def migrate_to_shared_table(db: DatabaseManager):
+    """
+    Moves every per-user table into the shared `transactions` table in a
+    single SQLite transaction, one INSERT ... SELECT per user, and drops the
+    old tables and their search indexes. Transaction ids are reassigned from
+    the shared id space, and the shared search index is built to match.
+    Change logs are cleared, so syncing clients reload their listings.
+    Returns the migrated users.
+    """
+    shared = SharedTableLayout(db.layout.encoding)
+    shared.initialize(db.cursor)
+    shared_search = SearchIndex(shared)
+    legacy = PerUserTableLayout(db.layout.encoding)
+    legacy_search = SearchIndex(legacy)
+    legacy_users = legacy.list_users(db.cursor)
+
+    db.cursor.execute("BEGIN")
+    try:
+        shared_search.initialize(db.cursor)
+        for user in legacy_users:
+            shared.create_user(db.cursor, user)
+            db.cursor.execute(
+                f"INSERT INTO transactions (date, description, category, amount, type, user_id) "
+                f"SELECT date, description, category, amount, type, ? FROM {legacy.table(user)} ORDER BY id",
+                (shared.find_user(db.cursor, user),)
+            )
+            db.cursor.execute(f"DROP TABLE {legacy.table(user)}")
+            legacy_search.drop(db.cursor, user)
+            shared_search.rebuild(db.cursor, user, shared.find_user(db.cursor, user))
+            db.changes.clear(db.cursor, user)
+    except Exception:
+        db.connection.rollback()
+        raise
+    db.commit()
+    return legacy_users
+
+
+def rebuild_monthly_totals(db: DatabaseManager):
+    """Backfills the monthly totals behind the summary endpoint for every user."""
+    users = db.list_users()
+    for user in users:
+        db.rebuild_summary(user)
+    return users
+
+
+def convert_encoding(db: DatabaseManager, encoding):
+    """
+    Rewrites every transaction table in `encoding` inside a single SQLite
+    transaction: each table is copied into a new one with the encoding's
+    column types, converting the values in SQL, and replaces the old one.
+    Ids are kept. The monthly totals are then rebuilt with SQLite sums in
+    the new amount unit, and `db` switches to the new encoding. Returns the
+    migrated users.
+    """
+    source = db.layout.encoding
+    target = type(db.layout)(encoding)
+    users = db.list_users()
+    columns = ', '.join(['date', 'description', 'category', 'amount', 'type', 'id', *target.owner_columns])
+    values = ', '.join([*(encoder.format(decoder) for encoder, decoder in zip(encoding.encoders, source.decoders)),
+                        'id', *target.owner_columns])
+
+    db.cursor.execute("BEGIN")
+    try:
+        encoding.initialize(db.cursor)
+        for table in target.transaction_tables(db.cursor):
+            converted = f"{table}__{encoding.name}"
+            encoding.prepare_migration(db.cursor, quote_identifier(table), source)
+            db.cursor.execute(target.table_schema(converted))
+            db.cursor.execute(f"INSERT INTO {quote_identifier(converted)} ({columns}) SELECT {values} FROM {quote_identifier(table)}")
+            db.cursor.execute(f"DROP TABLE {quote_identifier(table)}")
+            db.cursor.execute(f"ALTER TABLE {quote_identifier(converted)} RENAME TO {quote_identifier(table)}")
+        target.initialize(db.cursor)
+        for user in users:
+            target.create_indexes(db.cursor, user)
+        db.layout = target
+        db.totals = MonthlyTotals(encoding)
+        db.search = SearchIndex(target)
+        db.cursor.execute(f"DROP TABLE IF EXISTS {db.totals.table}")
+        db.totals.initialize(db.cursor)
+        with db.deferred_commit():
+            for user in users:
+                db.rebuild_summary(user)
+    except Exception:
+        db.connection.rollback()
+        raise
+    db.commit()
+    return users
+
+
+def migrate_to_cents(db: DatabaseManager):
+    """Stores amounts as integer cents and types as integer codes. Returns the migrated users."""
+    return convert_encoding(db, CentsEncoding())
+
+
+def migrate_to_compact(db: DatabaseManager):
+    """
+    Moves to STRICT tables with day-number dates, category ids and integer
+    cents. Returns the migrated users.
+    """
+    return convert_encoding(db, CompactEncoding())
+
+
+def rebuild_search_indexes(db: DatabaseManager):
+    """Re-indexes every user's transactions for full-text search."""
+    users = db.list_users()
+    with db.deferred_commit():
+        for user in users:
+            db.rebuild_search_index(user)
+    db.commit()
+    return users
+
+
+MIGRATIONS = {
+    'cents': migrate_to_cents,
+    'compact': migrate_to_compact,
+    'indexes': add_transaction_indexes,
+    'search': rebuild_search_indexes,
+    'shared': migrate_to_shared_table,
+    'totals': rebuild_monthly_totals,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a schema migration to a finance database.")
+    parser.add_argument('migration', choices=sorted(MIGRATIONS), help="migration to apply")
+    parser.add_argument('--db', default='finance.db', help="SQLite database file (default: finance.db)")
+    parser.add_argument('--storage', choices=sorted(LAYOUTS), default='per_user', help="storage layout of the database")
+    parser.add_argument('--encoding', choices=sorted(ENCODINGS), default='real', help="current value encoding of the database")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.db, layout=create_layout(args.storage, args.encoding))
+    try:
+        users = MIGRATIONS[args.migration](db)
+    finally:
+        db.close()
+    print(f"Migration '{args.migration}' applied to {len(users)} users.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
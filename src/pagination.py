@@ -0,0 +1,88 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+
+def encode_key(key) -> str:
+    payload = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_key(token: str) -> tuple:
+    """Returns the (sort value, id) pair encoded in a cursor token."""
+    try:
+        value, transaction_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid pagination cursor.")
+    if not isinstance(transaction_id, int):
+        raise ValueError("Invalid pagination cursor.")
+    return value, transaction_id
+
+
+def _is_iso_date(value) -> bool:
+    """Whether a cursor value is a 'YYYY-MM-DD' date string."""
+    if not isinstance(value, str) or len(value) != 10:
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def encode_cursor(row) -> str:
+    """Builds an opaque keyset cursor pointing just past the given row."""
+    date, transaction_id = row[0], row[5]
+    if hasattr(date, 'isoformat'):
+        date = date.isoformat()
+    return encode_key([date, transaction_id])
+
+
+def decode_cursor(token: str) -> tuple:
+    """Returns the (date, id) pair encoded in a cursor token."""
+    value, transaction_id = decode_key(token)
+    if not _is_iso_date(value):
+        raise ValueError("Invalid pagination cursor.")
+    return value, transaction_id
+
+
+def encode_sort_cursor(row, column: int) -> str:
+    """Builds a cursor past a row of a listing sorted by `column`, then id."""
+    value = row[column]
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return encode_key([value, row[5]])
+
+
+def decode_sort_cursor(token: str, numeric: bool = False) -> tuple:
+    """Returns the (sort value, id) pair of a sorted listing's cursor; the value is a number or a date string."""
+    value, transaction_id = decode_key(token)
+    valid = (isinstance(value, (int, float)) and not isinstance(value, bool)) if numeric else _is_iso_date(value)
+    if not valid:
+        raise ValueError("Invalid pagination cursor.")
+    return value, transaction_id
+
+
+def encode_search_cursor(row) -> str:
+    """Builds a cursor past a search result row, which ends with its score."""
+    return encode_key([row[6], row[5]])
+
+
+def decode_search_cursor(token: str) -> tuple:
+    """Returns the (score, id) pair encoded in a search cursor token."""
+    score, transaction_id = decode_key(token)
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError("Invalid pagination cursor.")
+    return score, transaction_id
+
+
+def paginate(rows, limit: int, cursor_of=encode_cursor):
+    """
+    Splits rows fetched with `limit + 1` into the page itself and the cursor
+    of the next page, which is None when there are no more rows.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, cursor_of(rows[-1])
+    return rows, None
@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+import time
+
+from src.connection_pool import read_only_uri
+
+
+class ReplicaRefresher:
+    """
+    Keeps a local copy of a database, refreshed every `interval` seconds
+    with the SQLite backup API, for reads that can be a little stale.
+
+    Each refresh copies the source in one step from a read-only connection,
+    so under WAL it never blocks the writers, and writes it to the replica
+    in one transaction. The replica is kept in WAL mode, so its readers keep
+    their snapshot while a refresh runs and see the next one once they start
+    a new transaction. A refresh copies the whole file.
+
+    start() refreshes once before returning, so the replica exists for the
+    read-only connections opened on it afterwards.
+    """
+
+    def __init__(self, source_path: str, replica_path: str, interval: float = 30.0):
+        if interval <= 0:
+            raise ValueError("Refresh interval must be positive.")
+        self.source_path = source_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self._target = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._refreshes = 0
+        self._failures = 0
+        self._last_error = None
+        self._last_refresh = None
+        self._refresh_time = 0.0
+        self._max_refresh_time = 0.0
+
+    def refresh(self):
+        """Copies the source database over the replica now."""
+        with self._lock:
+            if self._target is None:
+                self._target = sqlite3.connect(self.replica_path, check_same_thread=False)
+                self._target.execute("PRAGMA journal_mode = WAL")
+            start = time.perf_counter()
+            source = sqlite3.connect(read_only_uri(self.source_path), uri=True)
+            try:
+                source.backup(self._target)
+            finally:
+                source.close()
+            elapsed = time.perf_counter() - start
+            self._refreshes += 1
+            self._last_refresh = time.time()
+            self._refresh_time += elapsed
+            self._max_refresh_time = max(self._max_refresh_time, elapsed)
+
+    def start(self):
+        """Refreshes the replica, then keeps refreshing it on a background thread."""
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='db-replica', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                with self._lock:
+                    self._failures += 1
+                    self._last_error = str(e)
+
+    def close(self):
+        """Stops refreshing. The replica file is left in place."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._target is not None:
+                self._target.close()
+                self._target = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            refreshes = self._refreshes
+            return {
+                'interval': self.interval,
+                'refreshes': refreshes,
+                'failures': self._failures,
+                'last_error': self._last_error,
+                'age_seconds': round(time.time() - self._last_refresh, 3) if self._last_refresh is not None else None,
+                'avg_refresh_ms': (self._refresh_time / refreshes * 1000) if refreshes else 0.0,
+                'max_refresh_ms': self._max_refresh_time * 1000,
+            }
@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store bounded by entry count and total value size, with
+    per-entry expiry. Any object with the same get/set/delete/clear methods
+    can replace it as a ResponseCache backend.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _size(self, value) -> int:
+        return len(value[0]) if isinstance(value, tuple) else len(value)
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= self._size(value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'evictions': self.evictions}
+
+
+class ResponseCache:
+    """
+    Per-user cache of serialized responses. Each user has a random version
+    token that is part of every key, so invalidating a user is a single write
+    and stale entries simply age out of the backend. Callers read the version
+    before querying the database and store under that same version, so a
+    response computed before a concurrent write can never outlive it.
+    """
+
+    def __init__(self, backend=None, ttl: float = 60.0):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def version(self, user: str) -> str:
+        version = self.backend.get(('version', user))
+        if version is None:
+            version = uuid.uuid4().hex
+            self.backend.set(('version', user), version)
+        return version
+
+    def get(self, user: str, version: str, request_key: str):
+        """Returns the cached (body, etag, mimetype) for a request, or None."""
+        entry = self.backend.get(('response', user, version, request_key))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, user: str, version: str, request_key: str, body: bytes, mimetype: str = 'application/json') -> str:
+        """Stores a response body and returns its ETag."""
+        etag = hashlib.sha1(body).hexdigest()
+        self.backend.set(('response', user, version, request_key), (body, etag, mimetype), self.ttl)
+        with self._lock:
+            self.stores += 1
+        return etag
+
+    def invalidate(self, user: str):
+        self.backend.set(('version', user), uuid.uuid4().hex)
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses, 'stores': self.stores, 'invalidations': self.invalidations}
+        if hasattr(self.backend, 'stats'):
+            stats.update(self.backend.stats())
+        return stats
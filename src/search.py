@@ -0,0 +1,161 @@
+import re
+import sqlite3
+
+# Column weights for bm25(): description matches rank above category matches.
+DESCRIPTION_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.0
+# A shared table is indexed in this many partitions by user id, so a search
+# reads and ranks the doclists of about 1/SHARED_PARTITIONS of the users.
+# Changing it requires `python -m src.migrations search`.
+SHARED_PARTITIONS = 16
+_TERM = re.compile(r"\w+")
+
+
+def match_expression(text: str, max_terms: int = 16) -> str:
+    """
+    Turns free text into an FTS5 query matching rows that contain every
+    word as a prefix, e.g. 'caf merc' -> '"caf"* "merc"*'. Words are quoted,
+    so FTS5 operators in the text are searched for literally.
+    """
+    terms = _TERM.findall(text)[:max_terms]
+    if not terms:
+        raise ValueError("Search query must contain at least one word.")
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    """
+    FTS5 index over transaction descriptions and categories with the
+    transaction id as its rowid. Categories are indexed by name and accents
+    are folded, so 'saude' finds 'Saúde'.
+
+    Per-user tables get one index each. A shared table gets a fixed set of
+    partitions, whose rows also carry an owner token that restricts matches
+    to one user inside the full-text query itself.
+
+    Indexes missing for existing tables are built on first use.
+    """
+
+    def __init__(self, layout, partitions: int = SHARED_PARTITIONS):
+        self.layout = layout
+        self.partitions = partitions
+
+    def _owned(self) -> bool:
+        return bool(self.layout.owner_columns)
+
+    def _owner(self, user_key) -> str:
+        return f"u{user_key}"
+
+    def name(self, user: str, user_key=None) -> str:
+        # ':' cannot appear in an unquoted table name, so no user can own this name.
+        if self._owned():
+            return f"{self.layout.table_name(user)}:fts{user_key % self.partitions}"
+        return f"{self.layout.table_name(user)}:fts"
+
+    def table(self, user: str, user_key=None) -> str:
+        return f'"{self.name(user, user_key)}"'
+
+    def _columns(self) -> str:
+        return "rowid, description, category, owner" if self._owned() else "rowid, description, category"
+
+    def exists(self, cursor, user: str, user_key=None) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.name(user, user_key),))
+        return cursor.fetchone() is not None
+
+    def initialize(self, cursor):
+        """Creates the shared partitions, indexing the existing rows of each the first time."""
+        if not self._owned():
+            return
+        owner_column = self.layout.owner_columns[0]
+        for partition in range(self.partitions):
+            if self.exists(cursor, None, partition):
+                continue
+            self.create(cursor, None, partition)
+            cursor.execute(
+                f"INSERT INTO {self.table(None, partition)} ({self._columns()}) "
+                f"SELECT id, description, {self.layout.encoding.category_name_sql}, 'u' || {owner_column} "
+                f"FROM {self.layout.table(None)} WHERE {owner_column} % ? = ?",
+                (self.partitions, partition)
+            )
+
+    def create(self, cursor, user: str, user_key=None):
+        owner = ", owner" if self._owned() else ""
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table(user, user_key)} USING fts5(description, category{owner}, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def drop(self, cursor, user: str, user_key=None):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table(user, user_key)}")
+
+    def remove(self, cursor, user: str, user_key=None):
+        """Removes all of the user's rows from the index."""
+        if self._owned():
+            index = self.table(user, user_key)
+            cursor.execute(f"DELETE FROM {index} WHERE {index} MATCH ?", (f'owner : "{self._owner(user_key)}"',))
+        else:
+            self.drop(cursor, user)
+
+    def rebuild(self, cursor, user: str, user_key=None):
+        """Re-indexes all of the user's transactions from their table."""
+        self.create(cursor, user, user_key)
+        index = self.table(user, user_key)
+        table = self.layout.table(user)
+        conditions, parameters = self.layout.scope(user_key)
+        if self._owned():
+            self.remove(cursor, user, user_key)
+            select_query = f"SELECT id, description, {self.layout.encoding.category_name_sql}, ? FROM {table}"
+            parameters = [self._owner(user_key)] + parameters
+        else:
+            cursor.execute(f"DELETE FROM {index}")
+            select_query = f"SELECT id, description, {self.layout.encoding.category_name_sql} FROM {table}"
+        if conditions:
+            select_query += " WHERE " + " AND ".join(conditions)
+        cursor.execute(f"INSERT INTO {index} ({self._columns()}) {select_query}", parameters)
+
+    def _write(self, cursor, user: str, user_key, statement: str, rows):
+        try:
+            cursor.executemany(statement, rows)
+        except sqlite3.OperationalError as e:
+            if 'no such table' not in str(e):
+                raise
+            # The transaction table already holds the change, so the rebuilt index does too.
+            self.rebuild(cursor, user, user_key)
+
+    def add(self, cursor, user: str, user_key, rows):
+        """Indexes (transaction id, (date, description, category, amount, type)) pairs."""
+        owner = (self._owner(user_key),) if self._owned() else ()
+        placeholders = ", ".join("?" * (3 + len(owner)))
+        self._write(cursor, user, user_key, f"INSERT INTO {self.table(user, user_key)} ({self._columns()}) VALUES ({placeholders})",
+                    [(transaction_id, values[1], values[2], *owner) for transaction_id, values in rows])
+
+    def update(self, cursor, user: str, user_key, transaction_id: int, values: tuple):
+        self._write(cursor, user, user_key, f"UPDATE {self.table(user, user_key)} SET description = ?, category = ? WHERE rowid = ?",
+                    [(values[1], values[2], transaction_id)])
+
+    def delete(self, cursor, user: str, user_key, transaction_id: int):
+        self._write(cursor, user, user_key, f"DELETE FROM {self.table(user, user_key)} WHERE rowid = ?", [(transaction_id,)])
+
+    def matches(self, user: str, user_key, text: str, limit: int = None, after: tuple = None):
+        """
+        Returns a (query, parameters) pair selecting the (match_id, score) of
+        the user's rows matching `text`, best first (a lower score ranks
+        higher), past the (score, id) `after` and at most `limit` of them.
+        Ranking and limiting here keeps callers from reading the transaction
+        table for matches outside the page.
+        """
+        expression = f"{{description category}} : ({match_expression(text)})"
+        if self._owned():
+            expression = f'owner : "{self._owner(user_key)}" AND {expression}'
+        weights = f"{DESCRIPTION_WEIGHT}, {CATEGORY_WEIGHT}" + (", 0.0" if self._owned() else "")
+        index = self.table(user, user_key)
+        query = f"SELECT rowid AS match_id, bm25({index}, {weights}) AS score FROM {index} WHERE {index} MATCH ?"
+        parameters = [expression]
+        if after is not None:
+            query = f"SELECT match_id, score FROM ({query}) WHERE (score, match_id) > (?, ?)"
+            parameters.extend(after)
+        query += " ORDER BY score, match_id"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        return query, parameters
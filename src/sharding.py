@@ -0,0 +1,316 @@
+"""
+Spreads users over several SQLite files ("shards") by consistent hashing,
+so writes to different shards take different database locks and WALs.
+
+Usage:
+    python -m src.sharding rebalance --db finance.db --from 1 --to 4 [--storage shared] [--encoding cents]
+    python -m src.sharding locate --db finance.db --shards 4 alice bob
+"""
+import argparse
+import bisect
+import hashlib
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date
+
+from src.connection_pool import ConnectionPool
+from src.db_manager import DatabaseManager
+from src.query import CACHED_STATEMENTS
+from src.storage import ENCODINGS, LAYOUTS, create_layout
+from src.transaction_type import TransactionType
+from src.transactions import Transaction
+
+# Points per shard on the hash ring. More points spread users more evenly.
+RING_REPLICAS = 128
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shard_paths(db_path: str, count: int):
+    """
+    Returns the database file of each shard. A single shard is `db_path`
+    itself; with more, 'finance.db' becomes 'finance.0.db', 'finance.1.db'...
+    """
+    if count < 1:
+        raise ValueError("Shard count must be at least 1.")
+    if count == 1:
+        return [db_path]
+    root, extension = os.path.splitext(db_path)
+    return [f"{root}.{index}{extension}" for index in range(count)]
+
+
+class HashRing:
+    """
+    Consistent hash ring over shard indexes. Each shard owns RING_REPLICAS
+    points, and a key belongs to the shard owning the first point at or
+    after its hash. Growing from N to N + 1 shards moves about 1/(N + 1) of
+    the keys, all of them to the new shard.
+    """
+
+    def __init__(self, count: int, replicas: int = RING_REPLICAS):
+        points = sorted((_hash(f"shard-{shard}#{replica}"), shard) for shard in range(count) for replica in range(replicas))
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect_left(self._points, _hash(key))
+        return self._shards[index % len(self._points)]
+
+
+class ShardMap:
+    """Routes usernames to shard indexes and database files."""
+
+    def __init__(self, db_path: str, count: int, replicas: int = RING_REPLICAS):
+        self.db_path = db_path
+        self.count = count
+        self.paths = shard_paths(db_path, count)
+        self.ring = HashRing(count, replicas)
+
+    def shard_for(self, user: str) -> int:
+        return self.ring.shard_for(user) if self.count > 1 else 0
+
+    def path_for(self, user: str) -> str:
+        return self.paths[self.shard_for(user)]
+
+
+class ShardedPool:
+    """One ConnectionPool of `size` connections per shard."""
+
+    def __init__(self, shard_map: ShardMap, size: int = 5, timeout: float = 5.0, pragmas: dict = None, read_only: bool = False,
+                 cached_statements: int = CACHED_STATEMENTS):
+        self.shard_map = shard_map
+        self.pools = [ConnectionPool(path, size=size, timeout=timeout, pragmas=pragmas, read_only=read_only,
+                                     cached_statements=cached_statements)
+                      for path in shard_map.paths]
+
+    def close(self):
+        for pool in self.pools:
+            pool.close()
+
+    def stats(self) -> dict:
+        """Sums the counters of every shard's pool; averages and maxima are taken over shards."""
+        shards = [pool.stats() for pool in self.pools]
+        totals = {key: sum(stats[key] for stats in shards) for key in shards[0] if not key.endswith('_ms')}
+        checkouts = totals['checkouts']
+        totals['avg_checkout_ms'] = (sum(stats['avg_checkout_ms'] * stats['checkouts'] for stats in shards) / checkouts) if checkouts else 0.0
+        totals['max_checkout_ms'] = max(stats['max_checkout_ms'] for stats in shards)
+        totals['shards'] = shards
+        return totals
+
+
+class ShardedWriteQueue:
+    """
+    One WriteQueue per shard. Operations are routed by their username
+    argument, so each shard group-commits on its own writer thread and
+    connection.
+    """
+
+    def __init__(self, shard_map: ShardMap, queues):
+        self.shard_map = shard_map
+        self.queues = list(queues)
+
+    def submit(self, method: str, user: str, *args, **kwargs):
+        return self.queues[self.shard_map.shard_for(user)].submit(method, user, *args, **kwargs)
+
+    def close(self):
+        for write_queue in self.queues:
+            write_queue.close()
+
+    def stats(self) -> dict:
+        shards = [write_queue.stats() for write_queue in self.queues]
+        batches = sum(stats['batches'] for stats in shards)
+        operations = sum(stats['operations'] for stats in shards)
+        return {
+            'pending': sum(stats['pending'] for stats in shards),
+            'batches': batches,
+            'operations': operations,
+            'failures': sum(stats['failures'] for stats in shards),
+            'max_batch': max(stats['max_batch'] for stats in shards),
+            'avg_batch': round(operations / batches, 2) if batches else 0.0,
+            'avg_batch_ms': round(sum(stats['avg_batch_ms'] * stats['batches'] for stats in shards) / batches, 3) if batches else 0.0,
+            'shards': shards,
+        }
+
+
+class ShardedDatabaseManager:
+    """
+    DatabaseManager over every shard. Methods taking a username first run
+    on the DatabaseManager of that user's shard, which borrows a connection
+    from the shard's pool on first use and keeps it until close().
+    list_users() merges every shard. With `read_only`, every shard is read
+    through read-only DatabaseManagers.
+    """
+
+    USER_METHODS = (
+        'ensure_user_table_exists', 'add_transaction', 'add_transactions', 'update_transaction_by_id',
+        'delete_transaction_by_id', 'get_transaction_by_id', 'get_summary', 'rebuild_summary', 'rebuild_search_index',
+        'search_transactions', 'iter_transactions', 'get_category_transactions', 'get_all_transactions',
+        'get_all_debits', 'get_all_credits', 'get_month_transactions', 'get_transactions_between',
+        'query_transactions', 'query_totals', 'get_changes', 'check_username_availability', 'create_user_table', 'drop_user', 'create_indexes',
+    )
+
+    def __init__(self, shard_map: ShardMap, pool: ShardedPool = None, layout=None, user_cache=None, slow_query_log=None,
+                 read_only: bool = False):
+        self.shard_map = shard_map
+        self.read_only = read_only
+        self.pool = pool
+        self.layout = layout
+        self.user_cache = user_cache
+        self.slow_query_log = slow_query_log
+        self._cursor_wrapper = None
+        self._shards = {}
+
+    def shard(self, index: int) -> DatabaseManager:
+        """Returns the DatabaseManager of a shard, connecting on first use."""
+        db = self._shards.get(index)
+        if db is None:
+            db = DatabaseManager(self.shard_map.paths[index], pool=self.pool.pools[index] if self.pool is not None else None,
+                                 layout=self.layout, user_cache=self.user_cache, slow_query_log=self.slow_query_log,
+                                 read_only=self.read_only)
+            if self._cursor_wrapper is not None:
+                db.wrap_cursor(self._cursor_wrapper)
+            self._shards[index] = db
+        return db
+
+    def for_user(self, user: str) -> DatabaseManager:
+        return self.shard(self.shard_map.shard_for(user))
+
+    def __getattr__(self, name):
+        if name not in self.USER_METHODS:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        def routed(user, *args, **kwargs):
+            return getattr(self.for_user(user), name)(user, *args, **kwargs)
+        routed.__name__ = name
+        return routed
+
+    def wrap_cursor(self, wrapper):
+        """Wraps the cursor of every shard connection, open or opened later."""
+        self._cursor_wrapper = wrapper
+        for db in self._shards.values():
+            db.wrap_cursor(wrapper)
+
+    def list_users(self):
+        return sorted(user for index in range(self.shard_map.count) for user in self.shard(index).list_users())
+
+    def commit(self):
+        for db in self._shards.values():
+            db.commit()
+
+    @contextmanager
+    def deferred_commit(self):
+        with _deferred_all(list(self._shards.values())):
+            yield self
+
+    def close(self):
+        shards, self._shards = self._shards, {}
+        for db in shards.values():
+            db.close()
+
+
+@contextmanager
+def _deferred_all(databases):
+    if not databases:
+        yield
+        return
+    with databases[0].deferred_commit(), _deferred_all(databases[1:]):
+        yield
+
+
+def _transactions(rows):
+    for row in rows:
+        yield Transaction(date.fromisoformat(str(row[0])), row[1], row[2], row[3], TransactionType(row[4]))
+
+
+def move_user(source: DatabaseManager, target: DatabaseManager, user: str, batch_size: int = 1000):
+    """
+    Copies a user's transactions from `source` to `target` in one target
+    transaction, then deletes the user from `source`. A copy left on
+    `target` by an interrupted move is replaced. Transaction ids are
+    reassigned by `target`, so its change log starts past the source's
+    version. Returns the number of transactions moved.
+    """
+    if not target.check_username_availability(user):
+        target.drop_user(user)
+    moved = 0
+    try:
+        with target.deferred_commit():
+            target.create_user_table(user)
+            for rows in source.iter_transactions(user, batch_size):
+                target.add_transactions(user, _transactions(rows), chunk_size=batch_size)
+                moved += len(rows)
+            target.changes.carry_over(target.cursor, user, source.changes.version(source.cursor, user)[0])
+    except Exception:
+        target.connection.rollback()
+        raise
+    target.commit()
+    source.drop_user(user)
+    return moved
+
+
+def rebalance(db_path: str, from_count: int, to_count: int, layout=None):
+    """
+    Moves every user whose shard differs between `from_count` and
+    `to_count` shards to their new shard. Run it with the app stopped.
+    Returns (user, source path, target path, transactions) for each move.
+    """
+    source_map = ShardMap(db_path, from_count)
+    target_map = ShardMap(db_path, to_count)
+    layout = layout if layout is not None else create_layout('per_user')
+    targets = {}
+    moves = []
+    try:
+        for source_path in source_map.paths:
+            if not os.path.exists(source_path):
+                continue
+            source = DatabaseManager(source_path, layout=layout)
+            try:
+                for user in source.list_users():
+                    target_path = target_map.path_for(user)
+                    if target_path == source_path:
+                        continue
+                    if target_path not in targets:
+                        targets[target_path] = DatabaseManager(target_path, layout=layout)
+                    moved = move_user(source, targets[target_path], user)
+                    moves.append((user, source_path, target_path, moved))
+            finally:
+                source.close()
+    finally:
+        for target in targets.values():
+            target.close()
+    return moves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Locate users or rebalance them between database shards.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    rebalance_parser = subparsers.add_parser('rebalance', help="move users to their shard under a new shard count (offline)")
+    rebalance_parser.add_argument('--from', dest='from_count', type=int, required=True, help="current shard count")
+    rebalance_parser.add_argument('--to', dest='to_count', type=int, required=True, help="new shard count")
+    locate_parser = subparsers.add_parser('locate', help="print the shard file of each user")
+    locate_parser.add_argument('--shards', type=int, required=True)
+    locate_parser.add_argument('users', nargs='+')
+    for subparser in (rebalance_parser, locate_parser):
+        subparser.add_argument('--db', default='finance.db', help="base SQLite database file (default: finance.db)")
+        subparser.add_argument('--storage', choices=sorted(LAYOUTS), default='per_user', help="storage layout of the database")
+        subparser.add_argument('--encoding', choices=sorted(ENCODINGS), default='real', help="value encoding of the database")
+    args = parser.parse_args(argv)
+
+    if args.command == 'locate':
+        shard_map = ShardMap(args.db, args.shards)
+        for user in args.users:
+            print(f"{user}\t{shard_map.path_for(user)}")
+        return 0
+
+    moves = rebalance(args.db, args.from_count, args.to_count, create_layout(args.storage, args.encoding))
+    for user, source_path, target_path, moved in moves:
+        print(f"{user}: {source_path} -> {target_path} ({moved} transactions)")
+    print(f"Rebalanced {len(moves)} users from {args.from_count} to {args.to_count} shards.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
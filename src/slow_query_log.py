@@ -0,0 +1,254 @@
+"""
+Opt-in slow-query log for DatabaseManager.
+
+Statements slower than a threshold are written as JSON lines to a rotating
+file with their parameters, row count and EXPLAIN QUERY PLAN output, and
+aggregated in memory by normalized statement so the worst offenders can be
+ranked. A log file (with its rotated backups) can be ranked offline:
+
+Usage:
+    python -m src.slow_query_log finance-slow.log --top 20
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from src.storage import INTERNAL_TABLES
+
+# Statements EXPLAIN QUERY PLAN can describe.
+EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'with', 'replace')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_TABLE = re.compile(r'\b(FROM|INTO|UPDATE|JOIN|TABLE(?: IF NOT EXISTS)?|ON)\s+(\w+|"[^"]+")', re.IGNORECASE)
+_INDEX = re.compile(r'"[^"]+:(date|category|type)_idx"|[^"\s]+:(date|category|type)_idx\b')
+
+
+def normalize(statement: str) -> str:
+    """
+    Reduces a statement to its shape: literals become ?, IN lists collapse
+    and per-user table names become <user>, so the same query issued for
+    different users and values aggregates together.
+    """
+    normalized = _STRING.sub('?', statement)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _IN_LIST.sub('(?, ...)', normalized)
+
+    def table(match):
+        name = match.group(2).strip('"')
+        if name in INTERNAL_TABLES or name.startswith('sqlite_') or name.upper() in ('SELECT', 'NOT', 'CONFLICT'):
+            return match.group(0)
+        # Search indexes are named '<table>:fts...'.
+        suffix = name[name.index(':'):] if ':' in name else ''
+        return f"{match.group(1)} <user>{suffix}"
+    normalized = _TABLE.sub(table, normalized)
+    normalized = _INDEX.sub(lambda match: f"<user>:{match.group(1) or match.group(2)}_idx", normalized)
+    return ' '.join(normalized.split())
+
+
+def is_full_scan(plan) -> bool:
+    """True when a plan scans a table without an index."""
+    return any(detail.startswith('SCAN ') and ' INDEX ' not in detail and 'CONSTANT ROW' not in detail for detail in plan)
+
+
+class SlowQueryLog:
+    """
+    Records statements slower than `threshold_ms`. Plans are captured once
+    per normalized statement, on the connection that ran it.
+    """
+
+    def __init__(self, path: str = None, threshold_ms: float = 100.0, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, explain: bool = True):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._stats = {}
+        self._logger = None
+        if path:
+            self._logger = logging.getLogger(f'slow_query.{os.path.abspath(path)}')
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            if not self._logger.handlers:
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._logger.addHandler(handler)
+
+    def wrap(self, cursor, connection):
+        return SlowQueryCursor(cursor, connection, self)
+
+    def _plan(self, connection, statement: str, normalized: str, parameters):
+        with self._lock:
+            if normalized in self._plans:
+                return self._plans[normalized]
+        plan = []
+        if self.explain and statement.lstrip().split(None, 1)[0].lower() in EXPLAINABLE:
+            try:
+                if parameters is None:
+                    parameters = [None] * statement.count('?')
+                rows = connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plan = [row[-1] for row in rows]
+            except Exception as e:
+                plan = [f"EXPLAIN failed: {e}"]
+        with self._lock:
+            self._plans[normalized] = plan
+        return plan
+
+    def record(self, connection, statement: str, parameters, seconds: float, rows: int):
+        """Logs and aggregates one statement if it ran for at least the threshold."""
+        if seconds < self.threshold:
+            return
+        normalized = normalize(statement)
+        plan = self._plan(connection, statement, normalized, parameters)
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'duration_ms': round(seconds * 1000, 3),
+            'rows': rows,
+            'statement': ' '.join(statement.split()),
+            'parameters': [value if isinstance(value, (int, float, str)) or value is None else str(value) for value in parameters or ()],
+            'normalized': normalized,
+            'plan': plan,
+            'full_scan': is_full_scan(plan),
+        }
+        with self._lock:
+            stats = self._stats.setdefault(normalized, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+            stats['count'] += 1
+            stats['total_ms'] += entry['duration_ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['duration_ms'])
+            stats['rows'] += rows
+            stats['plan'] = plan
+            stats['full_scan'] = entry['full_scan']
+        if self._logger is not None:
+            self._logger.info(json.dumps(entry, ensure_ascii=False))
+
+    def top(self, limit: int = 20):
+        """Returns the slowest normalized statements, ranked by total time."""
+        with self._lock:
+            ranked = [dict(stats, normalized=normalized) for normalized, stats in self._stats.items()]
+        return rank(ranked)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._stats.clear()
+
+
+def rank(entries):
+    for entry in entries:
+        entry['total_ms'] = round(entry['total_ms'], 3)
+        entry['avg_ms'] = round(entry['total_ms'] / entry['count'], 3)
+    return sorted(entries, key=lambda entry: entry['total_ms'], reverse=True)
+
+
+class SlowQueryCursor:
+    """
+    Wraps a sqlite3 cursor and reports each statement to the log once its
+    result is finished with: when the next statement starts or on flush().
+    Fetch time counts towards the statement.
+    """
+
+    def __init__(self, cursor, connection, log: SlowQueryLog):
+        self._cursor = cursor
+        self._connection = connection
+        self._log = log
+        self._current = None
+
+    def flush(self):
+        if self._current is not None:
+            statement, parameters, seconds, rows = self._current
+            self._current = None
+            self._log.record(self._connection, statement, parameters, seconds, rows)
+
+    def execute(self, statement, parameters=()):
+        self.flush()
+        start = time.perf_counter()
+        result = self._cursor.execute(statement, parameters)
+        self._current = [statement, parameters, time.perf_counter() - start, 0]
+        return result
+
+    def executemany(self, statement, parameters):
+        self.flush()
+        start = time.perf_counter()
+        result = self._cursor.executemany(statement, parameters)
+        # Plans for executemany are explained with NULL parameters.
+        self._current = [statement, None, time.perf_counter() - start, 0]
+        return result
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        rows = fetch(*args)
+        if self._current is not None:
+            self._current[2] += time.perf_counter() - start
+            self._current[3] += len(rows) if isinstance(rows, list) else int(rows is not None)
+        return rows
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def close(self):
+        self.flush()
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def read_log(path: str):
+    """Yields entries from a log file and its rotated backups, oldest first."""
+    paths = [f"{path}.{index}" for index in range(99, 0, -1) if os.path.exists(f"{path}.{index}")]
+    if os.path.exists(path):
+        paths.append(path)
+    for log_path in paths:
+        with open(log_path, encoding='utf-8') as log_file:
+            for line in log_file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def summarize_log(path: str):
+    """Aggregates a log file by normalized statement, ranked by total time."""
+    stats = {}
+    for entry in read_log(path):
+        aggregate = stats.setdefault(entry['normalized'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+        aggregate['count'] += 1
+        aggregate['total_ms'] += entry['duration_ms']
+        aggregate['max_ms'] = max(aggregate['max_ms'], entry['duration_ms'])
+        aggregate['rows'] += entry['rows']
+        aggregate['plan'] = entry['plan']
+        aggregate['full_scan'] = entry['full_scan']
+    return rank([dict(aggregate, normalized=normalized) for normalized, aggregate in stats.items()])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank the statements in a slow-query log by total time.")
+    parser.add_argument('path', help="slow-query log file")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    for position, entry in enumerate(summarize_log(args.path)[:args.top], start=1):
+        scan = '  FULL SCAN' if entry['full_scan'] else ''
+        print(f"{position:>3}. {entry['total_ms']:>10.1f} ms total  {entry['count']:>6}x  avg {entry['avg_ms']:.1f} ms  "
+              f"max {entry['max_ms']:.1f} ms  {entry['rows']} rows{scan}")
+        print(f"     {entry['normalized']}")
+        for detail in entry['plan']:
+            print(f"       {detail}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
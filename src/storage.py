@@ -0,0 +1,350 @@
+from datetime import date
+
+from src.aggregates import EXPENSE_TYPE, INCOME_TYPE
+from src.query import quote_identifier
+
+# Tables owned by the application itself rather than by a user.
+INTERNAL_TABLES = ('users', 'transactions', 'monthly_totals', 'categories', 'changes', 'change_versions')
+# Columns of a per-user transaction table, whatever its encoding.
+USER_TABLE_COLUMNS = {'date', 'description', 'category', 'amount', 'type', 'id'}
+# Columns leading the per-user filter indexes, named '<user>:<column>_idx'.
+INDEXED_COLUMNS = ('date', 'category', 'type')
+
+# Julian day number of 1970-01-01, the origin of compact day numbers.
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class RealEncoding:
+    """
+    Original encoding: untyped columns holding the amount as a float (REAL)
+    and the type as its name.
+
+    `decoders` are the SQL expressions reading each stored column back as
+    its API value and `encoders` the templates turning an API value
+    expression into its stored form, both in (date, description, category,
+    amount, type) order, so tables can be converted between encodings
+    entirely in SQL. `placeholders` bind the values returned by encode().
+    """
+
+    name = 'real'
+    amount_type = 'REAL'
+    table_options = ''
+    definitions = ('date', 'description', 'category', 'amount', 'type')
+    decoders = ('date', 'description', 'category', 'amount', 'type')
+    encoders = ('{}', '{}', '{}', '{}', '{}')
+    placeholders = ('?', '?', '?', '?', '?')
+    month_sql = 'substr(date, 1, 7)'
+
+    @property
+    def select_columns(self) -> str:
+        return f"{', '.join(self.decoders)}, id"
+
+    @property
+    def category_name_sql(self) -> str:
+        return self.decoders[2]
+
+    @property
+    def type_name_sql(self) -> str:
+        return self.decoders[4]
+
+    def initialize(self, cursor):
+        pass
+
+    def prepare(self, cursor, rows):
+        """Creates whatever stored values reference before `rows` of API values are written."""
+        pass
+
+    def prepare_migration(self, cursor, table: str, source):
+        """Like prepare(), for every row of `table` stored in the `source` encoding."""
+        pass
+
+    def encode(self, values: tuple) -> tuple:
+        """Encodes (date, description, category, amount, type) API values for storage."""
+        return values
+
+    def encode_date(self, value):
+        """Encodes a date or ISO date string for comparisons against the date column."""
+        return value.isoformat() if isinstance(value, date) else value
+
+    def encode_type(self, type_name: str):
+        return type_name
+
+    def encode_amount(self, amount):
+        return amount
+
+    def decode_amount(self, amount):
+        return float(amount)
+
+
+class CentsEncoding(RealEncoding):
+    """
+    Amounts are stored as integer cents and types as signed codes (1 for
+    income, -1 for expenses) in typed INTEGER columns, so totals are exact
+    and SQLite sums them as integers.
+    """
+
+    name = 'cents'
+    amount_type = 'INTEGER'
+    TYPE_CODES = {INCOME_TYPE: 1, EXPENSE_TYPE: -1}
+    definitions = ('date', 'description', 'category', 'amount INTEGER NOT NULL', 'type INTEGER NOT NULL')
+    decoders = ('date', 'description', 'category', 'amount / 100.0',
+                f"CASE type WHEN 1 THEN '{INCOME_TYPE}' ELSE '{EXPENSE_TYPE}' END")
+    encoders = ('{}', '{}', '{}', 'CAST(round({} * 100) AS INTEGER)',
+                f"CASE {{}} WHEN '{INCOME_TYPE}' THEN 1 ELSE -1 END")
+
+    def encode(self, values: tuple) -> tuple:
+        transaction_date, description, category, amount, type_name = values
+        return transaction_date, description, category, self.encode_amount(amount), self.TYPE_CODES[type_name]
+
+    def encode_type(self, type_name: str):
+        return self.TYPE_CODES[type_name]
+
+    def encode_amount(self, amount):
+        return int(round(amount * 100))
+
+    def decode_amount(self, amount):
+        return amount / 100
+
+
+class CompactEncoding(CentsEncoding):
+    """
+    Typed STRICT tables: dates are stored as day numbers since 1970-01-01,
+    categories as ids into the `categories` lookup table, and amounts and
+    types as in the cents encoding. Rows are smaller and every comparison
+    is an integer one.
+    """
+
+    name = 'compact'
+    table_options = ' STRICT'
+    definitions = ('date INTEGER NOT NULL', 'description TEXT NOT NULL',
+                   'category INTEGER NOT NULL REFERENCES categories (id)', 'amount INTEGER NOT NULL', 'type INTEGER NOT NULL')
+    decoders = (f'date({UNIX_EPOCH_JULIAN_DAY} + date)', 'description',
+                '(SELECT name FROM categories WHERE categories.id = category)', *CentsEncoding.decoders[3:])
+    encoders = (f'CAST(julianday({{}}) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER)', '{}',
+                '(SELECT id FROM categories WHERE name = {})', *CentsEncoding.encoders[3:])
+    placeholders = ('?', '?', '(SELECT id FROM categories WHERE name = ?)', '?', '?')
+    month_sql = f"strftime('%Y-%m', {UNIX_EPOCH_JULIAN_DAY} + date)"
+
+    def initialize(self, cursor):
+        cursor.execute("CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE) STRICT")
+
+    def prepare(self, cursor, rows):
+        categories = dict.fromkeys(row[2] for row in rows)
+        if categories:
+            cursor.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", [(name,) for name in categories])
+
+    def prepare_migration(self, cursor, table: str, source):
+        cursor.execute(f"INSERT OR IGNORE INTO categories (name) SELECT DISTINCT {source.category_name_sql} FROM {table}")
+
+    def encode(self, values: tuple) -> tuple:
+        transaction_date, description, category, amount, type_name = values
+        return self.encode_date(transaction_date), description, category, self.encode_amount(amount), self.TYPE_CODES[type_name]
+
+    def encode_date(self, value):
+        if isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        return value.toordinal() - UNIX_EPOCH_ORDINAL
+
+
+def check_internal_tables(cursor):
+    """
+    Raises RuntimeError when a table with an internal name holds a user's
+    transactions, as in databases created before the name was reserved.
+    The application would otherwise take the table over and hide the user.
+    """
+    placeholders = ", ".join("?" for _ in INTERNAL_TABLES)
+    cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name IN ({placeholders})", INTERNAL_TABLES)
+    for table in [row[0] for row in cursor.fetchall()]:
+        cursor.execute("SELECT name FROM pragma_table_info(?)", (table,))
+        if {row[0] for row in cursor.fetchall()} == USER_TABLE_COLUMNS:
+            raise RuntimeError(
+                f"Table '{table}' holds the transactions of user '{table}', a name now reserved for the "
+                f"application. Rename it (ALTER TABLE \"{table}\" RENAME TO ...) before opening the database."
+            )
+
+
+class PerUserTableLayout:
+    """
+    Original layout: every user owns a table named after them, so the schema
+    catalog doubles as the user registry.
+    """
+
+    name = 'per_user'
+    owner_columns = ()
+
+    def __init__(self, encoding=None):
+        self.encoding = encoding if encoding is not None else RealEncoding()
+
+    def initialize(self, cursor):
+        check_internal_tables(cursor)
+        self.encoding.initialize(cursor)
+        self.rename_legacy_indexes(cursor)
+
+    def rename_legacy_indexes(self, cursor):
+        """
+        Recreates indexes named '<user>_date_idx' and so on, as they were
+        before, under their current names. Indexes share the schema namespace
+        with tables, so a later username could take the old names.
+        """
+        cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type='index'")
+        legacy = [(name, table) for name, table in cursor.fetchall()
+                  if name in {f'{table}_{column}_idx' for column in INDEXED_COLUMNS}]
+        for name, _ in legacy:
+            cursor.execute(f"DROP INDEX {quote_identifier(name)}")
+        for table in sorted({table for _, table in legacy}):
+            self.create_indexes(cursor, table)
+
+    def table_name(self, user: str) -> str:
+        """
+        Returns the unquoted name of the user's table. Raises ValueError for
+        names SQLite reserves and names containing ':', which marks the
+        search index tables.
+        """
+        if ':' in user or user.lower().startswith('sqlite_'):
+            raise ValueError(f"Invalid username '{user}'.")
+        return user
+
+    def table(self, user: str) -> str:
+        """Returns the quoted name of the user's table."""
+        return quote_identifier(self.table_name(user))
+
+    def find_user(self, cursor, user: str):
+        """Returns the key identifying the user's rows, or None if the user does not exist."""
+        if user in INTERNAL_TABLES:
+            return None
+        try:
+            self.table(user)
+        except ValueError:
+            return None
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (user,))
+        return True if cursor.fetchone() is not None else None
+
+    def scope(self, user_key):
+        """Returns the (conditions, parameters) restricting a query to the user's rows."""
+        return [], []
+
+    def owner_values(self, user_key) -> tuple:
+        return ()
+
+    def list_users(self, cursor):
+        # Search indexes and their shadow tables are named '<table>:fts...'.
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+                       "AND instr(name, ':') = 0 ORDER BY name")
+        return [row[0] for row in cursor.fetchall() if row[0] not in INTERNAL_TABLES]
+
+    def transaction_tables(self, cursor):
+        return self.list_users(cursor)
+
+    def table_schema(self, table: str) -> str:
+        return (f"CREATE TABLE IF NOT EXISTS {quote_identifier(table)} ({', '.join(self.encoding.definitions)}, "
+                f"id INTEGER PRIMARY KEY){self.encoding.table_options}")
+
+    def create_user(self, cursor, user: str):
+        if user in INTERNAL_TABLES:
+            raise ValueError(f"Username '{user}' is reserved.")
+        cursor.execute(self.table_schema(self.table_name(user)))
+        self.create_indexes(cursor, user)
+
+    def drop_user(self, cursor, user: str, user_key):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table(user)}")
+
+    def index_name(self, user: str, column: str) -> str:
+        """Returns the unquoted name of a filter index. The ':' keeps it apart from every valid username."""
+        return f'{self.table_name(user)}:{column}_idx'
+
+    def create_indexes(self, cursor, user: str):
+        """
+        Creates the indexes backing the date, category and type filters. The
+        filter column leads so equality filters can still be read in date order.
+        """
+        table = self.table(user)
+        for column in INDEXED_COLUMNS:
+            columns = 'date' if column == 'date' else f'{column}, date'
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(self.index_name(user, column))} ON {table} ({columns})")
+
+
+class SharedTableLayout:
+    """
+    All transactions live in one `transactions` table keyed by an integer
+    user id from the `users` table, with composite indexes led by user_id.
+    """
+
+    name = 'shared'
+    owner_columns = ('user_id',)
+
+    def __init__(self, encoding=None):
+        self.encoding = encoding if encoding is not None else RealEncoding()
+
+    def initialize(self, cursor):
+        check_internal_tables(cursor)
+        self.encoding.initialize(cursor)
+        cursor.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        cursor.execute(self.table_schema('transactions'))
+        cursor.execute("CREATE INDEX IF NOT EXISTS transactions_user_date_idx ON transactions (user_id, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS transactions_user_category_idx ON transactions (user_id, category, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS transactions_user_type_idx ON transactions (user_id, type, date)")
+
+    def table_name(self, user: str) -> str:
+        return 'transactions'
+
+    def table(self, user: str) -> str:
+        return 'transactions'
+
+    def find_user(self, cursor, user: str):
+        cursor.execute("SELECT id FROM users WHERE name = ?", (user,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def scope(self, user_key):
+        return ["user_id = ?"], [user_key]
+
+    def owner_values(self, user_key) -> tuple:
+        return (user_key,)
+
+    def list_users(self, cursor):
+        cursor.execute("SELECT name FROM users ORDER BY name")
+        return [row[0] for row in cursor.fetchall()]
+
+    def transaction_tables(self, cursor):
+        return ['transactions']
+
+    def table_schema(self, table: str) -> str:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {quote_identifier(table)} ({', '.join(self.encoding.definitions)}, "
+            f"id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id)){self.encoding.table_options}"
+        )
+
+    def create_user(self, cursor, user: str):
+        cursor.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (user,))
+
+    def drop_user(self, cursor, user: str, user_key):
+        cursor.execute("DELETE FROM transactions WHERE user_id = ?", (user_key,))
+        cursor.execute("DELETE FROM users WHERE id = ?", (user_key,))
+
+    def create_indexes(self, cursor, user: str):
+        pass
+
+
+LAYOUTS = {
+    PerUserTableLayout.name: PerUserTableLayout,
+    SharedTableLayout.name: SharedTableLayout,
+}
+
+ENCODINGS = {
+    RealEncoding.name: RealEncoding,
+    CentsEncoding.name: CentsEncoding,
+    CompactEncoding.name: CompactEncoding,
+}
+
+
+def create_encoding(name: str):
+    if name not in ENCODINGS:
+        raise ValueError(f"Unknown value encoding '{name}'. Use one of: {', '.join(ENCODINGS)}.")
+    return ENCODINGS[name]()
+
+
+def create_layout(name: str, encoding: str = RealEncoding.name):
+    if name not in LAYOUTS:
+        raise ValueError(f"Unknown storage layout '{name}'. Use one of: {', '.join(LAYOUTS)}.")
+    return LAYOUTS[name](create_encoding(encoding))
@@ -0,0 +1,135 @@
+import time
+from contextlib import contextmanager
+
+
+class RequestTimer:
+    """
+    Collects named span durations and per-statement database timings for
+    one request. Spans with the same name and description accumulate.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.statements = []
+
+    @contextmanager
+    def span(self, name: str, description: str = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, description)
+
+    def add(self, name: str, seconds: float, description: str = None):
+        key = (name, description)
+        self.spans[key] = self.spans.get(key, 0.0) + seconds
+
+    def record_statement(self, record: list):
+        """Keeps a [statement, seconds, rows] record; TracingCursor updates it as rows are fetched."""
+        self.statements.append(record)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Formats the spans, database total and request total as a Server-Timing header value."""
+        entries = []
+        for (name, description), seconds in self.spans.items():
+            desc = f';desc="{description}"' if description else ''
+            entries.append(f"{name}{desc};dur={seconds * 1000:.3f}")
+        if self.statements:
+            db_seconds = sum(seconds for _, seconds, _ in self.statements)
+            count = len(self.statements)
+            entries.append(f'db;desc="{count} statement{"s" if count != 1 else ""}";dur={db_seconds * 1000:.3f}')
+        entries.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ', '.join(entries)
+
+
+def statement_operation(statement: str) -> str:
+    """Returns the lower-cased leading keyword of a SQL statement, e.g. 'select'."""
+    words = statement.lstrip().split(None, 1)
+    return words[0].lower() if words else ''
+
+
+class TracingCursor:
+    """
+    Wraps a sqlite3 cursor and reports every statement with its latency and
+    the number of rows fetched from it. Fetch time counts towards the
+    statement, since SQLite produces rows lazily while they are fetched.
+    """
+
+    def __init__(self, cursor, on_statement):
+        """`on_statement` receives each statement's [statement, seconds, rows] record as it starts."""
+        self._cursor = cursor
+        self._on_statement = on_statement
+        self._current = None
+
+    def _begin(self, statement: str, seconds: float):
+        self._current = [statement, seconds, 0]
+        self._on_statement(self._current)
+
+    def execute(self, statement, *args):
+        start = time.perf_counter()
+        result = self._cursor.execute(statement, *args)
+        self._begin(statement, time.perf_counter() - start)
+        return result
+
+    def executemany(self, statement, *args):
+        start = time.perf_counter()
+        result = self._cursor.executemany(statement, *args)
+        self._begin(statement, time.perf_counter() - start)
+        return result
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        rows = fetch(*args)
+        if self._current is not None:
+            self._current[1] += time.perf_counter() - start
+            if isinstance(rows, list):
+                self._current[2] += len(rows)
+            elif rows is not None:
+                self._current[2] += 1
+        return rows
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TracedDatabase:
+    """
+    Proxies a DatabaseManager, timing each public method call as a span on
+    the timer: 'check_username_availability' under its own name and every
+    other method as 'query' described by the method name.
+    """
+
+    OWN_SPANS = ('check_username_availability',)
+
+    def __init__(self, db, timer: RequestTimer):
+        self._db = db
+        self._timer = timer
+
+    def __getattr__(self, name):
+        attribute = getattr(self._db, name)
+        if name.startswith('_') or name == 'close' or not callable(attribute):
+            return attribute
+
+        def traced(*args, **kwargs):
+            if name in self.OWN_SPANS:
+                with self._timer.span(name):
+                    return attribute(*args, **kwargs)
+            with self._timer.span('query', name):
+                return attribute(*args, **kwargs)
+        return traced
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+
+class UserCache:
+    """
+    Thread-safe, bounded LRU map of known usernames to their storage key
+    (True for per-user tables, the integer id for the shared table). One
+    instance can be shared by every connection of a pool.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, user: str):
+        """Returns the cached key for a user, or None if the user is not cached."""
+        with self._lock:
+            key = self._entries.get(user)
+            if key is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(user)
+            self._hits += 1
+            return key
+
+    def put(self, user: str, key):
+        with self._lock:
+            self._entries[user] = key
+            self._entries.move_to_end(user)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, user: str):
+        with self._lock:
+            if self._entries.pop(user, None) is not None:
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
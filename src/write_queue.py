@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# DatabaseManager methods that can be queued. Each runs inside its own
+# savepoint, so they must not commit or roll back the connection themselves.
+WRITE_OPERATIONS = ('add_transaction', 'add_transactions', 'update_transaction_by_id', 'delete_transaction_by_id')
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Single writer thread with group commit.
+
+    Callers submit write operations and get a Future back. The writer drains
+    the queue in groups of up to `max_batch_size` operations, waiting at most
+    `max_latency` seconds after the first one for more to arrive, and runs
+    each group in one transaction with one commit. Each operation has its own
+    savepoint, so a failing operation is rolled back alone and only its
+    Future gets the exception. Futures resolve after the commit, so a
+    resolved Future means the write is durable.
+
+    The writer opens one DatabaseManager with `db_factory` and keeps it
+    until it stops, reopening it only after a failed batch.
+    """
+
+    def __init__(self, db_factory, max_batch_size: int = 64, max_latency: float = 0.002, max_pending: int = 10000):
+        if max_batch_size < 1:
+            raise ValueError("Batch size must be at least 1.")
+        self.db_factory = db_factory
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Submitters may block on a full queue while holding _submit_lock, so
+        # the writer thread only ever takes _lock.
+        self._submit_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._db = None
+
+        self._batches = 0
+        self._operations = 0
+        self._failures = 0
+        self._max_batch = 0
+        self._commit_time = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        """Queues a DatabaseManager write and returns a Future for its result."""
+        if method not in WRITE_OPERATIONS:
+            raise ValueError(f"'{method}' is not a queueable write operation.")
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Write queue is closed.")
+            self._queue.put((future, method, args, kwargs))
+        return future
+
+    def _next_batch(self):
+        """Blocks for one operation, then collects more until the batch is full or the latency budget is spent."""
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
+                return
+            batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+            if batch:
+                self._write(batch)
+
+    def _forget_user(self, db, args):
+        """Drops the cached key of the user a rolled back operation wrote for (its first argument)."""
+        if args and getattr(db, 'user_cache', None) is not None:
+            db.user_cache.invalidate(args[0])
+
+    def _write(self, batch):
+        results = []
+        start = time.perf_counter()
+        try:
+            if self._db is None:
+                self._db = self.db_factory()
+            db = self._db
+            try:
+                db.cursor.execute("BEGIN IMMEDIATE")
+                with db.deferred_commit():
+                    for future, method, args, kwargs in batch:
+                        db.cursor.execute("SAVEPOINT queued_write")
+                        try:
+                            result = getattr(db, method)(*args, **kwargs)
+                        except Exception as e:
+                            db.cursor.execute("ROLLBACK TO queued_write")
+                            # The operation may have cached a user it created inside the savepoint.
+                            self._forget_user(db, args)
+                            results.append((future, None, e))
+                        else:
+                            results.append((future, result, None))
+                        db.cursor.execute("RELEASE queued_write")
+                db.commit()
+            except Exception:
+                self._db = None
+                try:
+                    db.connection.rollback()
+                finally:
+                    for _, _, args, _ in batch:
+                        self._forget_user(db, args)
+                    db.close()
+                raise
+        except Exception as e:
+            with self._lock:
+                self._failures += len(batch)
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._batches += 1
+            self._operations += len(batch)
+            self._failures += sum(1 for _, _, error in results if error is not None)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._commit_time += elapsed
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Writes everything already queued, then stops the writer thread."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'batches': self._batches,
+                'operations': self._operations,
+                'failures': self._failures,
+                'max_batch': self._max_batch,
+                'avg_batch': round(self._operations / self._batches, 2) if self._batches else 0.0,
+                'avg_batch_ms': round(self._commit_time / self._batches * 1000, 3) if self._batches else 0.0,
+            }
@@ -1,8 +1,28 @@
+const PAGE_SIZE = 50;
+// Listings are requested in the compact columnar format with category and type dictionary-encoded.
+const LISTING_FORMAT = { format: 'columnar', dictionary: 1 };
+const SCROLL_LOAD_THRESHOLD = 300;
+const SEARCH_DEBOUNCE_MS = 300;
+const SYNC_INTERVAL_MS = 30000;
+
+let transactionsPage = { url: null, filter: {}, nextCursor: null, loading: false };
+// Filters combine into a single /transactions/query request.
+let queryFilters = { type: null, category: null, month: null, sort: 'date_desc' };
+let searchTimer = null;
+// Version of the user's change log the displayed list is up to date with.
+let syncVersion = null;
+let syncing = false;
+let syncPending = false;
+
 $(document).ready(function () {
     bindEvents();
 });
 
 const bindEvents = _ => {
+    $(window).on('scroll', _ => {
+        loadNextPageIfNeeded();
+    });
+
     $('.btn-access-user-area').on('click', _ => {
         accessUserArea();
     });
@@ -38,20 +58,18 @@ const bindEvents = _ => {
 
     $('.btn-filter-all-transactions').on('click', _ => {
         clearFilters();
+        clearSearch();
+        queryFilters = { type: null, category: null, month: null, sort: queryFilters.sort };
         $('.btn-filter-all-transactions').addClass('active');
-        getAllTransactions();
+        queryTransactions();
     });
 
     $('.btn-filter-credits').on('click', _ => {
-        clearFilters();
-        $('.btn-filter-credits').addClass('active');
-        getCredits();
+        setTypeFilter('Receita', '.btn-filter-credits');
     });
 
     $('.btn-filter-debits').on('click', _ => {
-        clearFilters();
-        $('.btn-filter-debits').addClass('active');
-        getDebits();
+        setTypeFilter('Despesa', '.btn-filter-debits');
     });
 
     $('.btn-filter-month').on('click', _ => {
@@ -59,17 +77,35 @@ const bindEvents = _ => {
     });
 
     $('.category-filter').on('change', _ => {
-        const categoryFilter = $('.category-filter');
-        const selectedCategory = categoryFilter.val();
-        clearFilters();
-        if (selectedCategory == 'Todas as categorias') {
-            $('.btn-filter-all-transactions').click();
-        }
-        else {
-            getTransactionsByCategory(selectedCategory);
+        const selectedCategory = $('.category-filter').val();
+        clearSearch();
+        queryFilters.category = selectedCategory == 'Todas as categorias' ? null : selectedCategory;
+        queryTransactions();
+    });
+
+    $('.sort-filter').on('change', _ => {
+        queryFilters.sort = $('.sort-filter').val();
+        // Search results keep their relevance order until the search is cleared.
+        if (transactionsPage.filter.kind != 'search') {
+            queryTransactions();
         }
     });
 
+    $('.search-input').on('input', _ => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(_ => {
+            const query = $('.search-input').val().trim();
+            clearFilters();
+            queryFilters = { type: null, category: null, month: null, sort: queryFilters.sort };
+            if (query) {
+                searchTransactions(query);
+            }
+            else {
+                $('.btn-filter-all-transactions').click();
+            }
+        }, SEARCH_DEBOUNCE_MS);
+    });
+
     $('.btn-apply-month-filter').on('click', _ => {
         const yearInput = $('.filter-year-input');
         const monthInput = $('.filter-month-input');
@@ -84,15 +120,49 @@ const bindEvents = _ => {
         }
         else {
             yearInput.removeClass('is-invalid');
-            getTransactionsByMonth(year, month);
-            clearFilters();
+            clearSearch();
+            queryFilters.month = { year: Number(year), month: Number(month) };
+            $('.btn-filter-all-transactions').removeClass('active');
             $('.btn-filter-month').text(`${monthName} de ${year}`);
             $('.btn-filter-month').addClass('active');
-
+            queryTransactions(_ => {
+                const modalElement = document.getElementById('monthFilterModal');
+                const modal = bootstrap.Modal.getInstance(modalElement);
+                modal.hide();
+            });
         }
     });
 }
 
+const setTypeFilter = (type, button) => {
+    clearSearch();
+    $('.btn-filter-all-transactions').removeClass('active');
+    $('.btn-filter-credits').removeClass('active');
+    $('.btn-filter-debits').removeClass('active');
+    queryFilters.type = queryFilters.type == type ? null : type;
+    if (queryFilters.type) {
+        $(button).addClass('active');
+    }
+    queryTransactions();
+}
+
+const getQueryParams = () => {
+    const params = { sort: queryFilters.sort };
+    if (queryFilters.type) {
+        params.type = queryFilters.type;
+    }
+    if (queryFilters.category) {
+        params.category = queryFilters.category;
+    }
+    if (queryFilters.month) {
+        const { year, month } = queryFilters.month;
+        const lastDay = new Date(year, month, 0).getDate();
+        params.from = `${year}-${month.toString().padStart(2, '0')}-01`;
+        params.to = `${year}-${month.toString().padStart(2, '0')}-${lastDay}`;
+    }
+    return params;
+}
+
 const showMonthFilterModal = () => {
     const monthInput = $('.filter-month-input');
     const yearInput = $('.filter-year-input');
@@ -108,7 +178,6 @@ const showMonthFilterModal = () => {
 }
 
 const clearFilters = _ => {
-    $('btn-filter-month').removeClass('active')
     $('.btn-filter-all-transactions').removeClass('active');
     $('.btn-filter-credits').removeClass('active');
     $('.btn-filter-debits').removeClass('active');
@@ -116,6 +185,11 @@ const clearFilters = _ => {
     $('.btn-filter-month').text('Filtrar por mês');
 }
 
+const clearSearch = _ => {
+    clearTimeout(searchTimer);
+    $('.search-input').val('');
+}
+
 const getAddModalTransaction = _ => {
     return {
         date: $('.new-transaction-date-input').val(),
@@ -228,15 +302,31 @@ const accessUserArea = _ => {
     $('.subpage-transactions .username-display').text(username)
     $('.btn-filter-all-transactions').addClass('active');
     getAllTransactions();
+    setInterval(syncChanges, SYNC_INTERVAL_MS);
 }
 
-const getAllTransactions = () => {
+const loadTransactions = (url, filter, onFirstPage) => {
+    transactionsPage = { url: url, filter: filter, nextCursor: null, loading: false };
+    if (syncVersion === null) {
+        // The version is read before the listing, so changes made in between are synced again rather than missed.
+        fetchSyncVersion(_ => fetchTransactionsPage(true, onFirstPage));
+    }
+    else {
+        fetchTransactionsPage(true, onFirstPage);
+    }
+    if (filter.kind != 'query') {
+        updateSum();
+    }
+}
+
+const fetchSyncVersion = (onSuccess) => {
     const username = $('.subpage-transactions').data('username');
     $.ajax({
-        url: `/users/${username}/transactions`,
+        url: `/users/${username}/changes`,
         method: 'GET',
         success: (response) => {
-            buildTransactionCards(response);
+            syncVersion = response.version;
+            onSuccess();
         },
         error: _ => {
             showToast('Ocorreu um erro ao tentar recuperar as transações.', 'danger')
@@ -244,66 +334,172 @@ const getAllTransactions = () => {
     });
 }
 
-const getCredits = () => {
+// Applies the changes made since the last sync to the displayed list, instead of reloading it.
+const syncChanges = () => {
+    if (syncVersion === null) {
+        return;
+    }
+    if (syncing) {
+        // A write may have landed after the running sync read the log.
+        syncPending = true;
+        return;
+    }
     const username = $('.subpage-transactions').data('username');
+    syncing = true;
     $.ajax({
-        url: `/users/${username}/transactions/credits`,
+        url: `/users/${username}/changes`,
         method: 'GET',
+        data: { since: syncVersion },
         success: (response) => {
-            buildTransactionCards(response);
+            syncing = false;
+            syncVersion = response.version;
+            if (response.reset) {
+                syncPending = false;
+                loadTransactions(transactionsPage.url, transactionsPage.filter);
+                return;
+            }
+            applyChanges(response);
+            if (response.hasMore || syncPending) {
+                syncPending = false;
+                syncChanges();
+            }
         },
         error: _ => {
-            showToast('Ocorreu um erro ao tentar recuperar as transações.', 'danger')
+            syncing = false;
         }
     });
 }
 
-const getDebits = () => {
-    const username = $('.subpage-transactions').data('username');
-    $.ajax({
-        url: `/users/${username}/transactions/debits`,
-        method: 'GET',
-        success: (response) => {
-            buildTransactionCards(response);
-        },
-        error: _ => {
-            showToast('Ocorreu um erro ao tentar recuperar as transações.', 'danger')
+const applyChanges = (changes) => {
+    if (changes.changed.length == 0 && changes.deleted.length == 0) {
+        return;
+    }
+    // The last row loaded before these changes is where the next page's cursor starts.
+    const lastLoaded = $('.transaction-card').last().data('transaction');
+    for (const id of changes.deleted) {
+        $(`.transaction-card[data-id=${id}]`).remove();
+    }
+    for (const transaction of changes.changed) {
+        const transactionCard = $(`.transaction-card[data-id=${transaction.id}]`);
+        const displayed = transactionCard.length > 0;
+        transactionCard.remove();
+        if (matchesDisplayedFilter(transaction, displayed) && isLoaded(transaction, lastLoaded)) {
+            buildTransactionCard(transaction);
         }
-    });
+    }
+    updateTransactionsList();
+    updateSum();
 }
 
-const getTransactionsByCategory = (category) => {
-    const username = $('.subpage-transactions').data('username');
-    $.ajax({
-        url: `/users/${username}/transactions/category/${category}`,
-        method: 'GET',
-        success: (response) => {
-            buildTransactionCards(response);
-            setCategoriesFilter(category);
-        },
-        error: _ => {
-            showToast('Ocorreu um erro ao tentar recuperar as transações.', 'danger')
+const matchesDisplayedFilter = (transaction, displayed) => {
+    switch (transactionsPage.filter.kind) {
+        case 'search':
+            // Matches are decided by the server; only refresh the results already shown.
+            return displayed;
+        case 'query': {
+            const params = getQueryParams();
+            return (!params.type || transaction.type == params.type)
+                && (!params.category || transaction.category == params.category)
+                && (!params.from || transaction.date >= params.from)
+                && (!params.to || transaction.date <= params.to);
         }
-    });
+        default:
+            return true;
+    }
 }
 
-const getTransactionsByMonth = (year, month) => {
-    const username = $('.subpage-transactions').data('username');
+// Rows past the last loaded one arrive with a later page, so adding them now would show them twice.
+const isLoaded = (transaction, lastLoaded) => {
+    if (!transactionsPage.nextCursor || transactionsPage.filter.kind == 'search') {
+        return true;
+    }
+    return lastLoaded !== undefined && compareTransactions(transaction, lastLoaded) <= 0;
+}
+
+const fetchTransactionsPage = (isFirstPage, onSuccess) => {
+    const page = transactionsPage;
+    if (page.loading || (!isFirstPage && !page.nextCursor)) {
+        return;
+    }
+
+    page.loading = true;
     $.ajax({
-        url: `/users/${username}/transactions/month/${year}/${month}`,
+        url: page.url,
         method: 'GET',
+        data: isFirstPage ? { limit: PAGE_SIZE, ...LISTING_FORMAT, ...page.filter.totals } : { limit: PAGE_SIZE, cursor: page.nextCursor, ...LISTING_FORMAT },
         success: (response) => {
-            const modalElement = document.getElementById('monthFilterModal');
-            const modal = bootstrap.Modal.getInstance(modalElement);
-            modal.hide();
-            buildTransactionCards(response);
+            if (page !== transactionsPage) {
+                return;
+            }
+            page.loading = false;
+            page.nextCursor = response.nextCursor;
+            const transactions = decodeColumnarTransactions(response);
+
+            if (isFirstPage) {
+                buildTransactionCards(transactions);
+            }
+            else {
+                appendTransactionCards(transactions);
+            }
+            if (page.filter.kind == 'search') {
+                updateSum();
+            }
+            if (response.totals) {
+                renderSum(response.totals.balance);
+            }
+            if (onSuccess) {
+                onSuccess();
+            }
+            loadNextPageIfNeeded();
         },
         error: _ => {
+            page.loading = false;
             showToast('Ocorreu um erro ao tentar recuperar as transações.', 'danger')
         }
     });
 }
 
+const decodeColumnarTransactions = (response) => {
+    const { columns, data, dictionaries = {} } = response;
+    const decoded = columns.map((column, index) => {
+        const dictionary = dictionaries[column];
+        return dictionary ? data[index].map(code => dictionary[code]) : data[index];
+    });
+    const transactions = [];
+    for (let row = 0; row < response.length; row++) {
+        const transaction = {};
+        columns.forEach((column, index) => {
+            transaction[column] = decoded[index][row];
+        });
+        transactions.push(transaction);
+    }
+    return transactions;
+}
+
+const loadNextPageIfNeeded = () => {
+    const scrollBottom = $(window).scrollTop() + $(window).height();
+    if (scrollBottom >= $(document).height() - SCROLL_LOAD_THRESHOLD) {
+        fetchTransactionsPage(false);
+    }
+}
+
+const getAllTransactions = () => {
+    const username = $('.subpage-transactions').data('username');
+    loadTransactions(`/users/${username}/transactions`, { kind: 'all' });
+}
+
+const queryTransactions = (onFirstPage) => {
+    const username = $('.subpage-transactions').data('username');
+    const query = $.param(getQueryParams());
+    // The first page carries the totals of the whole query.
+    loadTransactions(`/users/${username}/transactions/query?${query}`, { kind: 'query', totals: { totals: 1 } }, onFirstPage);
+}
+
+const searchTransactions = (query) => {
+    const username = $('.subpage-transactions').data('username');
+    loadTransactions(`/users/${username}/transactions/search?q=${encodeURIComponent(query)}`, { kind: 'search', value: query });
+}
+
 const buildTransactionCards = (transactions) => {
     const transactionsPlaceholder = $('.transactions-placeholder');
     const transactionsContainer = $('.transactions-container');
@@ -313,13 +509,39 @@ const buildTransactionCards = (transactions) => {
         transactionsPlaceholder.css('display', 'flex');
     }
 
-    transactions = transactions.sort((a, b) => b.date.localeCompare(a.date))
+    // Search results keep their relevance order.
+    if (transactionsPage.filter.kind != 'search') {
+        transactions = transactions.sort(compareTransactions)
+    }
 
     for (const transaction of transactions) {
         buildTransactionCard(transaction);
     }
 
-    setCategoriesFilter();
+    setCategoriesFilter(queryFilters.category);
+}
+
+const compareTransactions = (a, b) => {
+    switch (queryFilters.sort) {
+        case 'date_asc':
+            return a.date.localeCompare(b.date) || a.id - b.id;
+        case 'amount_desc':
+            return Number(b.amount) - Number(a.amount) || b.id - a.id;
+        case 'amount_asc':
+            return Number(a.amount) - Number(b.amount) || a.id - b.id;
+        default:
+            return b.date.localeCompare(a.date) || b.id - a.id;
+    }
+}
+
+const appendTransactionCards = (transactions) => {
+    for (const transaction of transactions) {
+        // A sync may already have added it.
+        if ($(`.transaction-card[data-id=${transaction.id}]`).length > 0) {
+            continue;
+        }
+        buildTransactionCard(transaction);
+    }
 }
 
 const buildTransactionCard = (transaction) => {
@@ -360,8 +582,6 @@ const buildTransactionCard = (transaction) => {
     transactionCard.data('id', transaction.id);
     bindTransactionCardEvents(transactionCard)
 
-    updateSum();
-
     return transactionCard;
 }
 
@@ -412,9 +632,7 @@ const addTransaction = (transaction) => {
             modal.hide();
 
             showToast(response.message, 'success');
-            transaction.id = response.transactionId;
-            buildTransactionCard(transaction);
-            updateTransactionsList();
+            syncChanges();
         },
         error: _ => {
             showToast('Algo deu errado ao criar a transação.', 'danger')
@@ -442,15 +660,7 @@ const updateTransaction = (transaction) => {
             modal.hide();
 
             showToast(response.message, 'success');
-
-            const transactionCard = $(`.transaction-card[data-id=${transaction.id}]`);
-            transactionCard.data('transaction', transaction);
-            transactionCard.find('.transaction-card-date').text(formatDate(transaction.date));
-            transactionCard.find('.transaction-card-category').text(transaction.category);
-            transactionCard.find('.transaction-card-amount .amount-value').text(transaction.amount);
-            transactionCard.find('.transaction-card-description').text(transaction.description);
-            
-            updateTransactionsList();
+            syncChanges();
         },
         error: _ => {
             showToast('Algo deu errado ao atualizar a transação.', 'danger')
@@ -465,15 +675,7 @@ const deleteTransaction = (id) => {
         method: 'DELETE',
         success: (response) => {
             showToast(response.message, 'success');
-
-            const transactionCard = $(`.transaction-card[data-id=${id}]`);
-            transactionCard.remove();
-
-            if ($('.transaction-card').length == 0) {
-                $('.transactions-placeholder').show();
-            }
-
-            updateTransactionsList();
+            syncChanges();
         },
         error: _ => {
             showToast('Algo deu errado ao excluir a transação.', 'danger')
@@ -482,11 +684,41 @@ const deleteTransaction = (id) => {
 }
 
 const updateSum = () => {
+    if (transactionsPage.filter.kind == 'search') {
+        renderSum(getDisplayedSum());
+        return;
+    }
+    if (transactionsPage.filter.kind == 'query') {
+        $.ajax({
+            url: transactionsPage.url,
+            method: 'GET',
+            data: { limit: 1, totals: 1 },
+            success: (response) => {
+                renderSum(response.totals.balance);
+            }
+        });
+        return;
+    }
+    const username = $('.subpage-transactions').data('username');
+    $.ajax({
+        url: `/users/${username}/summary`,
+        method: 'GET',
+        success: (summary) => {
+            renderSum(summary.balance);
+        }
+    });
+}
+
+const getDisplayedSum = () => {
     let sum = 0;
     $('.transaction-card').each((_, element) => {
         const transaction = $(element).data('transaction');
-        sum += (transaction.type == "Despesa") ? (-transaction.amount) : (transaction.amount);
+        sum += transaction.type == 'Despesa' ? -Number(transaction.amount) : Number(transaction.amount);
     });
+    return sum;
+}
+
+const renderSum = (sum) => {
     const transactionsSum = $('.transactions-sum');
     transactionsSum.text(sum.toFixed(2));
     
@@ -509,13 +741,19 @@ const updateTransactionsList = () => {
     buildTransactionCards(transactions);
 }
 
+// The options come from the user's summary, so categories on pages that are not loaded yet are listed too.
 const setCategoriesFilter = (selectedCategory) => {
-    let categories = [];
-    $('.transaction-card').each((_, element) => {
-        categories.push($(element).data('transaction').category);
+    const username = $('.subpage-transactions').data('username');
+    $.ajax({
+        url: `/users/${username}/summary`,
+        method: 'GET',
+        success: (summary) => {
+            renderCategoriesFilter(summary.byCategory.map(item => item.category), selectedCategory);
+        }
     });
-    categories = [...new Set(categories)];
+}
 
+const renderCategoriesFilter = (categories, selectedCategory) => {
     categoriesSelect = $('.category-filter');
     categoriesSelect.empty();
 
@@ -0,0 +1,101 @@
+from src.db_manager import DatabaseManager
+from src.storage import CentsEncoding, PerUserTableLayout
+from src.migrations import rebuild_monthly_totals
+from tests.conftest import sample
+import pytest
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.create_user_table("test_user")
+    return db_manager
+
+
+class TestMonthlyTotals:
+
+    def test_summary_after_inserts(self, db_manager):
+        db_manager.add_transaction("test_user", sample(5, "Work", "Work", 3000.0, 'Receita'))
+        db_manager.add_transactions("test_user", [
+            sample(10, "Food", "Food", 200.0, 'Despesa'),
+            sample(20, "Food", "Food", 50.5, 'Despesa'),
+            sample(1, "Home", "Home", 1000.0, 'Despesa', month=2),
+        ])
+
+        summary = db_manager.get_summary("test_user")
+
+        assert (summary["income"], summary["expenses"], summary["balance"], summary["count"]) == (3000.0, 1250.5, 1749.5, 4)
+        food = next(item for item in summary["byCategory"] if item["category"] == "Food")
+        assert (food["expenses"], food["count"], food["balance"]) == (250.5, 2, -250.5)
+        assert [(item["month"], item["balance"]) for item in summary["byMonth"]] == [("2025-01", 2749.5), ("2025-02", -1000.0)]
+
+    def test_summary_follows_updates_and_deletes(self, db_manager):
+        first_id = db_manager.add_transaction("test_user", sample(5, "Food", "Food", 100.0, 'Despesa'))
+        second_id = db_manager.add_transaction("test_user", sample(6, "Food", "Food", 40.0, 'Despesa'))
+
+        db_manager.update_transaction_by_id("test_user", first_id, sample(1, "Work", "Work", 500.0, 'Receita', month=3))
+        db_manager.delete_transaction_by_id("test_user", second_id)
+
+        summary = db_manager.get_summary("test_user")
+        assert (summary["income"], summary["expenses"], summary["count"]) == (500.0, 0.0, 1)
+        assert [item["category"] for item in summary["byCategory"]] == ["Work"]
+        assert [item["month"] for item in summary["byMonth"]] == ["2025-03"]
+
+    def test_missing_transaction_leaves_totals_untouched(self, db_manager):
+        db_manager.add_transaction("test_user", sample(5, "Food", "Food", 100.0, 'Despesa'))
+        db_manager.update_transaction_by_id("test_user", 999, sample(5, "Food", "Food", 1.0, 'Despesa'))
+        db_manager.delete_transaction_by_id("test_user", 999)
+        assert db_manager.get_summary("test_user")["expenses"] == 100.0
+
+    def test_rebuild_matches_incremental_totals(self, db_manager):
+        db_manager.add_transactions("test_user", [sample(1, "Food", "Food", 10.0 * month, 'Despesa', month=month) for month in range(1, 13)])
+        incremental = db_manager.get_summary("test_user")
+
+        db_manager.cursor.execute("DELETE FROM monthly_totals")
+        assert rebuild_monthly_totals(db_manager) == ["test_user"]
+
+        assert db_manager.get_summary("test_user") == incremental
+
+    def test_totals_match_a_full_recompute_after_rejected_rows(self, db_manager):
+        ids = db_manager.add_transactions("test_user", [sample(day, "Food", "Food", 10.25 * day, 'Despesa', month=1 + day % 3) for day in range(1, 21)])
+        db_manager.add_transaction("test_user", sample(1, "Work", "Work", 1000.0, 'Receita'))
+        for amount in (float('nan'), float('inf'), float('-inf')):
+            with pytest.raises(ValueError):
+                db_manager.add_transaction("test_user", sample(2, "Food", "Food", amount, 'Despesa'))
+            with pytest.raises(ValueError):
+                db_manager.add_transactions("test_user", [sample(3, "Work", "Work", 5.0, 'Receita'), sample(3, "Food", "Food", amount, 'Despesa')])
+            with pytest.raises(ValueError):
+                db_manager.update_transaction_by_id("test_user", ids[0], sample(4, "Food", "Food", amount, 'Despesa'))
+        for transaction_id in ids[::3]:
+            db_manager.delete_transaction_by_id("test_user", transaction_id)
+        db_manager.update_transaction_by_id("test_user", ids[1], sample(5, "Home", "Home", 99.99, 'Despesa', month=4))
+
+        incremental = db_manager.get_summary("test_user")
+        db_manager.rebuild_summary("test_user")
+        assert db_manager.get_summary("test_user") == incremental
+        assert incremental["count"] == 21 - len(ids[::3])
+        assert incremental["income"] == 1000.0
+
+    def test_empty_summary(self, db_manager):
+        summary = db_manager.get_summary("test_user")
+        assert summary == {"income": 0.0, "expenses": 0.0, "balance": 0.0, "count": 0, "byCategory": [], "byMonth": []}
+
+    def test_cents_totals_are_exact(self):
+        db_manager = DatabaseManager(':memory:', layout=PerUserTableLayout(CentsEncoding()))
+        db_manager.create_user_table("test_user")
+        db_manager.add_transactions("test_user", [sample(1, "Food", "Food", 0.1, 'Despesa') for _ in range(10)])
+        db_manager.add_transaction("test_user", sample(2, "Food", "Food", 0.2, 'Despesa'))
+
+        db_manager.cursor.execute("SELECT total, typeof(total) FROM monthly_totals")
+        assert db_manager.cursor.fetchall() == [(120, 'integer')]
+        db_manager.rebuild_summary("test_user")
+        assert db_manager.get_summary("test_user")["expenses"] == 1.2
+        db_manager.close()
+
+    def test_totals_table_is_not_a_user(self, db_manager):
+        assert db_manager.list_users() == ["test_user"]
+
+    def test_totals_table_name_is_reserved_for_per_user_tables(self):
+        db_manager = DatabaseManager(':memory:')
+        with pytest.raises(ValueError, match="reserved"):
+            db_manager.create_user_table("monthly_totals")
+        db_manager.close()
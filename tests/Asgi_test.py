@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import app as wsgi
+import asgi
+from app import response_cache
+
+
+def call(method, path, payload=None, headers=None, body=None):
+    """Runs one request through the ASGI app and returns (status, headers, body)."""
+    headers = dict(headers or {})
+    if payload is not None:
+        body = json.dumps(payload).encode('utf-8')
+        headers.setdefault('Content-Type', 'application/json')
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query.encode('latin-1'),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 12345),
+    }
+    messages = []
+
+    async def run():
+        received = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Servers only report a disconnect once the response is complete.
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+            received = True
+            return {'type': 'http.request', 'body': body or b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                finished.set()
+
+        await asgi.application(scope, receive, send)
+
+    asyncio.run(run())
+    start = messages[0]
+    response_headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in start['headers']}
+    response_body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], response_headers, response_body
+
+
+def call_json(method, path, payload=None, headers=None):
+    status, _, body = call(method, path, payload, headers)
+    return status, json.loads(body)
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    yield
+    asgi.shutdown()
+    response_cache.clear()
+    for path in ('finance.db', 'finance.db-wal', 'finance.db-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def transaction(day, amount=10.0, kind='Despesa', category='Alimentação'):
+    return {"date": f"2025-03-{day:02d}", "description": "Item", "category": category, "amount": amount, "type": kind}
+
+
+def test_create_user_and_add_transactions():
+    assert call_json('POST', '/users/asgi_user')[0] == 201
+    assert call_json('POST', '/users/asgi_user') == (200, {"message": "Username 'asgi_user' already exists."})
+
+    status, body = call_json('POST', '/users/asgi_user/transactions', transaction(1))
+    assert status == 200
+    assert isinstance(body['transactionId'], int)
+
+    status, body = call_json('GET', '/users/asgi_user/transactions')
+    assert status == 200
+    assert [row['id'] for row in body] == [body[0]['id']]
+    assert body[0]['category'] == 'Alimentação'
+
+
+def test_unknown_user_and_invalid_payload():
+    status, body = call_json('POST', '/users/ghost/transactions', transaction(1))
+    assert status == 404
+    assert 'does not exist' in body['error']
+
+    call('POST', '/users/asgi_user')
+    assert call_json('POST', '/users/asgi_user/transactions', {"date": "2025-03-01"})[0] == 400
+    assert call_json('POST', '/users/asgi_user/transactions', dict(transaction(1), date='03/01/2025'))[0] == 400
+    assert call_json('GET', '/users/asgi_user/transactions/month/2025/13')[0] == 400
+    assert call_json('GET', '/users/asgi_user/transactions?limit=0')[0] == 400
+
+
+def test_pagination_and_filters():
+    call('POST', '/users/asgi_user')
+    for day in range(1, 6):
+        call('POST', '/users/asgi_user/transactions', transaction(day, kind='Receita' if day % 2 else 'Despesa'))
+
+    status, page = call_json('GET', '/users/asgi_user/transactions?limit=2')
+    assert status == 200
+    assert [row['date'] for row in page['transactions']] == ['2025-03-05', '2025-03-04']
+    status, page = call_json('GET', f"/users/asgi_user/transactions?limit=2&cursor={page['nextCursor']}")
+    assert [row['date'] for row in page['transactions']] == ['2025-03-03', '2025-03-02']
+
+    assert len(call_json('GET', '/users/asgi_user/transactions/credits')[1]) == 3
+    assert len(call_json('GET', '/users/asgi_user/transactions/debits')[1]) == 2
+    assert len(call_json('GET', '/users/asgi_user/transactions/month/2025/3')[1]) == 5
+    assert len(call_json('GET', '/users/asgi_user/transactions?from=2025-03-02&to=2025-03-03')[1]) == 2
+    assert call_json('GET', '/users/asgi_user/summary')[1]['count'] == 5
+
+
+def test_search():
+    call('POST', '/users/asgi_user')
+    call('POST', '/users/asgi_user/transactions', transaction(1, category='Saúde'))
+    call('POST', '/users/asgi_user/transactions', transaction(2))
+
+    status, page = call_json('GET', '/users/asgi_user/transactions/search?q=saude')
+    assert status == 200
+    assert [row['category'] for row in page['transactions']] == ['Saúde']
+    assert page['nextCursor'] is None
+    assert call_json('GET', '/users/asgi_user/transactions/search?q=')[0] == 400
+    assert call_json('GET', '/users/ghost/transactions/search?q=item')[0] == 404
+
+
+def test_update_and_delete_invalidate_cached_responses():
+    call('POST', '/users/asgi_user')
+    transaction_id = call_json('POST', '/users/asgi_user/transactions', transaction(1))[1]['transactionId']
+
+    status, headers, body = call('GET', '/users/asgi_user/transactions')
+    etag = headers['etag']
+    assert call('GET', '/users/asgi_user/transactions', headers={'If-None-Match': etag})[0] == 304
+
+    assert call_json('PUT', f'/users/asgi_user/transactions/{transaction_id}', transaction(2, amount=99.0))[0] == 200
+    status, headers, body = call('GET', '/users/asgi_user/transactions', headers={'If-None-Match': etag})
+    assert status == 200
+    assert json.loads(body)[0]['amount'] == 99.0
+
+    assert call_json('DELETE', f'/users/asgi_user/transactions/{transaction_id}')[0] == 200
+    assert call_json('GET', '/users/asgi_user/transactions')[1] == []
+
+
+def test_other_routes_fall_back_to_flask():
+    call('POST', '/users/asgi_user')
+    status, body = call_json('POST', '/users/asgi_user/transactions/batch', [transaction(1), transaction(2)])
+    assert status == 200
+    assert len(body['transactionIds']) == 2
+
+    status, headers, body = call('GET', '/users/asgi_user/transactions/export?format=ndjson')
+    assert status == 200
+    assert headers['content-type'].startswith('application/x-ndjson')
+    assert len(body.decode('utf-8').splitlines()) == 2
+
+    assert call_json('GET', '/stats/pool')[0] == 200
+    assert call('GET', '/no/such/route')[0] == 404
+
+
+@pytest.mark.parametrize("disconnect", ["receive", "send"])
+def test_disconnected_streams_release_their_connection(monkeypatch, disconnect):
+    monkeypatch.setattr(wsgi, 'EXPORT_FETCH_SIZE', 1)
+    call('POST', '/users/asgi_user')
+    call('POST', '/users/asgi_user/transactions/batch', [transaction(day % 28 + 1) for day in range(40)])
+    messages = []
+
+    async def run():
+        received = False
+        gone = asyncio.Event()
+
+        async def receive():
+            nonlocal received
+            if received:
+                await gone.wait()
+                return {'type': 'http.disconnect'}
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if disconnect == 'send' and messages:
+                raise OSError("Connection reset by peer.")
+            messages.append(message)
+            if message['type'] == 'http.response.body':
+                gone.set()
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/users/asgi_user/transactions/export',
+                 'query_string': b'format=ndjson', 'headers': []}
+        await asyncio.wait_for(asgi.application(scope, receive, send), timeout=10)
+
+    asyncio.run(run())
+    assert messages[0]['status'] == 200
+    assert len(messages) < 40
+    assert wsgi.get_read_pool().stats()['in_use'] == 0
+
+
+def test_native_routes_are_timed_like_flask_routes():
+    call('POST', '/users/asgi_user')
+    call('POST', '/users/asgi_user/transactions', transaction(1))
+    status, headers, _ = call('GET', '/users/asgi_user/transactions')
+    assert status == 200
+    for phase in ('response_cache', 'query;desc="get_all_transactions"', 'jsonify', 'db;desc=', 'total'):
+        assert phase in headers['server-timing']
+
+    text = call('GET', '/metrics')[2].decode('utf-8')
+    assert 'finance_http_request_duration_seconds_count{method="GET",route="/users/<username>/transactions",status="200"}' in text
+
+
+def test_pools_are_sized_for_the_executors():
+    call('GET', '/stats/pool')
+    assert wsgi.DB_POOL_SIZE == 5
+    assert wsgi.get_pool().stats()['size'] == asgi.READ_THREADS + 1 + asgi.WSGI_THREADS
+    assert wsgi.get_read_pool().stats()['size'] == asgi.READ_THREADS + asgi.WSGI_THREADS
+
+
+def test_concurrent_requests_share_the_event_loop():
+    call('POST', '/users/asgi_user')
+
+    async def post(day):
+        messages = []
+        body = json.dumps(transaction(day)).encode('utf-8')
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/users/asgi_user/transactions', 'query_string': b'', 'headers': []}
+        await asgi.application(scope, receive, send)
+        return messages[0]['status']
+
+    async def run():
+        return await asyncio.gather(*(post(day) for day in range(1, 21)))
+
+    assert asyncio.run(run()) == [200] * 20
+    assert len(call_json('GET', '/users/asgi_user/transactions')[1]) == 20
+
+
+def test_columnar_listings():
+    call('POST', '/users/asgi_user')
+    for day in range(1, 4):
+        call('POST', '/users/asgi_user/transactions', transaction(day))
+
+    status, page = call_json('GET', '/users/asgi_user/transactions?limit=2&format=columnar&dictionary=1')
+    assert status == 200
+    assert page['length'] == 2
+    assert page['data'][0] == ['2025-03-03', '2025-03-02']
+    assert page['dictionaries']['category'] == ['Alimentação']
+    assert page['nextCursor'] is not None
+
+
+def test_combined_query():
+    call('POST', '/users/asgi_user')
+    for day in range(1, 6):
+        call('POST', '/users/asgi_user/transactions', transaction(day, amount=day * 10.0, category='Lazer' if day == 5 else 'Alimentação'))
+
+    status, page = call_json('GET', '/users/asgi_user/transactions/query?category=Alimenta%C3%A7%C3%A3o&category=Lazer&min_amount=20&sort=amount_asc&limit=3&totals=1')
+    assert status == 200
+    assert [row['amount'] for row in page['transactions']] == [20.0, 30.0, 40.0]
+    assert page['totals']['count'] == 4
+    status, page = call_json('GET', f"/users/asgi_user/transactions/query?category=Alimenta%C3%A7%C3%A3o&category=Lazer&min_amount=20&sort=amount_asc&limit=3&cursor={page['nextCursor']}")
+    assert [row['amount'] for row in page['transactions']] == [50.0]
+    assert call_json('GET', '/users/ghost/transactions/query')[0] == 404
+    assert call_json('GET', '/users/asgi_user/transactions/query?sort=name')[0] == 400
+    for amount in ('min_amount=nan', 'max_amount=inf', 'min_amount=-inf'):
+        assert call_json('GET', f'/users/asgi_user/transactions/query?{amount}')[0] == 400, amount
+
+
+def test_changes():
+    call('POST', '/users/asgi_user')
+    version = call_json('GET', '/users/asgi_user/changes')[1]['version']
+    transaction_id = call_json('POST', '/users/asgi_user/transactions', transaction(1))[1]['transactionId']
+    call('DELETE', f'/users/asgi_user/transactions/{transaction_id}')
+
+    status, changes = call_json('GET', f'/users/asgi_user/changes?since={version}')
+    assert status == 200
+    assert changes['deleted'] == [transaction_id] and changes['changed'] == []
+    assert call_json('GET', '/users/ghost/changes')[0] == 404
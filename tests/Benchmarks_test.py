@@ -0,0 +1,60 @@
+from benchmarks import compare, db_benchmark, schema_benchmark, shard_benchmark, statement_benchmark
+from benchmarks.results import percentile, summarize, write_results
+import json
+
+
+class TestBenchmarkResults:
+
+    def test_summarize_reports_percentiles_in_milliseconds(self):
+        timings = [i / 1000 for i in range(1, 101)]
+        summary = summarize(timings)
+        assert summary['ops'] == 100
+        assert summary['p50_ms'] == 51.0
+        assert summary['p99_ms'] == 99.0
+        assert summary['max_ms'] == 100.0
+        assert summarize(timings, elapsed=2.0)['ops_per_sec'] == 50.0
+        assert percentile([], 0.5) == 0.0
+
+    def test_compare_flags_regressions_beyond_threshold(self, tmp_path):
+        baseline = write_results(str(tmp_path / 'base' / 'db.json'), 'db', {}, {
+            'get_summary': {'ops_per_sec': 1000.0, 'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 3.0},
+        })
+        assert baseline['environment']['commit']
+        write_results(str(tmp_path / 'new' / 'db.json'), 'db', {}, {
+            'get_summary': {'ops_per_sec': 1050.0, 'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 4.5},
+        })
+        rows = compare.compare(compare.load(str(tmp_path / 'base')), compare.load(str(tmp_path / 'new')), threshold=0.10)
+        regressed = {row[2]: row[-1] for row in rows}
+        assert regressed == {'ops_per_sec': False, 'p50_ms': False, 'p95_ms': False, 'p99_ms': True}
+        assert compare.main([str(tmp_path / 'base'), str(tmp_path / 'new')]) == 1
+        assert compare.main([str(tmp_path / 'base'), str(tmp_path / 'base')]) == 0
+
+    def test_db_benchmark_writes_json_results(self, tmp_path):
+        output = tmp_path / 'db.json'
+        db_benchmark.main(['--rows', '200', '--users', '2', '--repeat', '3', '--output', str(output)])
+        document = json.loads(output.read_text(encoding='utf-8'))
+        assert document['parameters']['rows'] == 200
+        assert {'get_summary', 'add_transaction', 'delete_transaction_by_id'} <= set(document['results'])
+        assert all(result['ops'] >= 1 for result in document['results'].values())
+
+    def test_schema_benchmark_reports_size_per_encoding(self, tmp_path):
+        output = tmp_path / 'schema.json'
+        schema_benchmark.main(['--rows', '300', '--users', '2', '--repeat', '2', '--output', str(output)])
+        results = json.loads(output.read_text(encoding='utf-8'))['results']
+        assert set(results) == {'real', 'cents', 'compact'}
+        assert results['compact']['bytes'] <= results['real']['bytes']
+        assert 'get_month_transactions' in results['compact']['queries']
+
+    def test_shard_benchmark_reports_throughput_per_shard_count(self, tmp_path):
+        output = tmp_path / 'shards.json'
+        shard_benchmark.main(['--shards', '1', '2', '--users', '4', '--concurrency', '2', '--duration', '0.2', '--output', str(output)])
+        results = json.loads(output.read_text(encoding='utf-8'))['results']
+        assert set(results) == {'1 shards', '2 shards'}
+        assert all(result['ops'] >= 1 for result in results.values())
+
+    def test_statement_benchmark_reports_each_cache_size(self, tmp_path):
+        output = tmp_path / 'statements.json'
+        statement_benchmark.main(['--users', '3', '--rows', '300', '--repeat', '50', '--cached', '0', '128', '--output', str(output)])
+        results = json.loads(output.read_text(encoding='utf-8'))['results']
+        assert set(results) == {'per_user cached=0', 'per_user cached=128', 'shared cached=0', 'shared cached=128'}
+        assert all(result['ops'] == 50 for result in results.values())
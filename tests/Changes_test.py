@@ -0,0 +1,135 @@
+from app import app, close_pool, response_cache
+import app as wsgi
+from src.db_manager import DatabaseManager
+from src.migrations import migrate_to_shared_table
+from src.sharding import move_user
+from src.storage import SharedTableLayout
+from tests.conftest import sample
+import pytest
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.create_user_table("alice")
+    db_manager.create_user_table("bob")
+    return db_manager
+
+
+def descriptions(changes):
+    return [row[1] for row in changes['changed']]
+
+
+class TestChangeLog:
+
+    def test_versions_count_every_write(self, db_manager):
+        assert db_manager.get_changes("alice") == {'version': 0, 'reset': False, 'hasMore': False, 'changed': [], 'deleted': []}
+        ids = db_manager.add_transactions("alice", [sample(1, "A"), sample(2, "B")])
+        db_manager.add_transaction("alice", sample(3, "C"))
+        db_manager.update_transaction_by_id("alice", ids[0], sample(1, "A2"))
+        db_manager.delete_transaction_by_id("alice", ids[1])
+
+        assert db_manager.get_changes("alice")['version'] == 5
+        assert db_manager.get_changes("bob")['version'] == 0
+        assert db_manager.list_users() == ["alice", "bob"]
+        changes = db_manager.get_changes("alice", 0)
+        assert descriptions(changes) == ["A2", "C"]
+        assert changes['deleted'] == [ids[1]]
+        assert changes['version'] == 5
+
+    def test_only_changes_after_since_are_returned(self, db_manager):
+        ids = db_manager.add_transactions("alice", [sample(day, f"T{day}") for day in range(1, 4)])
+        db_manager.update_transaction_by_id("alice", ids[2], sample(3, "T3 edited"))
+
+        changes = db_manager.get_changes("alice", 3)
+        assert descriptions(changes) == ["T3 edited"]
+        assert db_manager.get_changes("alice", 4) == {'version': 4, 'reset': False, 'hasMore': False, 'changed': [], 'deleted': []}
+
+    def test_limit_pages_through_changes(self, db_manager):
+        db_manager.add_transactions("alice", [sample(day, f"T{day}") for day in range(1, 6)])
+
+        seen, since = [], 0
+        while True:
+            changes = db_manager.get_changes("alice", since, limit=2)
+            seen.extend(descriptions(changes))
+            since = changes['version']
+            if not changes['hasMore']:
+                break
+        assert seen == ["T1", "T2", "T3", "T4", "T5"]
+        assert since == 5
+
+    def test_unknown_versions_require_a_reset(self, db_manager):
+        db_manager.add_transaction("alice", sample(1, "A"))
+        assert db_manager.get_changes("alice", 2)['reset']
+
+        db_manager.drop_user("alice")
+        db_manager.create_user_table("alice")
+        db_manager.add_transaction("alice", sample(1, "B"))
+        assert db_manager.get_changes("alice", 0)['reset']
+        changes = db_manager.get_changes("alice", 1)
+        assert not changes['reset']
+        assert descriptions(changes) == ["B"]
+        assert changes['version'] == 2
+
+    def test_migration_clears_change_logs(self, tmp_path):
+        db_path = str(tmp_path / "legacy.db")
+        legacy = DatabaseManager(db_path)
+        legacy.create_user_table("ana")
+        legacy.add_transactions("ana", [sample(1, "A1"), sample(2, "A2")])
+        migrate_to_shared_table(legacy)
+        legacy.close()
+
+        shared = DatabaseManager(db_path, layout=SharedTableLayout())
+        assert shared.get_changes("ana", 0)['reset']
+        assert shared.get_changes("ana", 2) == {'version': 2, 'reset': False, 'hasMore': False, 'changed': [], 'deleted': []}
+        shared.close()
+
+    def test_moved_users_continue_past_their_source_version(self, db_manager):
+        db_manager.add_transactions("alice", [sample(1, "A"), sample(2, "B")])
+        target = DatabaseManager(':memory:', layout=db_manager.layout)
+        try:
+            target.create_user_table("alice")
+            target.add_transaction("alice", sample(3, "Stale copy"))
+            assert move_user(db_manager, target, "alice") == 2
+
+            version, floor = target.changes.version(target.cursor, "alice")
+            assert version == floor and version > 2
+            assert target.get_changes("alice", 2)['reset']
+            target.add_transaction("alice", sample(4, "C"))
+            assert descriptions(target.get_changes("alice", version)) == ["C"]
+        finally:
+            target.close()
+
+    def test_invalid_limit_raises_exception(self, db_manager):
+        with pytest.raises(ValueError):
+            db_manager.get_changes("alice", 0, limit=0)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    close_pool()
+    monkeypatch.setattr(wsgi, 'DB_FILE_PATH', str(tmp_path / 'finance.db'))
+    app.config['TESTING'] = True
+    yield app.test_client()
+    close_pool()
+    response_cache.clear()
+
+
+def test_changes_route(client):
+    user = "sync_user"
+    client.post(f"/users/{user}")
+    transaction = {"date": "2025-02-01", "description": "Mercado", "category": "Alimentação", "amount": 50, "type": "Despesa"}
+    version = client.get(f"/users/{user}/changes").get_json()["version"]
+    first = client.post(f"/users/{user}/transactions", json=transaction).get_json()["transactionId"]
+    second = client.post(f"/users/{user}/transactions", json=dict(transaction, description="Feira")).get_json()["transactionId"]
+
+    changes = client.get(f"/users/{user}/changes?since={version}").get_json()
+    assert [tx["description"] for tx in changes["changed"]] == ["Mercado", "Feira"]
+    assert changes["changed"][0] == dict(transaction, amount=50.0, id=first)
+
+    client.delete(f"/users/{user}/transactions/{second}")
+    changes = client.get(f"/users/{user}/changes?since={changes['version']}").get_json()
+    assert changes == {"version": 3, "reset": False, "hasMore": False, "changed": [], "deleted": [second]}
+
+    assert client.get("/users/ghost/changes").status_code == 404
+    for query in ("since=-1", "since=abc", "since=0&limit=0"):
+        assert client.get(f"/users/{user}/changes?{query}").status_code == 400, query
@@ -0,0 +1,115 @@
+from src.connection_pool import ConnectionPool, PoolTimeoutError
+from src.db_manager import DatabaseManager
+from src.storage import SharedTableLayout
+import sqlite3
+import threading
+import pytest
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+class TestConnectionPool:
+
+    def test_acquire_initializes_pragmas(self, pool):
+        connection = pool.acquire()
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1
+        pool.release(connection)
+
+    def test_released_connection_is_reused(self, pool):
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+        assert second is first
+        stats = pool.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+        pool.release(second)
+
+    def test_exhausted_pool_times_out(self, pool):
+        connections = [pool.acquire(), pool.acquire()]
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+        stats = pool.stats()
+        assert stats["waits"] == 1
+        assert stats["timeouts"] == 1
+        for connection in connections:
+            pool.release(connection)
+
+    def test_waiting_caller_gets_released_connection(self, pool):
+        pool.timeout = 2.0
+        connections = [pool.acquire(), pool.acquire()]
+        timer = threading.Timer(0.05, pool.release, args=(connections[0],))
+        timer.start()
+        connection = pool.acquire()
+        assert connection is connections[0]
+        timer.join()
+        pool.release(connection)
+        pool.release(connections[1])
+
+    def test_release_rolls_back_open_transaction(self, pool):
+        connection = pool.acquire()
+        connection.execute("CREATE TABLE t (x)")
+        connection.commit()
+        connection.execute("INSERT INTO t VALUES (1)")
+        pool.release(connection)
+        connection = pool.acquire()
+        assert connection.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        pool.release(connection)
+
+    def test_unhealthy_connection_is_replaced(self, pool):
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.close()
+        replacement = pool.acquire()
+        assert replacement is not connection
+        assert pool.stats()["replaced"] == 1
+        pool.release(replacement)
+
+    def test_acquire_after_close_raises_exception(self, pool):
+        pool.close()
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_invalid_size_raises_exception(self, tmp_path):
+        with pytest.raises(ValueError):
+            ConnectionPool(str(tmp_path / "pool.db"), size=0)
+
+    def test_db_manager_borrows_and_returns_connection(self, pool):
+        db_manager = DatabaseManager(pool.db_path, pool=pool)
+        db_manager.create_user_table("pooled_user")
+        assert pool.stats()["in_use"] == 1
+        db_manager.close()
+        assert pool.stats()["in_use"] == 0
+
+        other_manager = DatabaseManager(pool.db_path, pool=pool)
+        assert other_manager.check_username_availability("pooled_user") == False
+        other_manager.close()
+
+    def test_pooled_checkouts_do_not_set_up_the_schema(self, pool):
+        DatabaseManager(pool.db_path, layout=SharedTableLayout()).close()
+        connection = pool.acquire()
+        statements = []
+        connection.set_trace_callback(statements.append)
+        pool.release(connection)
+        del statements[:]
+
+        db_manager = DatabaseManager(pool.db_path, pool=pool, layout=SharedTableLayout())
+        assert db_manager.connection is connection
+        assert statements == ["SELECT 1"]
+        db_manager.close()
+
+    def test_read_only_pool_rejects_writes(self, pool):
+        DatabaseManager(pool.db_path, pool=pool).close()
+        read_pool = ConnectionPool(pool.db_path, size=1, read_only=True)
+        connection = read_pool.acquire()
+        assert connection.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            connection.execute("CREATE TABLE scratch (x)")
+        read_pool.release(connection)
+        read_pool.close()
@@ -198,3 +198,191 @@ class TestDatabaseManager:
         debits = db_manager.get_all_debits("test_user")[0][3]
 
         assert balance + credits - debits == 100.0
+
+    def test_add_transactions_returns_ids_in_order(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transaction("test_user", Transaction(date(2023, 9, 1), "Existing", "Test Category", 10.0, TransactionType('Receita')))
+        transactions = (
+            Transaction(date(2023, 10, i), f"Bulk {i}", "Test Category", float(i), TransactionType('Despesa'))
+            for i in range(1, 8)
+        )
+
+        transaction_ids = db_manager.add_transactions("test_user", transactions, chunk_size=3)
+
+        assert transaction_ids == [2, 3, 4, 5, 6, 7, 8]
+        rows = db_manager.get_all_transactions("test_user")
+        assert len(rows) == 8
+        assert {row[5]: row[1] for row in rows}[8] == "Bulk 7"
+
+    def test_add_transactions_rolls_back_on_error(self, db_manager):
+        db_manager.create_user_table("test_user")
+
+        def transactions():
+            yield Transaction(date(2023, 10, 1), "Bulk 1", "Test Category", 1.0, TransactionType('Receita'))
+            raise ValueError("bad row")
+
+        with pytest.raises(ValueError):
+            db_manager.add_transactions("test_user", transactions(), chunk_size=1)
+        assert db_manager.get_all_transactions("test_user") == []
+
+    def test_add_transactions_with_invalid_chunk_size(self, db_manager):
+        db_manager.create_user_table("test_user")
+        with pytest.raises(ValueError):
+            db_manager.add_transactions("test_user", [], chunk_size=0)
+
+    def test_get_all_transactions_keyset_pagination(self, db_manager):
+        db_manager.create_user_table("test_user")
+        days = [3, 1, 2, 2, 5]
+        db_manager.add_transactions("test_user", [
+            Transaction(date(2023, 10, day), f"Transaction {index}", "Test Category", 10.0, TransactionType('Receita'))
+            for index, day in enumerate(days)
+        ])
+
+        first_page = db_manager.get_all_transactions("test_user", limit=2)
+        assert [row[1] for row in first_page] == ["Transaction 4", "Transaction 0"]
+
+        last_seen = first_page[-1]
+        second_page = db_manager.get_all_transactions("test_user", limit=2, cursor=(last_seen[0], last_seen[5]))
+        assert [row[1] for row in second_page] == ["Transaction 3", "Transaction 2"]
+
+        last_seen = second_page[-1]
+        third_page = db_manager.get_all_transactions("test_user", limit=2, cursor=(last_seen[0], last_seen[5]))
+        assert [row[1] for row in third_page] == ["Transaction 1"]
+
+    def test_get_category_transactions_binds_category(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transaction("test_user", Transaction(date(2023, 10, 1), "Quoted", "Kid's", 10.0, TransactionType('Despesa')))
+
+        rows = db_manager.get_category_transactions("test_user", "Kid's")
+        assert len(rows) == 1
+        assert db_manager.get_category_transactions("test_user", "x' OR '1'='1") == []
+
+    def test_iter_transactions_yields_batches(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transactions("test_user", [
+            Transaction(date(2023, 10, day), f"Transaction {day}", "Test Category", 10.0, TransactionType('Receita'))
+            for day in range(1, 6)
+        ])
+
+        batches = list(db_manager.iter_transactions("test_user", batch_size=2))
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [row[1] for batch in batches for row in batch][0] == "Transaction 5"
+
+    def test_create_table_creates_filter_indexes(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='test_user'")
+        indexes = {row[0] for row in db_manager.cursor.fetchall()}
+        assert indexes == {"test_user:date_idx", "test_user:category_idx", "test_user:type_idx"}
+
+    @pytest.mark.parametrize("users", [["alice", "alice_date_idx"], ["bob_type_idx", "bob"]])
+    def test_index_names_never_collide_with_usernames(self, db_manager, users):
+        for user in users:
+            db_manager.create_user_table(user)
+            db_manager.add_transaction(user, Transaction(date(2023, 10, 1), "Salary", "Work", 10.0, TransactionType('Receita')))
+        for user in users:
+            assert not db_manager.check_username_availability(user)
+            assert len(db_manager.get_all_transactions(user)) == 1
+        assert db_manager.list_users() == sorted(users)
+
+    def test_legacy_index_names_are_replaced_on_open(self, tmp_path):
+        db_path = str(tmp_path / "legacy.db")
+        db_manager = DatabaseManager(db_path)
+        db_manager.create_user_table("test_user")
+        for column in ("date", "category", "type"):
+            db_manager.cursor.execute(f'DROP INDEX "test_user:{column}_idx"')
+            db_manager.cursor.execute(f"CREATE INDEX test_user_{column}_idx ON test_user ({column})")
+        db_manager.connection.commit()
+        db_manager.close()
+
+        db_manager = DatabaseManager(db_path)
+        db_manager.cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='test_user'")
+        assert {row[0] for row in db_manager.cursor.fetchall()} == {"test_user:date_idx", "test_user:category_idx", "test_user:type_idx"}
+        db_manager.create_user_table("test_user_date_idx")
+        db_manager.close()
+
+    def test_month_filter_uses_date_index(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.cursor.execute("EXPLAIN QUERY PLAN SELECT * FROM test_user WHERE date >= ? AND date < ?", ("2023-10-01", "2023-11-01"))
+        plan = " ".join(str(row[-1]) for row in db_manager.cursor.fetchall())
+        assert "USING INDEX test_user:date_idx" in plan
+
+    def test_get_month_transactions_december(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transaction("test_user", Transaction(date(2023, 12, 31), "New Year's Eve", "Test Category", 10.0, TransactionType('Despesa')))
+        db_manager.add_transaction("test_user", Transaction(date(2024, 1, 1), "New Year", "Test Category", 10.0, TransactionType('Despesa')))
+
+        december = db_manager.get_month_transactions("test_user", 12, 2023)
+        assert [row[1] for row in december] == ["New Year's Eve"]
+
+    def test_get_transactions_between(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transactions("test_user", [
+            Transaction(date(2023, 10, day), f"Transaction {day}", "Test Category", 10.0, TransactionType('Receita'))
+            for day in range(1, 6)
+        ])
+
+        rows = db_manager.get_transactions_between("test_user", date(2023, 10, 2), date(2023, 10, 4))
+        assert [row[1] for row in rows] == ["Transaction 2", "Transaction 3", "Transaction 4"]
+        assert len(db_manager.get_transactions_between("test_user", start=date(2023, 10, 4))) == 2
+        assert len(db_manager.get_transactions_between("test_user", end=date(2023, 10, 1))) == 1
+
+    def test_query_transactions_combines_filters(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transactions("test_user", [
+            Transaction(date(2023, 10, 1), "Rent", "Home", 900.0, TransactionType('Despesa')),
+            Transaction(date(2023, 10, 2), "Salary", "Work", 3000.0, TransactionType('Receita')),
+            Transaction(date(2023, 10, 3), "Market", "Food", 120.0, TransactionType('Despesa')),
+            Transaction(date(2023, 10, 4), "Dinner", "Food", 80.0, TransactionType('Despesa')),
+            Transaction(date(2023, 11, 1), "Bakery", "Food", 15.0, TransactionType('Despesa')),
+        ])
+
+        rows = db_manager.query_transactions("test_user", types=['Despesa'], categories=['Food', 'Home'],
+                                             start=date(2023, 10, 1), end=date(2023, 10, 31), min_amount=50)
+        assert [row[1] for row in rows] == ["Dinner", "Market", "Rent"]
+        assert [row[1] for row in db_manager.query_transactions("test_user", max_amount=80, sort='amount_asc')] == ["Bakery", "Dinner"]
+        assert len(db_manager.query_transactions("test_user", types=['Receita', 'Despesa'])) == 5
+        assert db_manager.query_transactions("test_user", categories=['Unknown']) == []
+
+    def test_query_transactions_sorted_pagination(self, db_manager):
+        db_manager.create_user_table("test_user")
+        amounts = [30.0, 10.0, 30.0, 20.0]
+        db_manager.add_transactions("test_user", [
+            Transaction(date(2023, 10, index + 1), f"Transaction {index}", "Test Category", amount, TransactionType('Despesa'))
+            for index, amount in enumerate(amounts)
+        ])
+
+        seen, cursor = [], None
+        while True:
+            page = db_manager.query_transactions("test_user", sort='amount_desc', limit=2, cursor=cursor)
+            seen.extend(row[1] for row in page)
+            if len(page) < 2:
+                break
+            cursor = (page[-1][3], page[-1][5])
+        assert seen == ["Transaction 2", "Transaction 0", "Transaction 3", "Transaction 1"]
+
+        page = db_manager.query_transactions("test_user", sort='date_asc', limit=2)
+        assert [row[1] for row in page] == ["Transaction 0", "Transaction 1"]
+        page = db_manager.query_transactions("test_user", sort='date_asc', limit=2, cursor=(page[-1][0], page[-1][5]))
+        assert [row[1] for row in page] == ["Transaction 2", "Transaction 3"]
+
+    def test_query_totals(self, db_manager):
+        db_manager.create_user_table("test_user")
+        db_manager.add_transactions("test_user", [
+            Transaction(date(2023, 10, 1), "Salary", "Work", 3000.0, TransactionType('Receita')),
+            Transaction(date(2023, 10, 2), "Market", "Food", 120.5, TransactionType('Despesa')),
+            Transaction(date(2023, 11, 2), "Dinner", "Food", 80.0, TransactionType('Despesa')),
+        ])
+
+        assert db_manager.query_totals("test_user") == {"income": 3000.0, "expenses": 200.5, "balance": 2799.5, "count": 3}
+        assert db_manager.query_totals("test_user", categories=['Food'], end=date(2023, 10, 31)) == {
+            "income": 0.0, "expenses": 120.5, "balance": -120.5, "count": 1}
+
+    def test_query_transactions_invalid_arguments(self, db_manager):
+        db_manager.create_user_table("test_user")
+        with pytest.raises(ValueError):
+            db_manager.query_transactions("test_user", sort='description')
+        with pytest.raises(ValueError):
+            db_manager.query_transactions("test_user", types=['Transfer'])
+        with pytest.raises(ValueError):
+            db_manager.query_transactions("test_user", categories=[str(index) for index in range(51)])
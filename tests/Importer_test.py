@@ -0,0 +1,113 @@
+from src.db_manager import DatabaseManager
+from src.importer import import_statement, read_ofx_rows, to_transaction, main
+from datetime import date
+import pytest
+
+
+OFX_STATEMENT = """OFXHEADER:100
+DATA:OFXSGML
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250105120000[-3:BRT]
+<TRNAMT>-45.90
+<MEMO>Padaria
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250106<TRNAMT>1500.00<NAME>Salario</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+@pytest.fixture
+def db_manager():
+    db_manager = DatabaseManager(':memory:')
+    db_manager.create_user_table("test_user")
+    yield db_manager
+    db_manager.close()
+
+
+class TestImporter:
+
+    def test_import_csv_in_chunks(self, db_manager):
+        lines = ["date,description,category,amount,type\n"] + [
+            f"2025-01-{day:02d},Item {day},Food,{day}.50,Despesa\n" for day in range(1, 8)
+        ]
+        progress = []
+
+        report = import_statement(db_manager, "test_user", iter(lines), chunk_size=3,
+                                  progress=lambda report: progress.append(report.imported))
+
+        assert report.imported == 7
+        assert report.chunks == 3
+        assert progress == [3, 6, 7]
+        assert report.to_dict()["rowsPerSecond"] >= 0
+        assert len(db_manager.get_all_transactions("test_user")) == 7
+
+    def test_import_csv_reports_invalid_rows(self, db_manager):
+        lines = [
+            "date,description,category,amount,type\n",
+            "2025-01-01,Ok,Food,10,Despesa\n",
+            "01/02/2025,Bad date,Food,10,Despesa\n",
+            "2025-01-03,Bad type,Food,10,Other\n",
+            "2025-01-04,Infinite,Food,inf,Despesa\n",
+            "2025-01-05,Not a number,Food,nan,Despesa\n",
+        ]
+
+        report = import_statement(db_manager, "test_user", lines)
+
+        assert report.imported == 1
+        assert report.failed == 4
+        assert [error["line"] for error in report.errors] == [3, 4, 5, 6]
+
+    def test_import_csv_with_column_mapping(self, db_manager):
+        lines = [
+            "Data;Historico;Valor\n",
+            "05/01/2025;Mercado;-1.234,56\n",
+            "06/01/2025;Salario;3.000,00\n",
+        ]
+
+        report = import_statement(
+            db_manager, "test_user", lines, delimiter=';', date_format='%d/%m/%Y', decimal_separator=',',
+            columns={'date': 'Data', 'description': 'Historico', 'amount': 'Valor'},
+        )
+
+        assert report.imported == 2
+        rows = db_manager.get_all_transactions("test_user")
+        assert rows[0][1:5] == ("Mercado", "Outros", 1234.56, "Despesa")
+        assert rows[1][1:5] == ("Salario", "Outros", 3000.0, "Receita")
+
+    def test_read_ofx_rows(self):
+        rows = [row for _, row in read_ofx_rows(OFX_STATEMENT.splitlines(keepends=True))]
+        assert rows == [
+            {'date': '2025-01-05', 'description': 'Padaria', 'amount': '-45.90'},
+            {'date': '2025-01-06', 'description': 'Salario', 'amount': '1500.00'},
+        ]
+
+    def test_import_ofx(self, db_manager):
+        report = import_statement(db_manager, "test_user", OFX_STATEMENT.splitlines(keepends=True), file_format='ofx')
+        assert report.imported == 2
+        rows = db_manager.get_all_transactions("test_user")
+        assert rows[0][4] == "Despesa"
+        assert rows[1][4] == "Receita"
+
+    def test_to_transaction_uses_explicit_type(self):
+        transaction = to_transaction({'date': '2025-01-01', 'description': 'Refund', 'amount': '-5', 'type': 'Receita'})
+        assert transaction.get_date() == date(2025, 1, 1)
+        assert transaction.get_amount() == 5.0
+        assert transaction.get_type() == "Receita"
+
+    def test_unsupported_format_raises_exception(self, db_manager):
+        with pytest.raises(ValueError):
+            import_statement(db_manager, "test_user", [], file_format='xls')
+
+    def test_command_line_import(self, tmp_path, capsys):
+        statement = tmp_path / "statement.csv"
+        statement.write_text("date,description,category,amount,type\n2025-02-01,Gym,Health,80,Despesa\n")
+        db_path = str(tmp_path / "import.db")
+
+        assert main([str(statement), '--user', 'cli_user', '--db', db_path]) == 0
+        assert "1 of 1 rows imported" in capsys.readouterr().out
+
+        db_manager = DatabaseManager(db_path)
+        assert len(db_manager.get_all_transactions("cli_user")) == 1
+        db_manager.close()
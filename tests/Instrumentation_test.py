@@ -0,0 +1,105 @@
+from src.metrics import MetricsRegistry
+from src.tracing import RequestTimer, TracedDatabase, TracingCursor
+import app as flask_app
+import os
+import pytest
+import sqlite3
+
+
+@pytest.fixture
+def client():
+    flask_app.metrics.clear()
+    yield flask_app.app.test_client()
+    flask_app.close_pool()
+    flask_app.response_cache.clear()
+    for path in ('finance.db', 'finance.db-wal', 'finance.db-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class TestMetricsRegistry:
+
+    def test_renders_histograms_and_counters(self):
+        registry = MetricsRegistry(prefix='app_')
+        registry.observe('latency_seconds', 0.003, {'route': '/a'}, "Latency.", buckets=(0.001, 0.01))
+        registry.observe('latency_seconds', 0.5, {'route': '/a'}, "Latency.", buckets=(0.001, 0.01))
+        registry.inc('rows_total', 3, {'operation': 'select'}, "Rows.")
+        text = registry.render({'pool_idle': ("Idle connections.", 2)})
+
+        assert '# TYPE app_latency_seconds histogram' in text
+        assert 'app_latency_seconds_bucket{route="/a",le="0.001"} 0' in text
+        assert 'app_latency_seconds_bucket{route="/a",le="0.01"} 1' in text
+        assert 'app_latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+        assert 'app_latency_seconds_count{route="/a"} 2' in text
+        assert 'app_rows_total{operation="select"} 3' in text
+        assert '# TYPE app_pool_idle gauge\napp_pool_idle 2' in text
+
+    def test_escapes_label_values(self):
+        registry = MetricsRegistry()
+        registry.inc('hits_total', labels={'route': 'a"b\\c'})
+        assert 'hits_total{route="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_rejects_a_name_reused_with_another_type(self):
+        registry = MetricsRegistry()
+        registry.inc('events')
+        with pytest.raises(ValueError):
+            registry.observe('events', 1.0)
+
+
+class TestTracing:
+
+    def test_tracing_cursor_records_latency_and_rows(self):
+        connection = sqlite3.connect(':memory:')
+        timer = RequestTimer()
+        cursor = TracingCursor(connection.cursor(), timer.record_statement)
+        cursor.execute("CREATE TABLE t (x)")
+        cursor.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+        cursor.execute("SELECT x FROM t")
+        assert cursor.fetchone() == (1,)
+        assert len(cursor.fetchall()) == 2
+        assert [(statement.split()[0], rows) for statement, _, rows in timer.statements] == [('CREATE', 0), ('INSERT', 0), ('SELECT', 3)]
+        assert all(seconds >= 0 for _, seconds, _ in timer.statements)
+        connection.close()
+
+    def test_traced_database_times_methods_as_spans(self):
+        class Stub:
+            def check_username_availability(self, user):
+                return False
+
+            def get_summary(self, user):
+                return {}
+
+        timer = RequestTimer()
+        db = TracedDatabase(Stub(), timer)
+        db.check_username_availability('u')
+        db.get_summary('u')
+        assert set(timer.spans) == {('check_username_availability', None), ('query', 'get_summary')}
+        header = timer.server_timing()
+        assert header.startswith('check_username_availability;dur=')
+        assert 'query;desc="get_summary";dur=' in header
+        assert 'total;dur=' in header
+
+
+class TestRequestInstrumentation:
+
+    def test_responses_carry_server_timing(self, client):
+        client.post('/users/timed_user')
+        client.post('/users/timed_user/transactions', json={
+            "date": "2025-01-02", "description": "Café", "category": "Alimentação", "amount": 5.0, "type": "Despesa"
+        })
+        response = client.get('/users/timed_user/transactions?limit=10')
+        timing = response.headers['Server-Timing']
+        for phase in ('get_db', 'query;desc="get_all_transactions"', 'format_transaction_rows', 'jsonify', 'db;desc=', 'total'):
+            assert phase in timing
+
+    def test_metrics_endpoint_exposes_route_histograms(self, client):
+        client.post('/users/timed_user')
+        client.get('/users/timed_user/summary')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert 'finance_http_request_duration_seconds_count{method="GET",route="/users/<username>/summary",status="200"} 1' in text
+        assert 'finance_request_phase_duration_seconds_bucket{phase="jsonify",route="/users/<username>/summary",le="+Inf"} 1' in text
+        assert 'finance_db_statement_duration_seconds_count{operation="select"}' in text
+        assert '# TYPE finance_pool_in_use gauge' in text
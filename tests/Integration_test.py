@@ -1,5 +1,9 @@
 import pytest
-from app import app, get_db
+import app as app_module
+import serve
+from app import app, get_db, close_pool, response_cache
+import io
+import json
 import os
 
 @pytest.fixture
@@ -10,9 +14,9 @@ def client():
     2. Creates the database within an application context.
     3. Yields a test client for the test function to use.
     4. After the test, the @app.teardown_appcontext function we added in
-       app.py automatically handles closing the database connection.
-    5. Finally, the test database file is removed to ensure each test
-       is isolated and starts with a clean slate.
+       app.py automatically returns the database connection to the pool.
+    5. Finally, the pool is closed and the test database files are removed
+       to ensure each test is isolated and starts with a clean slate.
     """
     test_db_path = 'finance.db'
     app.config['TESTING'] = True
@@ -22,8 +26,11 @@ def client():
         
         yield app.test_client()
 
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
+    close_pool()
+    response_cache.clear()
+    for path in (test_db_path, f"{test_db_path}-wal", f"{test_db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
 
 
 @pytest.fixture
@@ -259,4 +266,412 @@ def test_filter_by_month(client, prepare_user):
     assert isinstance(data, list)
     assert len(data) == 2
     # Check that both returned transactions are from June
-    assert all(tx["date"].startswith("2025-06") for tx in data)
\ No newline at end of file
+    assert all(tx["date"].startswith("2025-06") for tx in data)
+
+
+def test_pool_stats(client, prepare_user):
+    user = "test_user_pool_stats"
+    prepare_user(user)
+    client.get(f"/users/{user}/transactions")
+
+    res = client.get("/stats/pool")
+    assert res.status_code == 200
+    stats = res.get_json()
+    assert stats["size"] >= 1
+    assert stats["checkouts"] >= 1
+    assert 1 <= stats["in_use"] <= stats["size"]
+
+def test_add_transactions_batch(client, prepare_user):
+    user = "test_user_batch"
+    prepare_user(user)
+
+    payload = [
+        {"date": "2025-01-10", "description": "Salary", "category": "Work", "amount": 3000.00, "type": "Receita"},
+        {"date": "2025-01-11", "description": "Rent", "category": "Home", "amount": 1200.00, "type": "Despesa"},
+        {"date": "2025-01-12", "description": "Broken", "category": "Home", "amount": 10.00, "type": "Invalid"},
+        {"date": "2025-01-13", "description": "Missing amount", "category": "Home", "type": "Despesa"},
+    ]
+    res = client.post(f"/users/{user}/transactions/batch", json=payload)
+    assert res.status_code == 200
+    data = res.get_json()
+    assert len(data["transactionIds"]) == 2
+    assert [error["index"] for error in data["errors"]] == [2, 3]
+
+    res = client.get(f"/users/{user}/transactions")
+    descriptions = {tx["id"]: tx["description"] for tx in res.get_json()}
+    assert [descriptions[tx_id] for tx_id in data["transactionIds"]] == ["Salary", "Rent"]
+
+def test_add_transactions_batch_invalid_payload(client, prepare_user):
+    user = "test_user_batch_invalid"
+    prepare_user(user)
+
+    res = client.post(f"/users/{user}/transactions/batch", json={"date": "2025-01-10"})
+    assert res.status_code == 400
+
+    res = client.post(f"/users/{user}/transactions/batch", json=[{"date": "not a date"}])
+    assert res.status_code == 400
+
+def test_add_transactions_batch_unknown_user(client):
+    res = client.post("/users/missing_batch_user/transactions/batch", json=[])
+    assert res.status_code == 404
+
+def test_add_transactions_batch_is_queued(client, prepare_user):
+    user = "test_user_batch_queued"
+    prepare_user(user)
+    operations = client.get("/stats/write-queue").get_json()["operations"]
+
+    payload = [{"date": "2025-01-10", "description": "Salary", "category": "Work", "amount": 3000.00, "type": "Receita"}]
+    assert client.post(f"/users/{user}/transactions/batch", json=payload).status_code == 200
+    assert client.get("/stats/write-queue").get_json()["operations"] == operations + 1
+
+def test_add_transactions_batch_commits_chunks_as_it_reads(client, prepare_user, monkeypatch):
+    user = "test_user_batch_chunks"
+    prepare_user(user)
+    monkeypatch.setattr(app_module, "BATCH_CHUNK_SIZE", 2)
+    operations = client.get("/stats/write-queue").get_json()["operations"]
+
+    rows = [{"date": f"2025-01-{day:02d}", "description": f"Item {day}", "category": "Work", "amount": day, "type": "Receita"}
+            for day in range(1, 6)]
+    res = client.post(f"/users/{user}/transactions/batch", json={"transactions": rows})
+    assert res.status_code == 200
+    assert len(res.get_json()["transactionIds"]) == 5
+    assert client.get("/stats/write-queue").get_json()["operations"] == operations + 3
+
+    # Chunks read before a syntax error are kept and reported.
+    body = json.dumps(rows)[:-1] + ", {"
+    res = client.post(f"/users/{user}/transactions/batch", data=body, content_type="application/json")
+    assert res.status_code == 400
+    assert "Invalid JSON payload" in res.get_json()["error"]
+    assert len(res.get_json()["transactionIds"]) == 4
+    assert len(client.get(f"/users/{user}/transactions").get_json()) == 9
+
+    res = client.post(f"/users/{user}/transactions/batch", data=json.dumps(rows), content_type="text/plain")
+    assert res.status_code == 400
+
+def test_oversized_batch_and_import_are_refused(client, prepare_user, monkeypatch):
+    user = "test_user_oversized"
+    prepare_user(user)
+    monkeypatch.setattr(app_module, "MAX_BATCH_BYTES", 64)
+    monkeypatch.setattr(app_module, "MAX_IMPORT_BYTES", 64)
+
+    payload = [{"date": "2025-01-10", "description": "x" * 100, "category": "Work", "amount": 1, "type": "Receita"}]
+    res = client.post(f"/users/{user}/transactions/batch", json=payload)
+    assert res.status_code == 413
+    statement = ("date,description,category,amount,type\n" + "2025-03-01,Coffee,Food,7.50,Despesa\n" * 5).encode("utf-8")
+    res = client.post(f"/users/{user}/transactions/import", data={"file": (io.BytesIO(statement), "statement.csv")},
+                      content_type="multipart/form-data")
+    assert res.status_code == 413
+    assert client.get(f"/users/{user}/transactions").get_json() == []
+
+def test_import_statement_upload(client, prepare_user):
+    user = "test_user_import"
+    prepare_user(user)
+
+    statement = (
+        "date,description,category,amount,type\n"
+        "2025-03-01,Coffee,Food,7.50,Despesa\n"
+        "2025-03-02,Refund,Food,7.50,Receita\n"
+    ).encode("utf-8")
+    res = client.post(
+        f"/users/{user}/transactions/import",
+        data={"file": (io.BytesIO(statement), "statement.csv"), "chunk_size": "1"},
+        content_type="multipart/form-data",
+    )
+    assert res.status_code == 200
+    report = res.get_json()
+    assert report["imported"] == 2
+    assert report["chunks"] == 2
+
+    res = client.get(f"/users/{user}/transactions")
+    assert len(res.get_json()) == 2
+
+def test_import_statement_without_file(client, prepare_user):
+    user = "test_user_import_missing"
+    prepare_user(user)
+
+    res = client.post(f"/users/{user}/transactions/import", data={}, content_type="multipart/form-data")
+    assert res.status_code == 400
+
+def test_paginated_transaction_listing(client, prepare_user):
+    user = "test_user_pagination"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions/batch", json=[
+        {"date": f"2025-04-{day:02d}", "description": f"Item {day}", "category": "Food", "amount": day, "type": "Despesa"}
+        for day in range(1, 6)
+    ])
+
+    descriptions = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        res = client.get(f"/users/{user}/transactions/debits", query_string=params)
+        assert res.status_code == 200
+        page = res.get_json()
+        assert len(page["transactions"]) <= 2
+        descriptions.extend(tx["description"] for tx in page["transactions"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert descriptions == ["Item 5", "Item 4", "Item 3", "Item 2", "Item 1"]
+
+def test_paginated_listing_invalid_parameters(client, prepare_user):
+    user = "test_user_pagination_invalid"
+    prepare_user(user)
+
+    assert client.get(f"/users/{user}/transactions?limit=0").status_code == 400
+    assert client.get(f"/users/{user}/transactions?limit=abc").status_code == 400
+    assert client.get(f"/users/{user}/transactions?cursor=bogus").status_code == 400
+    # Well-formed tokens whose date is not an ISO date string.
+    for cursor in ("WzUsMV0=", "W251bGwsMV0=", "WyIyMDI1LTEzLTAxIiwxXQ=="):
+        assert client.get(f"/users/{user}/transactions?limit=5&cursor={cursor}").status_code == 400, cursor
+        assert client.get(f"/users/{user}/transactions/debits?cursor={cursor}").status_code == 400, cursor
+
+def test_export_transactions_streams_json_and_ndjson(client, prepare_user):
+    user = "test_user_export"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions/batch", json=[
+        {"date": f"2025-05-{day:02d}", "description": f"Item {day}", "category": "Food", "amount": day, "type": "Despesa"}
+        for day in range(1, 4)
+    ])
+
+    res = client.get(f"/users/{user}/transactions/export")
+    assert res.status_code == 200
+    assert res.is_streamed
+    assert [tx["description"] for tx in res.get_json()] == ["Item 3", "Item 2", "Item 1"]
+
+    res = client.get(f"/users/{user}/transactions/export", headers={"Accept": "application/x-ndjson"})
+    assert res.mimetype == "application/x-ndjson"
+    lines = res.get_data(as_text=True).splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0])["description"] == "Item 3"
+
+def test_export_is_read_after_the_request_ends():
+    """
+    A server reads the body after the request's teardown has returned its
+    connection to the pool, so this test runs outside the `client` fixture's
+    application context.
+    """
+    test_db_path = 'finance.db'
+    user = "test_user_export_teardown"
+    test_client = app.test_client()
+    try:
+        test_client.post(f"/users/{user}")
+        test_client.post(f"/users/{user}/transactions/batch", json=[
+            {"date": f"2025-05-{day:02d}", "description": f"Item {day}", "category": "Food", "amount": day, "type": "Despesa"}
+            for day in range(1, 4)
+        ])
+
+        res = test_client.get(f"/users/{user}/transactions/export?format=ndjson", buffered=False)
+        assert res.status_code == 200
+        lines = res.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["description"] for line in lines] == ["Item 3", "Item 2", "Item 1"]
+    finally:
+        close_pool()
+        for path in (test_db_path, f"{test_db_path}-wal", f"{test_db_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+def test_export_transactions_empty_and_invalid(client, prepare_user):
+    user = "test_user_export_empty"
+    prepare_user(user)
+
+    assert client.get(f"/users/{user}/transactions/export").get_json() == []
+    assert client.get(f"/users/{user}/transactions/export?format=ndjson").get_data(as_text=True) == ""
+    assert client.get(f"/users/{user}/transactions/export?format=xml").status_code == 400
+    assert client.get("/users/missing_export_user/transactions/export").status_code == 404
+
+def test_filter_by_date_range(client, prepare_user):
+    user = "test_user_date_range"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions/batch", json=[
+        {"date": f"2025-06-{day:02d}", "description": f"Item {day}", "category": "Food", "amount": day, "type": "Despesa"}
+        for day in range(1, 11)
+    ])
+
+    res = client.get(f"/users/{user}/transactions?from=2025-06-03&to=2025-06-05")
+    assert res.status_code == 200
+    assert sorted(tx["date"] for tx in res.get_json()) == ["2025-06-03", "2025-06-04", "2025-06-05"]
+
+    res = client.get(f"/users/{user}/transactions?from=2025-06-08&limit=2")
+    page = res.get_json()
+    assert [tx["date"] for tx in page["transactions"]] == ["2025-06-10", "2025-06-09"]
+    assert page["nextCursor"] is not None
+
+    assert client.get(f"/users/{user}/transactions?from=06/08/2025").status_code == 400
+
+def test_user_cache_stats(client, prepare_user):
+    user = "test_user_cache_stats"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions", json={
+        "date": "2025-06-01", "description": "Cached", "category": "Food", "amount": 1, "type": "Despesa"
+    })
+
+    res = client.get("/stats/user-cache")
+    assert res.status_code == 200
+    stats = res.get_json()
+    assert stats["size"] >= 1
+    assert stats["hits"] >= 1
+
+def test_user_summary(client, prepare_user):
+    user = "test_user_summary"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions/batch", json=[
+        {"date": "2025-07-01", "description": "Salary", "category": "Work", "amount": 3000, "type": "Receita"},
+        {"date": "2025-07-02", "description": "Rent", "category": "Home", "amount": 1200, "type": "Despesa"},
+    ])
+    res = client.post(f"/users/{user}/transactions", json={
+        "date": "2025-08-01", "description": "Food", "category": "Food", "amount": 300, "type": "Despesa"
+    })
+    client.delete(f"/users/{user}/transactions/{res.get_json()['transactionId']}")
+
+    res = client.get(f"/users/{user}/summary")
+    assert res.status_code == 200
+    summary = res.get_json()
+    assert summary["balance"] == 1800
+    assert [month["month"] for month in summary["byMonth"]] == ["2025-07"]
+
+    assert client.get("/users/missing_summary_user/summary").status_code == 404
+
+def test_non_finite_amounts_are_rejected(client, prepare_user):
+    user = "test_user_non_finite"
+    prepare_user(user)
+    transaction = {"date": "2025-07-01", "description": "Salary", "category": "Work", "amount": 3000, "type": "Receita"}
+
+    for amount in ("inf", "-inf", "nan"):
+        res = client.post(f"/users/{user}/transactions", json=dict(transaction, amount=amount))
+        assert res.status_code == 400, amount
+
+    res = client.post(f"/users/{user}/transactions/batch", json=[transaction, dict(transaction, amount="inf"), dict(transaction, amount="nan")])
+    assert res.status_code == 200
+    assert [error["index"] for error in res.get_json()["errors"]] == [1, 2]
+
+    summary = client.get(f"/users/{user}/summary").get_json()
+    assert summary["balance"] == 3000
+
+def test_listing_is_served_from_cache_until_a_write(client, prepare_user):
+    user = "test_user_response_cache"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions", json={
+        "date": "2025-09-01", "description": "First", "category": "Food", "amount": 10, "type": "Despesa"
+    })
+
+    first = client.get(f"/users/{user}/transactions")
+    etag = first.headers["ETag"]
+    hits_before = response_cache.stats()["hits"]
+
+    second = client.get(f"/users/{user}/transactions")
+    assert second.get_json() == first.get_json()
+    assert response_cache.stats()["hits"] == hits_before + 1
+
+    not_modified = client.get(f"/users/{user}/transactions", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    client.post(f"/users/{user}/transactions", json={
+        "date": "2025-09-02", "description": "Second", "category": "Food", "amount": 20, "type": "Despesa"
+    })
+    refreshed = client.get(f"/users/{user}/transactions", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert len(refreshed.get_json()) == 2
+    assert refreshed.headers["ETag"] != etag
+
+def test_cache_is_off_with_several_workers(client, prepare_user, monkeypatch):
+    monkeypatch.setenv("FINANCE_RESPONSE_CACHE", "1")
+    serve.configure_response_cache(1)
+    assert os.environ["FINANCE_RESPONSE_CACHE"] == "1"
+    serve.configure_response_cache(4)
+    assert os.environ["FINANCE_RESPONSE_CACHE"] == "0"
+
+    monkeypatch.setattr(app_module, "RESPONSE_CACHE_ENABLED", False)
+    user = "test_user_response_cache_off"
+    prepare_user(user)
+    stores_before = response_cache.stats()["stores"]
+    for _ in range(2):
+        res = client.get(f"/users/{user}/transactions")
+        assert res.status_code == 200
+        assert "ETag" not in res.headers
+    assert response_cache.stats()["stores"] == stores_before
+
+def test_cache_is_invalidated_by_update_and_delete(client, prepare_user):
+    user = "test_user_response_cache_writes"
+    prepare_user(user)
+    payload = {"date": "2025-09-01", "description": "Original", "category": "Food", "amount": 10, "type": "Despesa"}
+    tx_id = client.post(f"/users/{user}/transactions", json=payload).get_json()["transactionId"]
+    assert client.get(f"/users/{user}/transactions/debits").get_json()[0]["description"] == "Original"
+
+    client.put(f"/users/{user}/transactions/{tx_id}", json=dict(payload, description="Edited"))
+    assert client.get(f"/users/{user}/transactions/debits").get_json()[0]["description"] == "Edited"
+    assert client.get(f"/users/{user}/summary").get_json()["expenses"] == 10
+
+    client.delete(f"/users/{user}/transactions/{tx_id}")
+    assert client.get(f"/users/{user}/transactions/debits").get_json() == []
+    assert client.get(f"/users/{user}/summary").get_json()["expenses"] == 0
+
+def test_columnar_listing_format(client, prepare_user):
+    user = "test_user_columnar"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions/batch", json=[
+        {"date": "2025-05-01", "description": "Salário", "category": "Trabalho", "amount": 3000, "type": "Receita"},
+        {"date": "2025-05-02", "description": "Mercado", "category": "Alimentação", "amount": 200, "type": "Despesa"},
+        {"date": "2025-05-03", "description": "Feira", "category": "Alimentação", "amount": 50, "type": "Despesa"},
+    ])
+    rows = client.get(f"/users/{user}/transactions").get_json()
+
+    res = client.get(f"/users/{user}/transactions?format=columnar")
+    assert res.status_code == 200
+    listing = res.get_json()
+    assert listing["columns"] == ["date", "description", "category", "amount", "type", "id"]
+    assert listing["length"] == 3
+    assert [dict(zip(listing["columns"], values)) for values in zip(*listing["data"])] == rows
+    assert "nextCursor" not in listing
+
+    res = client.get(f"/users/{user}/transactions/debits?limit=1&dictionary=1",
+                     headers={"Accept": "application/vnd.finance.columnar+json"})
+    page = res.get_json()
+    assert page["dictionaries"] == {"category": ["Alimentação"], "type": ["Despesa"]}
+    assert page["data"][2] == [0] and page["data"][4] == [0]
+    assert page["data"][1] == ["Feira"]
+    assert page["nextCursor"] is not None
+
+    assert client.get(f"/users/{user}/transactions?format=xml").status_code == 400
+
+def test_query_transactions_combines_filters(client, prepare_user):
+    user = "test_user_query"
+    prepare_user(user)
+    client.post(f"/users/{user}/transactions/batch", json=[
+        {"date": "2025-06-01", "description": "Salário", "category": "Trabalho", "amount": 3000, "type": "Receita"},
+        {"date": "2025-06-02", "description": "Mercado", "category": "Alimentação", "amount": 200, "type": "Despesa"},
+        {"date": "2025-06-03", "description": "Cinema", "category": "Lazer", "amount": 40, "type": "Despesa"},
+        {"date": "2025-06-04", "description": "Feira", "category": "Alimentação", "amount": 50, "type": "Despesa"},
+        {"date": "2025-07-01", "description": "Padaria", "category": "Alimentação", "amount": 15, "type": "Despesa"},
+    ])
+
+    res = client.get(f"/users/{user}/transactions/query", query_string={
+        "type": "Despesa", "category": ["Alimentação", "Lazer"], "from": "2025-06-01", "to": "2025-06-30",
+        "sort": "amount_desc", "limit": 2, "totals": 1})
+    assert res.status_code == 200
+    page = res.get_json()
+    assert [tx["description"] for tx in page["transactions"]] == ["Mercado", "Feira"]
+    assert page["totals"] == {"income": 0.0, "expenses": 290.0, "balance": -290.0, "count": 3}
+
+    res = client.get(f"/users/{user}/transactions/query", query_string={
+        "type": "Despesa", "category": ["Alimentação", "Lazer"], "from": "2025-06-01", "to": "2025-06-30",
+        "sort": "amount_desc", "limit": 2, "cursor": page["nextCursor"]})
+    page = res.get_json()
+    assert [tx["description"] for tx in page["transactions"]] == ["Cinema"]
+    assert page["nextCursor"] is None and "totals" not in page
+
+    page = client.get(f"/users/{user}/transactions/query?min_amount=40&max_amount=200&sort=date_asc").get_json()
+    assert [tx["description"] for tx in page["transactions"]] == ["Mercado", "Cinema", "Feira"]
+
+def test_query_transactions_invalid_parameters(client, prepare_user):
+    user = "test_user_query_invalid"
+    prepare_user(user)
+
+    assert client.get("/users/ghost_query_user/transactions/query").status_code == 404
+    for query in ("sort=description", "type=Transfer", "min_amount=abc", "from=2025-13-01", "limit=0", "cursor=bogus",
+                  "sort=amount_desc&cursor=WyIyMDI1LTAxLTAyIiwzXQ==", "min_amount=nan", "max_amount=inf", "min_amount=-inf",
+                  "max_amount=-Infinity"):
+        assert client.get(f"/users/{user}/transactions/query?{query}").status_code == 400, query
@@ -0,0 +1,69 @@
+from benchmarks import json_benchmark
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Flask
+from src.json_provider import FastJSONProvider, available_backends
+import app as flask_app
+import json
+import os
+import pytest
+
+
+@pytest.fixture(params=available_backends())
+def provider(request):
+    return FastJSONProvider(Flask(__name__), backend=request.param)
+
+
+class TestFastJSONProvider:
+
+    def test_serializes_dates_and_numbers_natively(self, provider):
+        document = {'date': date(2025, 1, 2), 'at': datetime(2025, 1, 2, 3, 4, 5), 'amount': Decimal('10.50'), 'n': 3}
+        assert json.loads(provider.dumps(document)) == {
+            'date': '2025-01-02', 'at': '2025-01-02T03:04:05', 'amount': 10.5, 'n': 3
+        }
+
+    def test_output_is_compact_utf8_in_insertion_order(self, provider):
+        assert provider.dumps_bytes({'b': 'Saúde', 'a': [1, 2]}) == '{"b":"Saúde","a":[1,2]}'.encode('utf-8')
+        assert provider.loads(b'{"x": [1.5, null]}') == {'x': [1.5, None]}
+
+    def test_rejects_unknown_types_and_backends(self, provider):
+        with pytest.raises(TypeError):
+            provider.dumps({'value': object()})
+        with pytest.raises(ValueError):
+            FastJSONProvider(Flask(__name__), backend='simplejson')
+
+
+class TestAppJSON:
+
+    def test_listing_dates_are_iso_strings(self):
+        client = flask_app.app.test_client()
+        try:
+            client.post('/users/json_user')
+            client.post('/users/json_user/transactions', json={
+                "date": "2025-03-04", "description": "Café", "category": "Alimentação", "amount": 5.0, "type": "Despesa"
+            })
+            response = client.get('/users/json_user/transactions')
+            assert response.get_json()[0]['date'] == '2025-03-04'
+            assert 'Café'.encode('utf-8') in response.data
+        finally:
+            flask_app.close_pool()
+            flask_app.response_cache.clear()
+            for path in ('finance.db', 'finance.db-wal', 'finance.db-shm'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def test_rows_and_columns_keep_date_objects(self):
+        rows = json_benchmark.transaction_rows(3)
+        assert isinstance(flask_app.format_transaction_rows(rows)[0]['date'], date)
+        assert isinstance(flask_app.format_transaction_columns(rows, False)['data'][0][0], date)
+
+
+class TestJsonBenchmark:
+
+    def test_reports_time_per_100k_rows_for_each_backend(self, tmp_path):
+        output = tmp_path / 'json.json'
+        json_benchmark.main(['--rows', '200', '--repeat', '2', '--output', str(output)])
+        results = json.loads(output.read_text(encoding='utf-8'))['results']
+        for backend in ['flask-default', *available_backends()]:
+            assert results[f'{backend} (rows)']['ms_per_100k_rows'] > 0
+            assert results[f'{backend} (columnar)']['bytes_per_100k_rows'] > 0
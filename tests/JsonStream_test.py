@@ -0,0 +1,41 @@
+from src.json_stream import iter_json_array
+import io
+import json
+import pytest
+
+
+def read(text, key=None, read_size=3):
+    return list(iter_json_array(io.BytesIO(text.encode('utf-8')), key=key, read_size=read_size))
+
+
+class TestJsonStream:
+
+    def test_elements_are_split_across_reads(self):
+        rows = [{"description": "Café ☕", "amount": 1234.5}, 12345678, [1, [2]], "x" * 10, None, True]
+        text = json.dumps(rows, ensure_ascii=False)
+        for read_size in (1, 2, 3, 7, 1024):
+            assert read(text, read_size=read_size) == rows
+
+    def test_array_under_a_key(self):
+        text = ' {"other": {"a": [1, 2]}, "transactions": [ {"id": 1} , {"id": 2} ], "after": 3} '
+        assert read(text, key="transactions") == [{"id": 1}, {"id": 2}]
+        assert read('{"transactions": []}', key="transactions") == []
+
+    def test_empty_array(self):
+        assert read(" [ ] ") == []
+
+    @pytest.mark.parametrize("text", ["", "{}", '{"other": []}', '{"transactions": 5}', '"text"', "{[]", '{"transactions" []}'])
+    def test_bodies_without_an_array_raise_exception(self, text):
+        with pytest.raises(ValueError):
+            iter_json_array(io.BytesIO(text.encode('utf-8')), key="transactions")
+
+    @pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "[1, }", "[1] 2", '{"transactions": [1], 2}', '{"transactions": [1]'])
+    def test_syntax_errors_raise_while_iterating(self, text):
+        elements = iter_json_array(io.BytesIO(text.encode('utf-8')), key="transactions", read_size=2)
+        assert next(elements) == 1
+        with pytest.raises(json.JSONDecodeError):
+            list(elements)
+
+    def test_invalid_utf8_raises_exception(self):
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.BytesIO(b'["\xff"]')))
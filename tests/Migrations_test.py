@@ -0,0 +1,87 @@
+from src.db_manager import DatabaseManager
+from src.migrations import add_transaction_indexes, main, migrate_to_cents, migrate_to_compact
+from src.storage import CentsEncoding, CompactEncoding, PerUserTableLayout, create_layout
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+from datetime import date
+import pytest
+
+
+class TestMigrations:
+
+    def test_add_transaction_indexes_to_existing_tables(self, tmp_path):
+        db_path = str(tmp_path / "legacy.db")
+        db_manager = DatabaseManager(db_path)
+        db_manager.cursor.execute("CREATE TABLE legacy_user (date, description, category, amount, type, id INTEGER PRIMARY KEY)")
+        db_manager.commit()
+
+        assert add_transaction_indexes(db_manager) == ["legacy_user"]
+
+        db_manager.cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name='legacy_user'")
+        assert db_manager.cursor.fetchone()[0] == 3
+        db_manager.close()
+
+    def test_command_line_migration(self, tmp_path, capsys):
+        db_path = str(tmp_path / "legacy.db")
+        db_manager = DatabaseManager(db_path)
+        db_manager.create_user_table("some_user")
+        db_manager.close()
+
+        assert main(['indexes', '--db', db_path]) == 0
+        assert "applied to 1 users" in capsys.readouterr().out
+
+    @pytest.mark.parametrize("storage", ["per_user", "shared"])
+    @pytest.mark.parametrize("migration, encoding", [(migrate_to_cents, CentsEncoding), (migrate_to_compact, CompactEncoding)])
+    def test_migrate_encoding(self, tmp_path, storage, migration, encoding):
+        db_path = str(tmp_path / "legacy.db")
+        db_manager = DatabaseManager(db_path, layout=create_layout(storage))
+        db_manager.create_user_table("ana")
+        db_manager.add_transactions("ana", [
+            Transaction(date(2024, 5, day), f"T{day}", "Food", 0.1 * day, TransactionType('Despesa' if day % 2 else 'Receita'))
+            for day in range(1, 11)
+        ])
+        before = db_manager.get_all_transactions("ana")
+        summary = db_manager.get_summary("ana")
+
+        assert migration(db_manager) == ["ana"]
+        assert isinstance(db_manager.layout.encoding, encoding)
+        assert sorted(row[:3] + (round(row[3], 2),) + row[4:] for row in before) == sorted(db_manager.get_all_transactions("ana"))
+        assert db_manager.get_summary("ana") == summary
+        db_manager.close()
+
+        migrated = DatabaseManager(db_path, layout=create_layout(storage, encoding.name))
+        table = migrated.layout.table_name("ana")
+        migrated.cursor.execute(f"SELECT DISTINCT typeof(amount), typeof(type) FROM {table}")
+        assert migrated.cursor.fetchall() == [('integer', 'integer')]
+        assert migrated.get_category_transactions("ana", "Food", limit=3) == migrated.get_all_transactions("ana", limit=3)
+        migrated.cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name = ?", (table,))
+        assert migrated.cursor.fetchone()[0] == 3
+        migrated.add_transaction("ana", Transaction(date(2024, 6, 1), "New", "Food", 2.5, TransactionType('Receita')))
+        assert migrated.get_summary("ana")["income"] == round(summary["income"] + 2.5, 2)
+        migrated.close()
+
+    def test_command_line_cents_migration(self, tmp_path, capsys):
+        db_path = str(tmp_path / "legacy.db")
+        db_manager = DatabaseManager(db_path)
+        db_manager.create_user_table("some_user")
+        db_manager.close()
+
+        assert main(['cents', '--db', db_path]) == 0
+        assert "applied to 1 users" in capsys.readouterr().out
+        db_manager = DatabaseManager(db_path, layout=PerUserTableLayout(CentsEncoding()))
+        db_manager.cursor.execute("SELECT type FROM pragma_table_info('some_user') WHERE name = 'amount'")
+        assert db_manager.cursor.fetchone() == ('INTEGER',)
+        db_manager.close()
+
+    def test_compact_migration_from_cents(self, tmp_path):
+        db_path = str(tmp_path / "cents.db")
+        db_manager = DatabaseManager(db_path, layout=PerUserTableLayout(CentsEncoding()))
+        db_manager.create_user_table("ana")
+        db_manager.add_transaction("ana", Transaction(date(2024, 2, 29), "Leap", "Saúde", 12.34, TransactionType('Despesa')))
+        db_manager.close()
+
+        assert main(['compact', '--db', db_path, '--encoding', 'cents']) == 0
+        db_manager = DatabaseManager(db_path, layout=PerUserTableLayout(CompactEncoding()))
+        assert db_manager.get_all_transactions("ana") == [("2024-02-29", "Leap", "Saúde", 12.34, "Despesa", 1)]
+        assert db_manager.get_summary("ana")["byMonth"][0]["month"] == "2024-02"
+        db_manager.close()
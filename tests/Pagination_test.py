@@ -0,0 +1,49 @@
+from src.pagination import encode_cursor, encode_key, decode_cursor, decode_sort_cursor, encode_sort_cursor, paginate
+from datetime import date
+import pytest
+
+
+class TestPagination:
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor(("2025-01-02", "Description", "Category", 10.0, "Receita", 42))
+        assert decode_cursor(token) == ("2025-01-02", 42)
+
+    def test_cursor_accepts_date_objects(self):
+        token = encode_cursor((date(2025, 1, 2), "Description", "Category", 10.0, "Receita", 7))
+        assert decode_cursor(token) == ("2025-01-02", 7)
+
+    @pytest.mark.parametrize("token", ["not-a-cursor", "W10=", "WyIyMDI1LTAxLTAyIiwieCJd"])
+    def test_invalid_cursor_raises_exception(self, token):
+        with pytest.raises(ValueError, match="Invalid pagination cursor."):
+            decode_cursor(token)
+
+    @pytest.mark.parametrize("key", [[5, 1], [None, 1], ["2025-13-01", 1], ["x", 1], ["20250102", 1]])
+    def test_cursor_must_hold_an_iso_date(self, key):
+        with pytest.raises(ValueError, match="Invalid pagination cursor."):
+            decode_cursor(encode_key(key))
+        with pytest.raises(ValueError, match="Invalid pagination cursor."):
+            decode_sort_cursor(encode_key(key))
+
+    def test_paginate_returns_next_cursor_only_when_more_rows(self):
+        rows = [("2025-01-03", "", "", 1.0, "Receita", 3), ("2025-01-02", "", "", 1.0, "Receita", 2), ("2025-01-01", "", "", 1.0, "Receita", 1)]
+
+        page, next_cursor = paginate(rows, 2)
+        assert page == rows[:2]
+        assert decode_cursor(next_cursor) == ("2025-01-02", 2)
+
+        page, next_cursor = paginate(rows, 3)
+        assert page == rows
+        assert next_cursor is None
+
+    def test_sort_cursor_round_trip(self):
+        row = (date(2025, 1, 2), "Description", "Category", 10.5, "Receita", 42)
+        assert decode_sort_cursor(encode_sort_cursor(row, 0)) == ("2025-01-02", 42)
+        assert decode_sort_cursor(encode_sort_cursor(row, 3), numeric=True) == (10.5, 42)
+
+    def test_sort_cursor_checks_the_value_type(self):
+        row = ("2025-01-02", "Description", "Category", 10.5, "Receita", 42)
+        with pytest.raises(ValueError, match="Invalid pagination cursor."):
+            decode_sort_cursor(encode_sort_cursor(row, 0), numeric=True)
+        with pytest.raises(ValueError, match="Invalid pagination cursor."):
+            decode_sort_cursor(encode_sort_cursor(row, 3))
@@ -0,0 +1,61 @@
+from src.db_manager import DatabaseManager
+from src.query import Query, quote_identifier
+from tests.conftest import sample
+import pytest
+
+
+class TestQuoteIdentifier:
+
+    def test_quotes_names(self):
+        assert quote_identifier("alice") == '"alice"'
+        assert quote_identifier("maria-joão silva") == '"maria-joão silva"'
+
+    @pytest.mark.parametrize("name", ["", 'a"b', "a\x00b", "tab\there", "x" * 129, None])
+    def test_invalid_names_raise_exception(self, name):
+        with pytest.raises(ValueError):
+            quote_identifier(name)
+
+
+class TestQuery:
+
+    def test_builds_parameterized_select(self):
+        query = Query('"alice"', 'date, id').where("type = ?", 'Despesa').where("date >= ?", '2025-01-01')
+        query.order_by("date DESC, id DESC").limit(10)
+        assert query.build() == ('SELECT date, id FROM "alice" WHERE type = ? AND date >= ? ORDER BY date DESC, id DESC LIMIT ?',
+                                 ['Despesa', '2025-01-01', 10])
+
+    def test_values_never_change_the_statement(self):
+        first, _ = Query('"alice"', 'id').where("category = ?", "Saúde").limit(5).build()
+        second, _ = Query('"alice"', 'id').where("category = ?", "Lazer'; DROP TABLE alice; --").limit(50).build()
+        assert first == second
+
+
+class TestUsernamesAsTableNames:
+
+    @pytest.mark.parametrize("user", ["maria-joão", "o'brien", "select", "two words", "123"])
+    def test_any_printable_name_gets_its_own_table(self, user):
+        db = DatabaseManager(':memory:')
+        db.create_user_table(user)
+        db.add_transaction(user, sample(1))
+        assert db.list_users() == [user]
+        assert len(db.get_category_transactions(user, "Alimentação", limit=5)) == 1
+        assert db.get_summary(user)["count"] == 1
+        assert len(db.search_transactions(user, "merc")) == 1
+        db.drop_user(user)
+        assert db.check_username_availability(user)
+        db.close()
+
+    @pytest.mark.parametrize("user", ['a"b', "a:fts", "sqlite_master", "users"])
+    def test_reserved_names_are_rejected(self, user):
+        db = DatabaseManager(':memory:')
+        assert db.check_username_availability(user)
+        with pytest.raises(ValueError):
+            db.create_user_table(user)
+        db.close()
+
+    def test_connections_use_the_configured_statement_cache(self, tmp_path):
+        db = DatabaseManager(str(tmp_path / 'finance.db'), cached_statements=0)
+        db.create_user_table("alice")
+        db.add_transaction("alice", sample(1))
+        assert len(db.get_all_transactions("alice", limit=5)) == 1
+        db.close()
@@ -0,0 +1,156 @@
+import app as wsgi
+from app import app, close_pool, response_cache
+from src.db_manager import DatabaseManager
+from src.replica import ReplicaRefresher
+from src.storage import SharedTableLayout
+from tests.conftest import sample
+from datetime import date
+import json
+import sqlite3
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'finance.db')
+    db = DatabaseManager(path)
+    db.connection.execute("PRAGMA journal_mode = WAL")
+    db.create_user_table("alice")
+    db.add_transaction("alice", sample(1))
+    db.close()
+    return path
+
+
+class TestReadOnlyDatabaseManager:
+
+    def test_reads_one_snapshot_until_closed(self, db_path):
+        reader = DatabaseManager(db_path, read_only=True)
+        writer = DatabaseManager(db_path)
+        assert len(reader.get_all_transactions("alice")) == 1
+
+        writer.add_transaction("alice", sample(2))
+        assert len(reader.get_all_transactions("alice")) == 1
+        assert reader.get_summary("alice")["count"] == 1
+        reader.close()
+
+        reader = DatabaseManager(db_path, read_only=True)
+        assert len(reader.get_all_transactions("alice")) == 2
+        reader.close()
+        writer.close()
+
+    def test_writes_are_rejected(self, db_path):
+        reader = DatabaseManager(db_path, read_only=True)
+        with pytest.raises(sqlite3.OperationalError):
+            reader.add_transaction("alice", sample(2))
+        reader.close()
+
+    def test_missing_database_is_not_created(self, tmp_path):
+        with pytest.raises(sqlite3.OperationalError):
+            DatabaseManager(str(tmp_path / 'missing.db'), read_only=True)
+        assert not (tmp_path / 'missing.db').exists()
+
+    @pytest.mark.parametrize("layout", [None, SharedTableLayout()], ids=["per_user", "shared"])
+    def test_missing_search_index_is_built_for_reads(self, tmp_path, layout):
+        path = str(tmp_path / 'finance.db')
+        db = DatabaseManager(path, layout=layout)
+        db.create_user_table("alice")
+        db.add_transaction("alice", sample(1, "Farmácia", "Saúde"))
+        db.search.drop(db.cursor, "alice", db._owner_key("alice"))
+        db.commit()
+        db.close()
+
+        reader = DatabaseManager(path, layout=layout, read_only=True)
+        assert [row[1] for row in reader.search_transactions("alice", "farm")] == ["Farmácia"]
+        reader.close()
+
+
+class TestReplicaRefresher:
+
+    def test_refresh_copies_committed_writes(self, db_path, tmp_path):
+        replica_path = str(tmp_path / 'replica.db')
+        refresher = ReplicaRefresher(db_path, replica_path, interval=60)
+        refresher.start()
+        reader = DatabaseManager(replica_path, read_only=True)
+        assert len(reader.get_all_transactions("alice")) == 1
+
+        writer = DatabaseManager(db_path)
+        writer.add_transaction("alice", sample(2))
+        writer.close()
+        refresher.refresh()
+        assert len(reader.get_all_transactions("alice")) == 1
+        reader.close()
+
+        reader = DatabaseManager(replica_path, read_only=True)
+        assert len(reader.get_all_transactions("alice")) == 2
+        reader.close()
+        refresher.close()
+        stats = refresher.stats()
+        assert stats['refreshes'] == 2
+        assert stats['failures'] == 0
+
+    def test_background_refresh(self, db_path, tmp_path):
+        refresher = ReplicaRefresher(db_path, str(tmp_path / 'replica.db'), interval=0.01)
+        refresher.start()
+        writer = DatabaseManager(db_path)
+        writer.add_transaction("alice", sample(2))
+        writer.close()
+        deadline = 200
+        while refresher.stats()['refreshes'] < 3 and deadline:
+            refresher._stop.wait(0.01)
+            deadline -= 1
+        refresher.close()
+        reader = DatabaseManager(str(tmp_path / 'replica.db'), read_only=True)
+        assert len(reader.get_all_transactions("alice")) == 2
+        reader.close()
+
+    def test_invalid_interval_raises_exception(self, tmp_path):
+        with pytest.raises(ValueError):
+            ReplicaRefresher(str(tmp_path / 'a.db'), str(tmp_path / 'b.db'), interval=0)
+
+
+@pytest.fixture
+def replica_client(tmp_path, monkeypatch):
+    close_pool()
+    monkeypatch.setattr(wsgi, 'DB_FILE_PATH', str(tmp_path / 'finance.db'))
+    monkeypatch.setattr(wsgi, 'DB_READ_REPLICA_PATH', str(tmp_path / 'replica.db'))
+    monkeypatch.setattr(wsgi, 'DB_REPLICA_REFRESH_SECONDS', 3600)
+    app.config['TESTING'] = True
+    yield app.test_client()
+    close_pool()
+    response_cache.clear()
+
+
+def test_get_routes_use_read_only_connections(replica_client):
+    assert replica_client.post("/users/alice").status_code == 201
+    response = replica_client.post("/users/alice/transactions", json={
+        "date": "2025-01-05", "description": "Aluguel", "category": "Casa", "amount": 900.0, "type": "Despesa"})
+    assert response.status_code == 200
+
+    assert len(replica_client.get("/users/alice/transactions").get_json()) == 1
+    assert replica_client.get("/users/alice/summary").get_json()["expenses"] == 900.0
+    stats = replica_client.get("/stats/read-pool").get_json()
+    assert stats["checkouts"] == 2
+    assert len(stats["replicas"]) == 1
+
+
+def test_export_reads_the_replica_once_it_holds_the_user(replica_client):
+    replica_client.get("/stats/read-pool")
+    replica_client.post("/users/alice")
+    replica_client.post("/users/alice/transactions", json={
+        "date": "2025-01-05", "description": "Aluguel", "category": "Casa", "amount": 900.0, "type": "Despesa"})
+
+    # The replica was copied before alice existed, so her export reads the database itself.
+    assert len(json.loads(replica_client.get("/users/alice/transactions/export").get_data())) == 1
+
+    wsgi._replicas[0].refresh()
+    replica_client.post("/users/alice/transactions", json={
+        "date": "2025-01-06", "description": "Luz", "category": "Casa", "amount": 100.0, "type": "Despesa"})
+    assert len(json.loads(replica_client.get("/users/alice/transactions/export").get_data())) == 1
+    assert len(replica_client.get("/users/alice/transactions").get_json()) == 2
+
+
+def test_listing_an_unknown_user_still_creates_them(replica_client):
+    assert replica_client.get("/users/newcomer/transactions").get_json() == []
+    response = replica_client.post("/users/newcomer/transactions", json={
+        "date": "2025-01-05", "description": "Aluguel", "category": "Casa", "amount": 900.0, "type": "Despesa"})
+    assert response.status_code == 200
@@ -0,0 +1,81 @@
+from src.response_cache import MemoryCacheBackend, ResponseCache
+import time
+
+
+class TestMemoryCacheBackend:
+
+    def test_lru_eviction_by_entries(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", b"1")
+        backend.set("b", b"2")
+        backend.get("a")
+        backend.set("c", b"3")
+        assert backend.get("b") is None
+        assert backend.get("a") == b"1"
+        assert backend.stats()["evictions"] == 1
+
+    def test_eviction_by_bytes(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+        backend.set("a", b"123456")
+        backend.set("b", b"123456")
+        assert backend.get("a") is None
+        assert backend.stats()["bytes"] == 6
+
+    def test_oversized_values_are_not_stored(self):
+        backend = MemoryCacheBackend(max_bytes=4)
+        backend.set("a", b"12345")
+        assert backend.get("a") is None
+
+    def test_expired_entries_are_dropped(self):
+        backend = MemoryCacheBackend()
+        backend.set("a", b"1", ttl=0.01)
+        time.sleep(0.02)
+        assert backend.get("a") is None
+        assert backend.stats()["entries"] == 0
+
+
+class TestResponseCache:
+
+    def test_store_and_hit(self):
+        cache = ResponseCache()
+        version = cache.version("ana")
+        etag = cache.set("ana", version, "/users/ana/transactions", b"[]")
+        assert cache.get("ana", version, "/users/ana/transactions") == (b"[]", etag, "application/json")
+        assert cache.stats()["hits"] == 1
+
+    def test_invalidate_only_affects_that_user(self):
+        cache = ResponseCache()
+        ana, bob = cache.version("ana"), cache.version("bob")
+        cache.set("ana", ana, "key", b"a")
+        cache.set("bob", bob, "key", b"b")
+
+        cache.invalidate("ana")
+
+        assert cache.get("ana", cache.version("ana"), "key") is None
+        assert cache.get("bob", cache.version("bob"), "key") is not None
+
+    def test_response_computed_before_a_write_is_not_served_after_it(self):
+        cache = ResponseCache()
+        version = cache.version("ana")
+        cache.invalidate("ana")
+        cache.set("ana", version, "key", b"stale")
+        assert cache.get("ana", cache.version("ana"), "key") is None
+
+    def test_custom_backend(self):
+        class DictBackend:
+            def __init__(self):
+                self.data = {}
+            def get(self, key):
+                return self.data.get(key)
+            def set(self, key, value, ttl=None):
+                self.data[key] = value
+            def delete(self, key):
+                self.data.pop(key, None)
+            def clear(self):
+                self.data.clear()
+
+        cache = ResponseCache(backend=DictBackend())
+        version = cache.version("ana")
+        cache.set("ana", version, "key", b"[]")
+        assert cache.get("ana", version, "key")[0] == b"[]"
+        assert "entries" not in cache.stats()
@@ -0,0 +1,187 @@
+from app import app, get_db, close_pool, response_cache
+from src.db_manager import DatabaseManager
+from src.migrations import migrate_to_shared_table, rebuild_search_indexes
+from src.search import SHARED_PARTITIONS, match_expression
+from src.storage import SharedTableLayout
+from tests.conftest import sample
+import os
+import pytest
+
+
+@pytest.fixture
+def db_manager(db_manager):
+    db_manager.create_user_table("alice")
+    return db_manager
+
+
+def descriptions(rows):
+    return [row[1] for row in rows]
+
+
+class TestMatchExpression:
+
+    def test_words_become_quoted_prefixes(self):
+        assert match_expression("caf merc") == '"caf"* "merc"*'
+
+    def test_operators_are_not_interpreted(self):
+        assert match_expression('NOT "x" OR y*') == '"NOT"* "x"* "OR"* "y"*'
+
+    @pytest.mark.parametrize("text", ["", "   ", "*:()"])
+    def test_query_without_words_raises_exception(self, text):
+        with pytest.raises(ValueError):
+            match_expression(text)
+
+
+class TestSearchIndex:
+
+    def test_prefix_match_over_description_and_category(self, db_manager):
+        db_manager.add_transaction("alice", sample(1, "Café da manhã", "Alimentação"))
+        db_manager.add_transactions("alice", [sample(2, "Mercado", "Alimentação"), sample(3, "Cinema", "Lazer")])
+
+        assert descriptions(db_manager.search_transactions("alice", "caf")) == ["Café da manhã"]
+        assert sorted(descriptions(db_manager.search_transactions("alice", "aliment"))) == ["Café da manhã", "Mercado"]
+        assert descriptions(db_manager.search_transactions("alice", "merc alim")) == ["Mercado"]
+        assert db_manager.search_transactions("alice", "teatro") == []
+
+    def test_rows_match_listing_rows_plus_score(self, db_manager):
+        db_manager.add_transaction("alice", sample(1, "Farmácia", "Saúde", 25.5))
+        row = db_manager.search_transactions("alice", "saude")[0]
+        assert row[:6] == db_manager.get_all_transactions("alice")[0]
+        assert isinstance(row[6], float)
+
+    def test_description_matches_rank_above_category_matches(self, db_manager):
+        db_manager.add_transactions("alice", [sample(1, "Uber", "Transporte"), sample(2, "Transporte escolar", "Educação")])
+        assert descriptions(db_manager.search_transactions("alice", "transporte")) == ["Transporte escolar", "Uber"]
+
+    def test_index_follows_updates_and_deletes(self, db_manager):
+        first_id = db_manager.add_transaction("alice", sample(1, "Padaria", "Alimentação"))
+        second_id = db_manager.add_transaction("alice", sample(2, "Padaria", "Alimentação"))
+
+        db_manager.update_transaction_by_id("alice", first_id, sample(1, "Academia", "Saúde"))
+        db_manager.delete_transaction_by_id("alice", second_id)
+
+        assert db_manager.search_transactions("alice", "padaria") == []
+        assert [row[5] for row in db_manager.search_transactions("alice", "academia")] == [first_id]
+
+    def test_users_only_find_their_own_transactions(self, db_manager):
+        db_manager.create_user_table("bob")
+        db_manager.add_transaction("alice", sample(1, "Aluguel", "Casa"))
+        db_manager.add_transaction("bob", sample(1, "Aluguel", "Casa"))
+
+        assert len(db_manager.search_transactions("alice", "aluguel")) == 1
+        assert len(db_manager.search_transactions("bob", "aluguel")) == 1
+
+    def test_users_sharing_a_partition_stay_isolated(self):
+        db = DatabaseManager(':memory:', layout=SharedTableLayout())
+        users = [f"user_{index}" for index in range(SHARED_PARTITIONS + 1)]
+        for user in users:
+            db.create_user_table(user)
+            db.add_transaction(user, sample(1, f"Aluguel {user}", "Casa"))
+        assert db.search.name(users[0], db._owner_key(users[0])) == db.search.name(users[-1], db._owner_key(users[-1]))
+
+        assert descriptions(db.search_transactions(users[0], "aluguel")) == [f"Aluguel {users[0]}"]
+        assert descriptions(db.search_transactions(users[-1], "aluguel")) == [f"Aluguel {users[-1]}"]
+        db.close()
+
+    def test_keyset_pages_cover_every_match_once(self, db_manager):
+        db_manager.add_transactions("alice", [sample(day, f"Mercado {day}", "Alimentação") for day in range(1, 11)])
+
+        seen, cursor = [], None
+        while True:
+            rows = db_manager.search_transactions("alice", "mercado", limit=3, cursor=cursor)
+            if not rows:
+                break
+            seen.extend(row[5] for row in rows)
+            cursor = (rows[-1][6], rows[-1][5])
+        assert seen == [row[5] for row in db_manager.search_transactions("alice", "mercado")]
+        assert len(set(seen)) == 10
+
+    def test_search_tables_are_not_users(self, db_manager):
+        assert db_manager.list_users() == ["alice"]
+
+
+class TestExistingDatabases:
+
+    def test_per_user_index_is_built_on_first_search(self):
+        db = DatabaseManager(':memory:')
+        db.cursor.execute("CREATE TABLE alice (date, description, category, amount, type, id INTEGER PRIMARY KEY)")
+        db.cursor.execute("INSERT INTO alice VALUES ('2025-01-01', 'Farmácia', 'Saúde', 12.0, 'Despesa', 7)")
+        db.commit()
+
+        assert [row[5] for row in db.search_transactions("alice", "farm")] == [7]
+        db.add_transaction("alice", sample(2, "Farmácia", "Saúde"))
+        assert len(db.search_transactions("alice", "farm")) == 2
+        db.close()
+
+    def test_shared_index_is_built_on_connect(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        db = DatabaseManager(path, layout=SharedTableLayout())
+        db.create_user_table("alice")
+        db.add_transaction("alice", sample(1, "Farmácia", "Saúde"))
+        db.search.drop(db.cursor, "alice", db._owner_key("alice"))
+        db.commit()
+        db.close()
+
+        db = DatabaseManager(path, layout=SharedTableLayout())
+        assert descriptions(db.search_transactions("alice", "farm")) == ["Farmácia"]
+        db.close()
+
+    def test_rebuild_migration_reindexes_every_user(self):
+        db = DatabaseManager(':memory:')
+        db.create_user_table("alice")
+        db.add_transaction("alice", sample(1, "Farmácia", "Saúde"))
+        db.cursor.execute(f"DELETE FROM {db.search.table('alice')}")
+        db.commit()
+
+        assert rebuild_search_indexes(db) == ["alice"]
+        assert len(db.search_transactions("alice", "farm")) == 1
+        db.close()
+
+    def test_shared_table_migration_moves_the_index(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        db = DatabaseManager(path)
+        db.create_user_table("alice")
+        db.add_transaction("alice", sample(1, "Farmácia", "Saúde"))
+        migrate_to_shared_table(db)
+        db.close()
+
+        db = DatabaseManager(path, layout=SharedTableLayout())
+        assert descriptions(db.search_transactions("alice", "farm")) == ["Farmácia"]
+        db.cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'alice:fts%'")
+        assert db.cursor.fetchall() == []
+        db.close()
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.app_context():
+        get_db()
+        yield app.test_client()
+    close_pool()
+    response_cache.clear()
+    for path in ('finance.db', 'finance.db-wal', 'finance.db-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class TestSearchEndpoint:
+
+    def test_search_pages_through_ranked_results(self, client):
+        client.post("/users/alice")
+        payload = [{"date": f"2025-01-{day:02d}", "description": f"Mercado {day}", "category": "Alimentação",
+                    "amount": 10.0, "type": "Despesa"} for day in range(1, 6)]
+        assert client.post("/users/alice/transactions/batch", json=payload).status_code == 200
+
+        first = client.get("/users/alice/transactions/search?q=merc&limit=3").get_json()
+        assert len(first["transactions"]) == 3
+        assert set(first["transactions"][0]) == {"date", "description", "category", "amount", "type", "id"}
+        second = client.get(f"/users/alice/transactions/search?q=merc&limit=3&cursor={first['nextCursor']}").get_json()
+        assert len(second["transactions"]) == 2
+        assert second["nextCursor"] is None
+
+    def test_invalid_requests(self, client):
+        client.post("/users/alice")
+        assert client.get("/users/nobody/transactions/search?q=x").status_code == 404
+        assert client.get("/users/alice/transactions/search?q=").status_code == 400
+        assert client.get("/users/alice/transactions/search?q=x&cursor=WyIyMDI1IiwxXQ==").status_code == 400
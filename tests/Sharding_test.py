@@ -0,0 +1,170 @@
+import app as wsgi
+from app import app, close_pool, response_cache
+from src.db_manager import DatabaseManager
+from src.sharding import HashRing, ShardedDatabaseManager, ShardedPool, ShardedWriteQueue, ShardMap, main, rebalance, shard_paths
+from src.storage import SharedTableLayout
+from src.write_queue import WriteQueue
+from tests.conftest import sample
+from datetime import date
+import pytest
+
+USERS = [f"user_{index}" for index in range(12)]
+
+
+def users_in(path, layout=None):
+    db = DatabaseManager(path, layout=layout)
+    try:
+        return db.list_users()
+    finally:
+        db.close()
+
+
+class TestHashRing:
+
+    def test_shard_paths(self):
+        assert shard_paths('data/finance.db', 1) == ['data/finance.db']
+        assert shard_paths('data/finance.db', 3) == ['data/finance.0.db', 'data/finance.1.db', 'data/finance.2.db']
+        with pytest.raises(ValueError):
+            shard_paths('finance.db', 0)
+
+    def test_routing_is_stable_and_spread(self):
+        keys = [f"user_{index}" for index in range(4000)]
+        ring = HashRing(4)
+        assert [ring.shard_for(key) for key in keys] == [HashRing(4).shard_for(key) for key in keys]
+        counts = [sum(1 for key in keys if ring.shard_for(key) == shard) for shard in range(4)]
+        assert min(counts) > 700
+
+    def test_adding_a_shard_only_moves_keys_to_it(self):
+        keys = [f"user_{index}" for index in range(4000)]
+        before, after = HashRing(4), HashRing(5)
+        moved = [key for key in keys if before.shard_for(key) != after.shard_for(key)]
+        assert all(after.shard_for(key) == 4 for key in moved)
+        assert 400 < len(moved) < 1200
+
+
+@pytest.fixture(params=[None, SharedTableLayout()], ids=["per_user", "shared"])
+def sharded(request, tmp_path):
+    shard_map = ShardMap(str(tmp_path / 'finance.db'), 3)
+    for path in shard_map.paths:
+        DatabaseManager(path, layout=request.param).close()
+    pool = ShardedPool(shard_map, size=2)
+    db = ShardedDatabaseManager(shard_map, pool=pool, layout=request.param)
+    yield db
+    db.close()
+    pool.close()
+
+
+class TestShardedDatabaseManager:
+
+    def test_users_live_in_their_shard(self, sharded):
+        for user in USERS:
+            sharded.create_user_table(user)
+            sharded.add_transaction(user, sample(1, description=f"Mercado {user}"))
+
+        assert sharded.list_users() == sorted(USERS)
+        for index, path in enumerate(sharded.shard_map.paths):
+            expected = sorted(user for user in USERS if sharded.shard_map.shard_for(user) == index)
+            assert users_in(path, sharded.layout) == expected
+        assert [row[1] for row in sharded.get_all_transactions("user_3")] == ["Mercado user_3"]
+        assert sharded.get_summary("user_3")["count"] == 1
+        assert sharded.check_username_availability("nobody")
+
+    def test_drop_user(self, sharded):
+        sharded.create_user_table("alice")
+        sharded.add_transaction("alice", sample(1))
+        sharded.drop_user("alice")
+        assert sharded.check_username_availability("alice")
+        assert sharded.get_summary("alice")["count"] == 0
+        with pytest.raises(ValueError):
+            sharded.drop_user("alice")
+
+    def test_write_queue_routes_by_user(self, sharded):
+        shard_map = sharded.shard_map
+        for user in USERS:
+            sharded.create_user_table(user)
+        write_queue = ShardedWriteQueue(shard_map, [WriteQueue(lambda path=path: DatabaseManager(path, layout=sharded.layout))
+                                                    for path in shard_map.paths])
+        futures = [write_queue.submit('add_transaction', user, sample(2)) for user in USERS]
+        assert all(isinstance(future.result(timeout=10), int) for future in futures)
+        write_queue.close()
+
+        stats = write_queue.stats()
+        assert stats['operations'] == len(USERS)
+        assert [shard['operations'] for shard in stats['shards']] == \
+            [sum(1 for user in USERS if shard_map.shard_for(user) == index) for index in range(3)]
+        assert all(len(sharded.get_all_transactions(user)) == 1 for user in USERS)
+
+
+class TestRebalance:
+
+    @pytest.mark.parametrize("layout", [None, SharedTableLayout()], ids=["per_user", "shared"])
+    def test_growing_and_shrinking_keeps_every_transaction(self, tmp_path, layout):
+        path = str(tmp_path / 'finance.db')
+        db = DatabaseManager(path, layout=layout)
+        for index, user in enumerate(USERS):
+            db.create_user_table(user)
+            db.add_transactions(user, [sample(day, description=f"Farmácia {day}", category="Saúde") for day in range(1, index + 2)])
+        db.close()
+
+        moves = rebalance(path, 1, 3, layout)
+        assert sorted(user for user, *_ in moves) == sorted(USERS)
+        assert users_in(path, layout) == []
+
+        moves = rebalance(path, 3, 4, layout)
+        assert all(target == shard_paths(path, 4)[3] for _, _, target, _ in moves)
+        moves = rebalance(path, 4, 2, layout)
+
+        sharded = ShardedDatabaseManager(ShardMap(path, 2), layout=layout)
+        try:
+            assert sharded.list_users() == sorted(USERS)
+            for index, user in enumerate(USERS):
+                assert len(sharded.get_all_transactions(user)) == index + 1
+                assert sharded.get_summary(user)["expenses"] == 10.0 * (index + 1)
+                assert len(sharded.search_transactions(user, "farm")) == index + 1
+        finally:
+            sharded.close()
+        assert users_in(shard_paths(path, 4)[2], layout) == users_in(shard_paths(path, 4)[3], layout) == []
+
+    def test_interrupted_move_is_redone(self, tmp_path):
+        path = str(tmp_path / 'finance.db')
+        db = DatabaseManager(path)
+        db.create_user_table("alice")
+        db.add_transaction("alice", sample(1))
+        db.close()
+        target = DatabaseManager(ShardMap(path, 2).path_for("alice"))
+        target.create_user_table("alice")
+        target.add_transaction("alice", sample(2))
+        target.close()
+
+        assert main(['rebalance', '--db', path, '--from', '1', '--to', '2']) == 0
+        sharded = ShardedDatabaseManager(ShardMap(path, 2))
+        assert [row[0] for row in sharded.get_all_transactions("alice")] == ['2025-01-01']
+        sharded.close()
+
+
+@pytest.fixture
+def sharded_client(tmp_path, monkeypatch):
+    close_pool()
+    monkeypatch.setattr(wsgi, 'DB_SHARDS', 3)
+    monkeypatch.setattr(wsgi, 'DB_FILE_PATH', str(tmp_path / 'finance.db'))
+    app.config['TESTING'] = True
+    yield app.test_client()
+    close_pool()
+    response_cache.clear()
+
+
+def test_routes_run_unchanged_over_shards(sharded_client, tmp_path):
+    for user in USERS:
+        assert sharded_client.post(f"/users/{user}").status_code == 201
+        response = sharded_client.post(f"/users/{user}/transactions", json={
+            "date": "2025-01-05", "description": "Aluguel", "category": "Casa", "amount": 900.0, "type": "Despesa"})
+        assert response.status_code == 200
+
+    assert len(sharded_client.get("/users/user_7/transactions").get_json()) == 1
+    assert sharded_client.get("/users/user_7/summary").get_json()["expenses"] == 900.0
+    query = sharded_client.get("/users/user_7/transactions/query?type=Despesa&totals=1").get_json()
+    assert len(query["transactions"]) == 1 and query["totals"]["expenses"] == 900.0
+    assert sharded_client.get("/users/ghost/summary").status_code == 404
+    assert sharded_client.get("/stats/write-queue").get_json()["operations"] == len(USERS)
+    assert len(sharded_client.get("/stats/pool").get_json()["shards"]) == 3
+    assert not (tmp_path / "finance.db").exists()
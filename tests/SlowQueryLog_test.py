@@ -0,0 +1,93 @@
+from src.db_manager import DatabaseManager
+from src.slow_query_log import SlowQueryLog, is_full_scan, main, normalize, summarize_log
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+from datetime import date
+import json
+
+
+def add_rows(db, user, count):
+    db.add_transactions(user, (
+        Transaction(date(2025, 1, day % 28 + 1), f"Item {day}", "Saúde" if day % 2 else "Lazer", 10.0, TransactionType('Despesa'))
+        for day in range(count)
+    ))
+
+
+class TestNormalize:
+
+    def test_replaces_literals_and_user_tables(self):
+        assert normalize("SELECT * FROM alice WHERE amount > 10.5 AND category = 'Saúde'") == \
+            "SELECT * FROM <user> WHERE amount > ? AND category = ?"
+        assert normalize("SELECT * FROM bob WHERE id IN (?, ?, ?)") == "SELECT * FROM <user> WHERE id IN (?, ...)"
+        assert normalize('CREATE INDEX IF NOT EXISTS "carol:date_idx" ON "carol" (date)') == \
+            "CREATE INDEX IF NOT EXISTS <user>:date_idx ON <user> (date)"
+        assert normalize('SELECT id FROM "maria-joão" WHERE id = 3') == "SELECT id FROM <user> WHERE id = ?"
+        assert normalize('CREATE INDEX IF NOT EXISTS "dave smith:type_idx" ON "dave smith" (type, date)') == \
+            "CREATE INDEX IF NOT EXISTS <user>:type_idx ON <user> (type, date)"
+        assert normalize('INSERT INTO "erin:fts" (rowid) VALUES (?)') == "INSERT INTO <user>:fts (rowid) VALUES (?)"
+
+    def test_keeps_internal_tables(self):
+        assert normalize("SELECT id FROM users WHERE name = ?") == "SELECT id FROM users WHERE name = ?"
+        assert normalize("INSERT INTO monthly_totals VALUES (?) ON CONFLICT (user) DO NOTHING") == \
+            "INSERT INTO monthly_totals VALUES (?) ON CONFLICT (user) DO NOTHING"
+
+    def test_full_scan_detection(self):
+        assert is_full_scan(["SCAN alice"])
+        assert not is_full_scan(["SEARCH alice USING INDEX alice:category_idx (category=?)"])
+        assert not is_full_scan(["SCAN alice USING INDEX alice:date_idx"])
+
+
+class TestSlowQueryLog:
+
+    def test_logs_statements_over_threshold_with_plans(self, tmp_path):
+        path = str(tmp_path / 'slow.log')
+        log = SlowQueryLog(path, threshold_ms=0)
+        db = DatabaseManager(str(tmp_path / 'finance.db'), slow_query_log=log)
+        db.cursor.execute("CREATE TABLE alice (date, description, category, amount, type, id INTEGER PRIMARY KEY)")
+        add_rows(db, "alice", 50)
+        assert len(db.get_all_transactions("alice")) == 50
+        db.create_indexes("alice")
+        assert len(db.get_category_transactions("alice", "Saúde")) == 25
+        db.close()
+
+        entries = [json.loads(line) for line in open(path, encoding='utf-8')]
+        selects = [entry for entry in entries if entry['statement'].startswith('SELECT date, description')]
+        full_table = next(entry for entry in selects if 'WHERE' not in entry['statement'])
+        by_category = next(entry for entry in selects if 'category = ?' in entry['statement'])
+        assert full_table['rows'] == 50
+        assert full_table['full_scan'] is True
+        assert by_category['parameters'] == ['Saúde']
+        assert by_category['rows'] == 25
+        assert by_category['full_scan'] is False
+        assert any('alice:category_idx' in detail for detail in by_category['plan'])
+
+        ranked = log.top()
+        assert ranked == sorted(ranked, key=lambda entry: entry['total_ms'], reverse=True)
+        assert {'count', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'plan', 'normalized'} <= set(ranked[0])
+
+    def test_fast_statements_are_not_logged(self, tmp_path):
+        log = SlowQueryLog(str(tmp_path / 'slow.log'), threshold_ms=10_000)
+        db = DatabaseManager(str(tmp_path / 'finance.db'), slow_query_log=log)
+        db.create_user_table("alice")
+        db.get_all_transactions("alice")
+        db.close()
+        assert log.top() == []
+        assert (tmp_path / 'slow.log').read_text(encoding='utf-8') == ''
+
+    def test_log_file_rotates_and_is_ranked_offline(self, tmp_path, capsys):
+        path = str(tmp_path / 'rotating.log')
+        log = SlowQueryLog(path, threshold_ms=0, max_bytes=2000, backup_count=3)
+        db = DatabaseManager(str(tmp_path / 'finance.db'), slow_query_log=log)
+        db.create_user_table("alice")
+        for _ in range(10):
+            db.get_all_transactions("alice")
+            db.get_all_debits("alice")
+        db.close()
+
+        assert (tmp_path / 'rotating.log.1').exists()
+        ranked = summarize_log(path)
+        assert ranked[0]['total_ms'] >= ranked[-1]['total_ms']
+        assert any(entry['normalized'].startswith('SELECT date, description, category, amount, type, id FROM <user>') for entry in ranked)
+
+        assert main([path, '--top', '3']) == 0
+        assert 'ms total' in capsys.readouterr().out
@@ -0,0 +1,197 @@
+from src.db_manager import DatabaseManager
+from src.storage import CentsEncoding, CompactEncoding, PerUserTableLayout, SharedTableLayout, create_layout
+from src.migrations import migrate_to_shared_table
+from tests.conftest import sample
+from datetime import date
+from functools import partial
+import sqlite3
+import pytest
+
+
+@pytest.fixture
+def shared_db():
+    db_manager = DatabaseManager(':memory:', layout=SharedTableLayout())
+    yield db_manager
+    db_manager.close()
+
+
+sample = partial(sample, category="Test Category", type_name='Receita', month=10, year=2023)
+
+
+class TestSharedTableLayout:
+
+    def test_create_user(self, shared_db):
+        assert shared_db.check_username_availability("ana") == True
+        shared_db.create_user_table("ana")
+        assert shared_db.check_username_availability("ana") == False
+        assert shared_db.list_users() == ["ana"]
+
+    def test_create_existing_user_raises_exception(self, shared_db):
+        shared_db.create_user_table("ana")
+        with pytest.raises(ValueError, match="Username 'ana' already exists."):
+            shared_db.create_user_table("ana")
+
+    def test_users_are_isolated(self, shared_db):
+        shared_db.create_user_table("ana")
+        shared_db.create_user_table("saulo")
+        shared_db.add_transaction("ana", sample(1, "A1"))
+        saulo_id = shared_db.add_transaction("saulo", sample(1, "B1", type_name='Despesa'))
+
+        assert [row[1] for row in shared_db.get_all_transactions("ana")] == ["A1"]
+        assert [row[1] for row in shared_db.get_all_debits("saulo")] == ["B1"]
+        assert shared_db.get_all_debits("ana") == []
+
+        shared_db.delete_transaction_by_id("ana", saulo_id)
+        shared_db.update_transaction_by_id("ana", saulo_id, sample(2, "Hijacked"))
+        assert [row[1] for row in shared_db.get_all_transactions("saulo")] == ["B1"]
+
+    def test_filters_and_pagination(self, shared_db):
+        shared_db.create_user_table("ana")
+        ids = shared_db.add_transactions("ana", [sample(day, f"T{day}", category="Food" if day % 2 else "Home") for day in range(1, 6)])
+        assert ids == [1, 2, 3, 4, 5]
+
+        assert [row[1] for row in shared_db.get_category_transactions("ana", "Food")] == ["T1", "T3", "T5"]
+        assert len(shared_db.get_month_transactions("ana", 10, 2023)) == 5
+        page = shared_db.get_all_transactions("ana", limit=2)
+        assert [row[1] for row in page] == ["T5", "T4"]
+        assert [row[1] for row in shared_db.get_all_transactions("ana", limit=2, cursor=(page[-1][0], page[-1][5]))] == ["T3", "T2"]
+
+    def test_rows_keep_legacy_shape(self, shared_db):
+        shared_db.create_user_table("ana")
+        shared_db.add_transaction("ana", sample(1, "A1"))
+        assert shared_db.get_all_transactions("ana") == [("2023-10-01", "A1", "Test Category", 10.0, "Receita", 1)]
+
+    def test_listing_uses_user_index(self, shared_db):
+        shared_db.cursor.execute("EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT 10", (1,))
+        plan = " ".join(str(row[-1]) for row in shared_db.cursor.fetchall())
+        assert "transactions_user_date_idx" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_unknown_layout_raises_exception(self):
+        with pytest.raises(ValueError):
+            create_layout("columnar")
+        with pytest.raises(ValueError):
+            create_layout("shared", "decimal")
+
+
+class TestCentsEncoding:
+
+    @pytest.mark.parametrize("layout", [PerUserTableLayout(CentsEncoding()), SharedTableLayout(CentsEncoding())])
+    def test_amounts_and_types_are_stored_as_integers(self, layout):
+        db_manager = DatabaseManager(':memory:', layout=layout)
+        db_manager.create_user_table("ana")
+        first_id = db_manager.add_transaction("ana", sample(1, "A1", amount=19.99))
+        db_manager.add_transactions("ana", [sample(2, "A2", amount=0.1, type_name='Despesa')])
+
+        table = layout.table("ana")
+        db_manager.cursor.execute(f"SELECT amount, typeof(amount), type FROM {table} ORDER BY id")
+        assert db_manager.cursor.fetchall() == [(1999, 'integer', 1), (10, 'integer', -1)]
+        assert sorted(db_manager.get_all_transactions("ana")) == [
+            ("2023-10-01", "A1", "Test Category", 19.99, "Receita", 1),
+            ("2023-10-02", "A2", "Test Category", 0.1, "Despesa", 2),
+        ]
+        assert [row[1] for row in db_manager.get_all_debits("ana")] == ["A2"]
+        assert [row[1] for row in db_manager.get_all_credits("ana", limit=10)] == ["A1"]
+
+        db_manager.update_transaction_by_id("ana", first_id, sample(1, "A1", amount=5.05, type_name='Despesa'))
+        assert db_manager.get_transaction_by_id("ana", first_id)[3:5] == (5.05, "Despesa")
+        db_manager.close()
+
+    def test_debits_filter_uses_type_index(self):
+        db_manager = DatabaseManager(':memory:', layout=PerUserTableLayout(CentsEncoding()))
+        db_manager.create_user_table("ana")
+        query, parameters = db_manager._build_select("ana", "type = ?", (-1,), limit=10)
+        db_manager.cursor.execute(f"EXPLAIN QUERY PLAN {query}", parameters)
+        assert "ana:type_idx" in " ".join(str(row[-1]) for row in db_manager.cursor.fetchall())
+        db_manager.close()
+
+
+class TestSharedTableMigration:
+
+    def test_migrate_per_user_tables(self, tmp_path):
+        db_path = str(tmp_path / "legacy.db")
+        legacy = DatabaseManager(db_path)
+        legacy.create_user_table("ana")
+        legacy.create_user_table("saulo")
+        legacy.add_transactions("ana", [sample(1, "A1"), sample(2, "A2")])
+        legacy.add_transaction("saulo", sample(3, "B1", type_name='Despesa'))
+
+        assert migrate_to_shared_table(legacy) == ["ana", "saulo"]
+        legacy.close()
+
+        shared = DatabaseManager(db_path, layout=SharedTableLayout())
+        assert shared.list_users() == ["ana", "saulo"]
+        assert [row[1] for row in shared.get_all_transactions("ana")] == ["A1", "A2"]
+        assert [row[1] for row in shared.get_all_debits("saulo")] == ["B1"]
+        shared.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('ana', 'saulo')")
+        assert shared.cursor.fetchall() == []
+        shared.close()
+
+    @pytest.mark.parametrize("layout", [None, SharedTableLayout()], ids=["per_user", "shared"])
+    @pytest.mark.parametrize("user", ["changes", "transactions", "categories"])
+    def test_legacy_users_with_internal_names_refuse_to_open(self, tmp_path, layout, user):
+        db_path = str(tmp_path / "legacy.db")
+        connection = sqlite3.connect(db_path)
+        connection.execute(f'CREATE TABLE "{user}" (date TEXT, description TEXT, category TEXT, amount REAL, type TEXT, id INTEGER PRIMARY KEY)')
+        connection.execute(f'INSERT INTO "{user}" (date, description, category, amount, type) VALUES (\'2023-10-01\', \'A1\', \'Test\', 10.0, \'Receita\')')
+        connection.commit()
+        connection.close()
+
+        with pytest.raises(RuntimeError, match=f"Table '{user}' holds the transactions of user '{user}'"):
+            DatabaseManager(db_path, layout=layout)
+
+
+class TestCompactEncoding:
+
+    @pytest.fixture(params=[PerUserTableLayout(CompactEncoding()), SharedTableLayout(CompactEncoding())], ids=["per_user", "shared"])
+    def compact_db(self, request):
+        db_manager = DatabaseManager(':memory:', layout=request.param)
+        db_manager.create_user_table("ana")
+        yield db_manager
+        db_manager.close()
+
+    def test_rows_are_stored_as_integers_in_a_strict_table(self, compact_db):
+        compact_db.add_transactions("ana", [sample(day, f"T{day}", category="Food" if day % 2 else "Home") for day in range(1, 6)])
+        table = compact_db.layout.table_name("ana")
+
+        compact_db.cursor.execute(f"SELECT date, category, amount, type FROM {table} ORDER BY id LIMIT 1")
+        assert compact_db.cursor.fetchone() == (date(2023, 10, 1).toordinal() - date(1970, 1, 1).toordinal(), 1, 1000, 1)
+        compact_db.cursor.execute("SELECT id, name FROM categories ORDER BY id")
+        assert compact_db.cursor.fetchall() == [(1, "Food"), (2, "Home")]
+        compact_db.cursor.execute("SELECT strict FROM pragma_table_list WHERE name = ?", (table,))
+        assert compact_db.cursor.fetchone() == (1,)
+        with pytest.raises(Exception):
+            compact_db.cursor.execute(f"UPDATE {table} SET amount = 'ten'")
+
+    def test_rows_filters_and_pagination_decode_api_values(self, compact_db):
+        ids = compact_db.add_transactions("ana", [sample(day, f"T{day}", category="Food" if day % 2 else "Home") for day in range(1, 6)])
+        assert compact_db.get_transaction_by_id("ana", ids[0]) == ("2023-10-01", "T1", "Food", 10.0, "Receita", ids[0])
+        assert [row[1] for row in compact_db.get_category_transactions("ana", "Food")] == ["T1", "T3", "T5"]
+        assert compact_db.get_category_transactions("ana", "Unknown") == []
+        assert len(compact_db.get_month_transactions("ana", 10, 2023)) == 5
+        assert [row[1] for row in compact_db.get_transactions_between("ana", date(2023, 10, 2), date(2023, 10, 3))] == ["T2", "T3"]
+        page = compact_db.get_all_transactions("ana", limit=2)
+        assert [row[1] for row in page] == ["T5", "T4"]
+        assert [row[1] for row in compact_db.get_all_transactions("ana", limit=2, cursor=(page[-1][0], page[-1][5]))] == ["T3", "T2"]
+
+        compact_db.update_transaction_by_id("ana", ids[0], sample(9, "T1", category="Travel"))
+        assert compact_db.get_transaction_by_id("ana", ids[0])[:3] == ("2023-10-09", "T1", "Travel")
+
+    def test_filters_use_integer_indexes(self, compact_db):
+        query, parameters = compact_db._build_select("ana", f"category = {compact_db.layout.encoding.placeholders[2]}", ("Food",), limit=10)
+        compact_db.cursor.execute(f"EXPLAIN QUERY PLAN {query}", parameters)
+        plan = " ".join(str(row[-1]) for row in compact_db.cursor.fetchall())
+        assert "category_idx" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_combined_query_filters_encoded_columns(self, compact_db):
+        compact_db.add_transactions("ana", [
+            sample(day, f"T{day}", category="Food" if day % 2 else "Home", amount=day * 10.0, type_name='Despesa' if day > 1 else 'Receita')
+            for day in range(1, 6)
+        ])
+
+        rows = compact_db.query_transactions("ana", types=['Despesa'], categories=['Food'], start=date(2023, 10, 2), min_amount=30, sort='amount_desc')
+        assert rows == [("2023-10-05", "T5", "Food", 50.0, "Despesa", rows[0][5]), ("2023-10-03", "T3", "Food", 30.0, "Despesa", rows[1][5])]
+        page = compact_db.query_transactions("ana", sort='amount_asc', limit=2, cursor=(20.0, 2))
+        assert [row[1] for row in page] == ["T3", "T4"]
+        assert compact_db.query_totals("ana", categories=['Food', 'Home']) == {"income": 10.0, "expenses": 140.0, "balance": -130.0, "count": 5}
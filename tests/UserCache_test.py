@@ -0,0 +1,88 @@
+from src.db_manager import DatabaseManager
+from src.storage import SharedTableLayout
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+from src.user_cache import UserCache
+from datetime import date
+import pytest
+
+
+class CountingCursor:
+    """Wraps a cursor and records every statement executed through it."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = []
+
+    def execute(self, query, *args):
+        self.statements.append(query)
+        return self._cursor.execute(query, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def catalog_queries(cursor):
+    return [query for query in cursor.statements if "sqlite_master" in query or "FROM users" in query]
+
+
+class TestUserCache:
+
+    def test_lru_eviction(self):
+        cache = UserCache(maxsize=2)
+        cache.put("a", True)
+        cache.put("b", True)
+        assert cache.get("a") is True
+        cache.put("c", True)
+        assert cache.get("b") is None
+        assert cache.get("a") is True
+        assert cache.stats()["evictions"] == 1
+
+    def test_hit_and_miss_counters(self):
+        cache = UserCache()
+        assert cache.get("a") is None
+        cache.put("a", 7)
+        assert cache.get("a") == 7
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    def test_invalid_size_raises_exception(self):
+        with pytest.raises(ValueError):
+            UserCache(maxsize=0)
+
+    @pytest.mark.parametrize("layout", [None, SharedTableLayout()])
+    def test_known_user_skips_catalog_queries(self, layout):
+        cache = UserCache()
+        db_manager = DatabaseManager(':memory:', layout=layout, user_cache=cache)
+        db_manager.create_user_table("ana")
+        db_manager.check_username_availability("ana")
+
+        db_manager.cursor = CountingCursor(db_manager.cursor)
+        assert db_manager.check_username_availability("ana") == False
+        db_manager.add_transaction("ana", Transaction(date(2023, 10, 1), "A1", "Test", 1.0, TransactionType('Receita')))
+        assert len(db_manager.get_all_transactions("ana")) == 1
+
+        assert catalog_queries(db_manager.cursor) == []
+        db_manager.close()
+
+    def test_unknown_users_are_not_cached(self):
+        cache = UserCache()
+        db_manager = DatabaseManager(':memory:', user_cache=cache)
+        assert db_manager.check_username_availability("ana") == True
+        db_manager.create_user_table("ana")
+        assert db_manager.check_username_availability("ana") == False
+        db_manager.close()
+
+    def test_cache_is_shared_between_managers(self, tmp_path):
+        cache = UserCache()
+        db_path = str(tmp_path / "shared_cache.db")
+        first = DatabaseManager(db_path, user_cache=cache)
+        first.create_user_table("ana")
+        first.check_username_availability("ana")
+        first.close()
+
+        second = DatabaseManager(db_path, user_cache=cache)
+        second.cursor = CountingCursor(second.cursor)
+        assert second.check_username_availability("ana") == False
+        assert catalog_queries(second.cursor) == []
+        second.close()
@@ -0,0 +1,124 @@
+from src.connection_pool import ConnectionPool
+from src.db_manager import DatabaseManager
+from src.storage import SharedTableLayout
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+from src.user_cache import UserCache
+from src.write_queue import WriteQueue
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import sqlite3
+import pytest
+
+
+def make_transaction(day: int, amount: float = 10.0):
+    return Transaction(date(2025, 1, day), f"Item {day}", "Alimentação", amount, TransactionType('Despesa'))
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'queue.db'), size=4)
+    # Pooled managers expect the schema to exist, so the user is created by one of its own.
+    db = DatabaseManager(pool.db_path)
+    db.create_user_table("queue_user")
+    db.close()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def write_queue(pool):
+    write_queue = WriteQueue(lambda: DatabaseManager(pool.db_path, pool=pool), max_batch_size=16, max_latency=0.05)
+    yield write_queue
+    write_queue.close()
+
+
+def read_rows(pool):
+    db = DatabaseManager(pool.db_path, pool=pool)
+    try:
+        return db.get_all_transactions("queue_user")
+    finally:
+        db.close()
+
+
+class TestWriteQueue:
+
+    def test_futures_resolve_with_row_ids_after_commit(self, pool, write_queue):
+        first = write_queue.submit('add_transaction', "queue_user", make_transaction(1)).result(timeout=5)
+        second = write_queue.submit('add_transaction', "queue_user", make_transaction(2)).result(timeout=5)
+        assert second == first + 1
+        assert sorted(row[5] for row in read_rows(pool)) == [first, second]
+
+    def test_concurrent_writes_are_group_committed(self, pool, write_queue):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            futures = [executor.submit(lambda day=day: write_queue.submit('add_transaction', "queue_user", make_transaction(day % 28 + 1)).result(timeout=5))
+                       for day in range(64)]
+            ids = [future.result() for future in futures]
+        assert len(set(ids)) == 64
+        assert len(read_rows(pool)) == 64
+        stats = write_queue.stats()
+        assert stats['operations'] == 64
+        assert stats['batches'] < 64
+        assert 1 < stats['max_batch'] <= 16
+
+    def test_failed_operation_is_rolled_back_alone(self, pool, write_queue):
+        futures = [
+            write_queue.submit('add_transaction', "queue_user", make_transaction(1)),
+            write_queue.submit('add_transaction', "users", make_transaction(2)),
+            write_queue.submit('add_transaction', "queue_user", make_transaction(3)),
+        ]
+        assert isinstance(futures[0].result(timeout=5), int)
+        with pytest.raises(ValueError, match="reserved"):
+            futures[1].result(timeout=5)
+        assert isinstance(futures[2].result(timeout=5), int)
+        assert len(read_rows(pool)) == 2
+        assert write_queue.stats()['failures'] == 1
+
+    def test_batches_are_queued_and_rolled_back_whole(self, pool, write_queue):
+        ids = write_queue.submit('add_transactions', "queue_user", [make_transaction(1), make_transaction(2)], 1).result(timeout=5)
+        assert sorted(row[5] for row in read_rows(pool)) == ids
+        failing = write_queue.submit('add_transactions', "queue_user", [make_transaction(3), None], 1)
+        other = write_queue.submit('add_transaction', "queue_user", make_transaction(4))
+        with pytest.raises(AttributeError):
+            failing.result(timeout=5)
+        assert isinstance(other.result(timeout=5), int)
+        assert len(read_rows(pool)) == 3
+
+    def test_users_created_by_rolled_back_operations_are_not_cached(self, tmp_path):
+        user_cache = UserCache()
+        write_queue = WriteQueue(lambda: DatabaseManager(str(tmp_path / 'shared.db'), layout=SharedTableLayout(), user_cache=user_cache))
+        try:
+            unbindable = make_transaction(1)
+            unbindable.description = ["Item 1"]
+            with pytest.raises(sqlite3.Error):
+                write_queue.submit('add_transaction', "new_user", unbindable).result(timeout=5)
+            assert user_cache.get("new_user") is None
+            write_queue.submit('add_transaction', "other_user", make_transaction(1)).result(timeout=5)
+            transaction_id = write_queue.submit('add_transaction', "new_user", make_transaction(2)).result(timeout=5)
+        finally:
+            write_queue.close()
+        db = DatabaseManager(str(tmp_path / 'shared.db'), layout=SharedTableLayout())
+        try:
+            assert [row[5] for row in db.get_all_transactions("new_user")] == [transaction_id]
+            assert len(db.get_all_transactions("other_user")) == 1
+        finally:
+            db.close()
+
+    def test_update_and_delete(self, pool, write_queue):
+        transaction_id = write_queue.submit('add_transaction', "queue_user", make_transaction(1)).result(timeout=5)
+        write_queue.submit('update_transaction_by_id', "queue_user", transaction_id, make_transaction(2, 50.0)).result(timeout=5)
+        assert read_rows(pool)[0][3] == 50.0
+        write_queue.submit('delete_transaction_by_id', "queue_user", transaction_id).result(timeout=5)
+        assert read_rows(pool) == []
+
+    def test_rejects_unsupported_operations(self, write_queue):
+        with pytest.raises(ValueError):
+            write_queue.submit('create_user_table', "other_user")
+
+    def test_close_flushes_pending_writes(self, pool, write_queue):
+        futures = [write_queue.submit('add_transaction', "queue_user", make_transaction(day)) for day in range(1, 11)]
+        write_queue.close()
+        assert all(future.done() for future in futures)
+        assert len(read_rows(pool)) == 10
+        with pytest.raises(RuntimeError):
+            write_queue.submit('add_transaction', "queue_user", make_transaction(1))
@@ -0,0 +1,20 @@
+from src.db_manager import DatabaseManager
+from src.storage import CentsEncoding, CompactEncoding, PerUserTableLayout, SharedTableLayout
+from src.transactions import Transaction
+from src.transaction_type import TransactionType
+from datetime import date
+import pytest
+
+
+def sample(day, description="Mercado", category="Alimentação", amount=10.0, type_name='Despesa', month=1, year=2025):
+    return Transaction(date(year, month, day), description, category, amount, TransactionType(type_name))
+
+
+@pytest.fixture(params=[None, SharedTableLayout(), PerUserTableLayout(CentsEncoding()), SharedTableLayout(CentsEncoding()),
+                        PerUserTableLayout(CompactEncoding()), SharedTableLayout(CompactEncoding())],
+                ids=["per_user", "shared", "per_user_cents", "shared_cents", "per_user_compact", "shared_compact"])
+def db_manager(request):
+    """An empty in-memory database in every storage layout and encoding."""
+    db_manager = DatabaseManager(':memory:', layout=request.param)
+    yield db_manager
+    db_manager.close()